@@ -0,0 +1,110 @@
+"""Deterministic stand-in for the chat model, for offline tests and benchmarks.
+
+Selected with LLM_PROVIDER=fake (or `provider = "fake"` under [openai]). It
+understands the prompts ResumeAnalyzerAgent sends and answers them with
+simple heuristics instead of a network call. To exercise the rate limiter it
+can also behave like a loaded provider: each call takes latency_ms (plus up to
+jitter_ms), more than requests_per_minute calls in a rolling minute get a 429,
+and so does a random error_429_rate share of the rest.
+"""
+import collections
+import json
+import random
+import re
+import threading
+import time
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import Runnable
+
+from backend.services.resume_service import EMAIL_RE, extract_skills
+
+_DEGREE_RE = re.compile(r"\b(?:Bachelor|Master|B\.?\s?(?:Tech|Sc|E|Com|CA|A)|M\.?\s?(?:Tech|Sc|E|Com|CA|BA|A)|Ph\.?D)\b")
+_NAME_RE = re.compile(r"^[A-Z][A-Za-z'\-]+(?: [A-Z][A-Za-z'\-.]*){1,3}$")
+
+
+class FakeRateLimitError(Exception):
+    """Shaped like the provider SDK's 429 error: status_code and the Retry-After it sent."""
+
+    status_code = 429
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limit reached, retry after {retry_after:g}s")
+        self.retry_after = retry_after
+
+
+class FakeLLM(Runnable):
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, requests_per_minute: int = 0,
+                 error_429_rate: float = 0.0, retry_after_seconds: float = 1.0, seed: int = 0):
+        self.calls = 0
+        self.rate_limited = 0
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.requests_per_minute = requests_per_minute
+        self.error_429_rate = error_429_rate
+        self.retry_after = retry_after_seconds
+        self._recent = collections.deque()  # start times of accepted calls in the last minute
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _admit(self):
+        with self._lock:
+            self.calls += 1
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] >= 60:
+                self._recent.popleft()
+            limited = ((self.requests_per_minute and len(self._recent) >= self.requests_per_minute)
+                       or (self.error_429_rate and self._random.random() < self.error_429_rate))
+            if limited:
+                self.rate_limited += 1
+                raise FakeRateLimitError(self.retry_after)
+            self._recent.append(now)
+            delay = self.latency + self._random.uniform(0, self.jitter)
+        if delay:
+            time.sleep(delay)
+
+    def invoke(self, input, config=None, **kwargs) -> AIMessage:
+        self._admit()
+        prompt = input.to_string() if hasattr(input, "to_string") else str(input)
+        if "ITEMS:" in prompt:
+            return AIMessage(content=json.dumps(self._extract_fields(prompt)))
+        if "RESUME TEXT:" in prompt:
+            return AIMessage(content=json.dumps(self._analyze(prompt)))
+        return AIMessage(content="Job Title: Software Engineer\n\nRole Overview: Generated offline by the fake LLM.")
+
+    def _analyze(self, prompt: str) -> dict:
+        resume = prompt.split("RESUME TEXT:", 1)[1].split("Please provide:", 1)[0].strip()
+        skills = sorted(extract_skills(resume))[:5]
+        return {
+            "professional_summary": resume.splitlines()[0] if resume else "",
+            "sentiment_analysis": "Confident",
+            "top_functional_skills": skills,
+            "hiring_potential_score": min(10, 3 + len(skills)),
+        }
+
+    def _extract_fields(self, prompt: str) -> dict:
+        start = prompt.index("ITEMS:") + len("ITEMS:")
+        items, _ = json.JSONDecoder().raw_decode(prompt[start:].lstrip())
+        answers = {}
+        for item in items:
+            lines = [l.strip() for l in item["excerpt"].splitlines() if l.strip()]
+            found = {}
+            for field in item["fields"]:
+                if field == "email":
+                    m = EMAIL_RE.search(item["excerpt"])
+                    found[field] = m.group(0) if m else None
+                elif field == "mobile":
+                    m = re.search(r"\+?\d[\d\s().-]{8,}\d", item["excerpt"])
+                    found[field] = m.group(0) if m else None
+                elif field == "name":
+                    found[field] = next((l for l in lines if _NAME_RE.match(l)), None)
+                elif field == "education":
+                    entries = []
+                    for j, line in enumerate(lines):
+                        if _DEGREE_RE.search(line):
+                            # Institution usually sits on the next line
+                            nxt = lines[j + 1] if j + 1 < len(lines) else ""
+                            entries.append(f"{line}, {nxt}" if nxt and not re.search(r"\d", nxt) else line)
+                    found[field] = entries[:3] or None
+            answers[item["id"]] = found
+        return answers
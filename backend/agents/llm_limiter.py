@@ -0,0 +1,225 @@
+"""Process-wide admission control for chat model calls.
+
+Two layers sit in front of every ResumeAnalyzerAgent call. Single-flight:
+concurrent calls with the same prompt share one in-flight request, so n8n and
+several recruiters analysing the same shortlist cost one model call. Token
+buckets: calls reserve one request and their estimated tokens against
+requests_per_minute and tokens_per_minute. A call that cannot be admitted
+waits in line, in arrival order, unless its turn would come after its deadline
+(queue_timeout_seconds), in which case it is shed at once with LLMRateLimited
+instead of waiting only to fail. A 429 from the provider pauses every call for
+its Retry-After before the request is retried, up to max_retries times.
+"""
+import collections
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional, Tuple
+
+DEFAULTS = {
+    "requests_per_minute": 500,
+    "tokens_per_minute": 200000,
+    # Tokens reserved for the answer on top of the prompt
+    "max_output_tokens": 400,
+    "queue_timeout_seconds": 10,
+    "max_queue": 100,
+    "max_retries": 2,
+    "default_retry_after_seconds": 1,
+    "coalesce": True,
+}
+
+
+class LLMRateLimited(RuntimeError):
+    """The call was shed: it could not be sent to the model before its deadline."""
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def rate_limit_retry_after(error: Exception) -> Optional[float]:
+    """Seconds the provider asked us to wait if `error` is a 429, else None."""
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    if status != 429:
+        return None
+    value = getattr(error, "retry_after", None)
+    if value is None:
+        headers = getattr(response, "headers", None) or {}
+        value = headers.get("retry-after")
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one; callers that join share its result."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+
+    def do(self, key: str, fn: Callable) -> Tuple[object, bool]:
+        """(result, shared): shared is True when another caller's in-flight call produced the result."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result(), True  # re-raises the leader's error
+        try:
+            result = fn()
+            future.set_result(result)
+            return result, False
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+class TokenBucket:
+    """Refills at per_minute / 60 per second up to per_minute. Reservations may overdraw it,
+    which is how callers queue: each one waits until the bucket is back above zero for it."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def wait_for(self, amount: float, now: float) -> float:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        # A single call larger than the whole bucket still goes once the bucket is full
+        deficit = min(amount, self.capacity) - self.level
+        return deficit / self.rate if deficit > 0 else 0.0
+
+    def take(self, amount: float):
+        self.level -= min(amount, self.capacity)
+
+
+class LLMLimiter:
+    def __init__(self, config: Optional[Dict] = None):
+        self.config = dict(DEFAULTS, **(config or {}))
+        c = self.config
+        self.max_output_tokens = int(c["max_output_tokens"])
+        self.queue_timeout = float(c["queue_timeout_seconds"])
+        self.max_queue = int(c["max_queue"])
+        self.max_retries = int(c["max_retries"])
+        self.default_retry_after = float(c["default_retry_after_seconds"])
+        self.coalesce = bool(c["coalesce"])
+        self._requests = TokenBucket(float(c["requests_per_minute"]))
+        self._tokens = TokenBucket(float(c["tokens_per_minute"]))
+        self._flights = SingleFlight()
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+        self._waiting = 0
+        self._waits = collections.deque(maxlen=500)
+        self.counts = dict.fromkeys(("calls", "coalesced", "sent", "queued", "shed", "rate_limited", "retries",
+                                     "failed"), 0)
+
+    def _count(self, key: str, n: int = 1):
+        with self._lock:
+            self.counts[key] += n
+
+    def acquire(self, tokens: int, deadline: Optional[float] = None):
+        """Reserve one request and `tokens` tokens, sleeping until they are available.
+
+        Raises LLMRateLimited without reserving anything if the wait would run past `deadline`
+        (a time.monotonic() value) or max_queue calls are already waiting.
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = max(self._requests.wait_for(1, now), self._tokens.wait_for(tokens, now),
+                       self._paused_until - now)
+            if wait > 0 and (self._waiting >= self.max_queue or (deadline is not None and now + wait > deadline)):
+                self.counts["shed"] += 1
+                reason = (f"{self._waiting} calls already waiting" if self._waiting >= self.max_queue
+                          else f"next slot in {wait:.1f}s is past the deadline")
+                raise LLMRateLimited(f"LLM rate limit: {reason}", retry_after=max(wait, 1.0))
+            self._requests.take(1)
+            self._tokens.take(tokens)
+            self._waits.append(max(0.0, wait))
+            if wait > 0:
+                self.counts["queued"] += 1
+                self._waiting += 1
+        if wait > 0:
+            try:
+                time.sleep(wait)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+
+    def pause(self, seconds: float):
+        """Hold back every call for `seconds`, as a provider 429 asks."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def call(self, key: Optional[str], fn: Callable, prompt_tokens: int, timeout: Optional[float] = None):
+        """Run `fn` (one model request) under the limits; concurrent calls with the same key share it.
+
+        `timeout` is how long the caller may wait to be admitted (queue_timeout_seconds when None);
+        a negative value waits without a deadline.
+        """
+        timeout = self.queue_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout if timeout >= 0 else None
+        tokens = prompt_tokens + self.max_output_tokens
+        self._count("calls")
+        if key is None or not self.coalesce:
+            return self._send(fn, tokens, deadline)
+        result, shared = self._flights.do(key, lambda: self._send(fn, tokens, deadline))
+        if shared:
+            self._count("coalesced")
+        return result
+
+    def _send(self, fn: Callable, tokens: int, deadline: Optional[float]):
+        attempts = 0
+        while True:
+            self.acquire(tokens, deadline)
+            try:
+                self._count("sent")
+                return fn()
+            except Exception as e:
+                retry_after = rate_limit_retry_after(e)
+                if retry_after is None:
+                    self._count("failed")
+                    raise
+                self._count("rate_limited")
+                retry_after = retry_after or self.default_retry_after
+                self.pause(retry_after)
+                if attempts >= self.max_retries:
+                    self._count("shed")
+                    raise LLMRateLimited(f"LLM provider rate limit persisted after {attempts} retries",
+                                         retry_after=retry_after) from e
+                attempts += 1
+                self._count("retries")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counts = dict(self.counts)
+            waits = sorted(self._waits)
+            now = time.monotonic()
+            self._requests.wait_for(0, now)  # refill to now
+            self._tokens.wait_for(0, now)
+            state = {
+                "waiting": self._waiting,
+                "paused_seconds": round(max(0.0, self._paused_until - now), 2),
+                "requests_available": round(self._requests.level, 2),
+                "tokens_available": round(self._tokens.level),
+            }
+
+        def pct(p):
+            return round(waits[max(0, min(len(waits) - 1, int(round(p / 100.0 * len(waits))) - 1))] * 1000, 2) \
+                if waits else None
+
+        return dict(counts, in_flight=self._flights.in_flight(), limits={k: self.config[k] for k in DEFAULTS},
+                    queue_wait_ms={"samples": len(waits), "p50": pct(50), "p99": pct(99), "max": pct(100)},
+                    **state)
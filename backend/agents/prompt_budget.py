@@ -0,0 +1,132 @@
+"""Pack the most useful parts of a resume into a fixed LLM token budget.
+
+The resume is split into sections using the same MAJOR_SECTION_HINTS the
+field extractors use. Every section first gets a short head so nothing is
+dropped outright; the remaining budget goes to sections in priority order
+(experience and projects before hobbies). Kept lines stay in their original
+order.
+"""
+import math
+import re
+import textwrap
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from backend.services.resume_service import EMAIL_RE, MAJOR_SECTION_HINTS, contains_phone_number
+
+DEFAULT_TOKEN_BUDGET = 1000
+SECTION_HEAD_TOKENS = 60
+MAX_LINE_CHARS = 300
+
+# Higher weight is packed first; unlisted hints get 2
+SECTION_WEIGHTS = {
+    "experience": 5, "work experience": 5, "employment": 5,
+    "projects": 4, "skills": 4,
+    "summary": 3, "objective": 3, "profile": 3,
+    "education": 2, "certification": 2, "certifications": 2, "awards": 2, "publications": 2,
+    "interests": 1, "languages": 1,
+    "header": 1,
+}
+HEADER_SECTION = "header"
+
+# Longest first so "work experience" wins over "experience"
+_HINTS_BY_LENGTH = sorted(MAJOR_SECTION_HINTS, key=len, reverse=True)
+_URL_RE = re.compile(r"https?://|www\.|linkedin\.com|github\.com", re.I)
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        print(f"tiktoken unavailable, estimating token counts: {e}")
+        return None
+
+
+def tokenizer_name() -> str:
+    return "tiktoken/o200k_base" if _encoding() is not None else "estimate"
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    enc = _encoding()
+    if enc is not None:
+        return len(enc.encode(text, disallowed_special=()))
+    # Roughly four characters per token for English prose
+    return math.ceil(len(text) / 4)
+
+
+def section_title(line: str) -> Optional[str]:
+    """The section hint a header line names, or None for body lines."""
+    if len(line.split()) > 4 or re.search(r"\d|@|http", line):
+        return None
+    low = line.lower()
+    return next((h for h in _HINTS_BY_LENGTH if h in low), None)
+
+
+def segment_resume(text: str) -> List[Tuple[str, List[str]]]:
+    """[(section title, lines)] in document order; the first entry holds whatever precedes the first header."""
+    sections: List[Tuple[str, List[str]]] = [(HEADER_SECTION, [])]
+    for raw in text.splitlines():
+        line = re.sub(r"\s+", " ", raw).strip()
+        if not line:
+            continue
+        title = section_title(line)
+        if title:
+            sections.append((title, [line]))
+            continue
+        if sections[-1][0] == HEADER_SECTION and (EMAIL_RE.search(line) or contains_phone_number(line) or _URL_RE.search(line)):
+            # Contact details cost tokens and tell the model nothing about the candidate
+            continue
+        # PDFs without line breaks come through as one huge line
+        sections[-1][1].extend(textwrap.wrap(line, MAX_LINE_CHARS) if len(line) > MAX_LINE_CHARS else [line])
+    return [(title, lines) for title, lines in sections if lines]
+
+
+def build_resume_context(text: str, budget: int = DEFAULT_TOKEN_BUDGET,
+                         head_tokens: int = SECTION_HEAD_TOKENS) -> Tuple[str, Dict]:
+    """Return (packed resume text, stats) with the text fitting in `budget` tokens."""
+    sections = segment_resume(text)
+    line_tokens = [[count_tokens(l) + 1 for l in lines] for _, lines in sections]
+    total = sum(sum(t) for t in line_tokens)
+
+    order = sorted(range(len(sections)), key=lambda i: (-SECTION_WEIGHTS.get(sections[i][0], 2), i))
+    kept = [0] * len(sections)
+    remaining = budget
+
+    def grow(i: int, limit: int):
+        nonlocal remaining
+        used = 0
+        while kept[i] < len(line_tokens[i]):
+            cost = line_tokens[i][kept[i]]
+            if cost > remaining or used + cost > limit:
+                break
+            kept[i] += 1
+            used += cost
+            remaining -= cost
+
+    if total > budget:
+        # Pass 1: a head of every section, so long experience blocks cannot starve the rest
+        for i in order:
+            grow(i, head_tokens)
+        # Pass 2: fill by priority
+        for i in order:
+            grow(i, budget)
+    else:
+        kept = [len(lines) for _, lines in sections]
+
+    blocks, summary = [], []
+    for (title, lines), n in zip(sections, kept):
+        if n:
+            blocks.append("\n".join(lines[:n]))
+        summary.append({"section": title, "lines_kept": n, "lines_total": len(lines)})
+    context = "\n\n".join(blocks)
+    return context, {
+        "budget": budget,
+        "resume_tokens": count_tokens(context),
+        "resume_tokens_available": total,
+        "sections": summary,
+        "tokenizer": tokenizer_name(),
+    }
@@ -1,20 +1,87 @@
 import os
-import toml
+import json
+import hashlib
+import threading
+import textwrap
+from typing import Dict, List, Optional
+from backend.config import get_settings
+from backend.agents.llm_limiter import LLMLimiter, LLMRateLimited
+from backend.agents.prompt_budget import DEFAULT_TOKEN_BUDGET, build_resume_context, count_tokens
+
+ANALYSIS_TEMPLATE = textwrap.dedent("""\
+    You are an expert HR AI assistant. Analyze the following resume text.
+
+    RESUME TEXT:
+    {resume_text}
+
+    Please provide:
+    1. "professional_summary": A brief professional summary (max 3 sentences).
+    2. "sentiment_analysis": Sentiment analysis of the candidate's tone (Confident, Passive, Academic, etc.).
+    3. "top_functional_skills": A list of top 5 functional skills.
+    4. "hiring_potential_score": A "Hiring Potential" score from 1-10 based on clarity and depth.
+
+    Output as a valid JSON object only. Do not include any markdown formatting or backticks.
+""")
+
+FIELD_EXTRACTION_TEMPLATE = textwrap.dedent("""\
+    You extract candidate details from resume excerpts. Each item lists the fields to extract
+    ("name", "email", "mobile", "education") and the excerpt that should contain them.
+    Use null when the excerpt does not state the value; never guess. "education" is a list of
+    degree entries such as "B.Tech Computer Science, IIT Bombay".
+
+    ITEMS:
+    {items}
+
+    Output a valid JSON object mapping each item id to an object with the requested fields only.
+    Do not include any markdown formatting or backticks.
+""")
+
+
+def _strip_code_fences(content: str) -> str:
+    content = content.strip()
+    # Clean up potential markdown code blocks
+    if content.startswith("```json"):
+        content = content[7:]
+    if content.startswith("```"):
+        content = content[3:]
+    if content.endswith("```"):
+        content = content[:-3]
+    return content.strip()
 
 class ResumeAnalyzerAgent:
-    def __init__(self):
-        self.llm = self._get_llm()
-    
+    def __init__(self, limiter: Optional[LLMLimiter] = None):
+        self._llm = None
+        self._llm_ready = False
+        self._llm_lock = threading.Lock()
+        self.token_budget = int(get_settings().get("openai", {}).get("analysis_token_budget", DEFAULT_TOKEN_BUDGET))
+        self.limiter = limiter or LLMLimiter(get_settings().get("llm", {}))
+
+    @property
+    def llm(self):
+        # Built on first use: importing langchain and creating the client is slow
+        if not self._llm_ready:
+            with self._llm_lock:
+                if not self._llm_ready:
+                    self._llm = self._get_llm()
+                    self._llm_ready = True
+        return self._llm
+
     def _get_llm(self):
+        openai_config = get_settings().get("openai", {})
+        provider = os.getenv("LLM_PROVIDER") or openai_config.get("provider", "openai")
+        if provider == "fake":
+            from backend.agents.fake_llm import FakeLLM
+            return FakeLLM(latency_ms=float(openai_config.get("fake_latency_ms", 0)),
+                           jitter_ms=float(openai_config.get("fake_jitter_ms", 0)),
+                           requests_per_minute=int(openai_config.get("fake_requests_per_minute", 0)),
+                           error_429_rate=float(openai_config.get("fake_429_rate", 0)))
+
         # Load API Key
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
-            if os.path.exists("secrets.toml"):
-                secrets = toml.load("secrets.toml")
-                api_key = secrets.get("OPENAI_API_KEY") or secrets.get("openai_api_key")
-            elif os.path.exists("../secrets.toml"):
-                secrets = toml.load("../secrets.toml")
-                api_key = secrets.get("OPENAI_API_KEY") or secrets.get("openai_api_key")
+            secrets = get_settings()
+            api_key = (secrets.get("OPENAI_API_KEY") or secrets.get("openai_api_key")
+                       or secrets.get("openai", {}).get("api_key"))
         
         if not api_key:
             # Fallback or error - for now returning None to avoid crash during import if not set
@@ -23,53 +90,61 @@ class ResumeAnalyzerAgent:
         from langchain_openai import ChatOpenAI
         return ChatOpenAI(temperature=0, openai_api_key=api_key, model_name="gpt-4o-mini")
 
-    def analyze_sentiment_and_summary(self, resume_text: str) -> dict:
+    def _invoke(self, name: str, template: str, variables: Dict, timeout: Optional[float] = None):
+        """One model call through the limiter; identical concurrent prompts share a single call."""
+        from langchain_core.prompts import PromptTemplate
+        prompt = PromptTemplate(template=template, input_variables=list(variables))
+        rendered = prompt.format(**variables)
+        key = f"{name}:{hashlib.sha256(rendered.encode('utf-8')).hexdigest()}"
+        chain = prompt | self.llm
+        return self.limiter.call(key, lambda: chain.invoke(variables), count_tokens(rendered), timeout)
+
+    def analyze_sentiment_and_summary(self, resume_text: str, token_budget: Optional[int] = None,
+                                      timeout: Optional[float] = None) -> dict:
+        """Raises LLMRateLimited when the call is shed; other failures come back as {"error": ...}."""
         if not self.llm:
             return {"error": "LLM not configured"}
 
-        template = """
-        You are an expert HR AI assistant. Analyze the following resume text.
-        
-        RESUME TEXT:
-        {resume_text}
-        
-        Please provide:
-        1. "professional_summary": A brief professional summary (max 3 sentences).
-        2. "sentiment_analysis": Sentiment analysis of the candidate's tone (Confident, Passive, Academic, etc.).
-        3. "top_functional_skills": A list of top 5 functional skills.
-        4. "hiring_potential_score": A "Hiring Potential" score from 1-10 based on clarity and depth.
-        
-        Output as a valid JSON object only. Do not include any markdown formatting or backticks.
-        """
-        
-        from langchain_core.prompts import PromptTemplate
-        prompt = PromptTemplate(template=template, input_variables=["resume_text"])
-        chain = prompt | self.llm
-        
+        context, usage = build_resume_context(resume_text, token_budget or self.token_budget)
+        usage["tokens_sent"] = count_tokens(ANALYSIS_TEMPLATE.format(resume_text=context))
+        print(f"Resume analysis prompt: {usage['tokens_sent']} tokens "
+              f"({usage['resume_tokens']} of {usage['resume_tokens_available']} resume tokens)")
+
         try:
-            response = chain.invoke({"resume_text": resume_text[:4000]}) # Truncate for token limits if needed
-            
-            content = response.content.strip()
-            # Clean up potential markdown code blocks
-            if content.startswith("```json"):
-                content = content[7:]
-            if content.startswith("```"):
-                content = content[3:]
-            if content.endswith("```"):
-                content = content[:-3]
-            
-            import json
+            response = self._invoke("analysis", ANALYSIS_TEMPLATE, {"resume_text": context}, timeout)
+
+            content = _strip_code_fences(response.content)
             try:
-                return json.loads(content.strip())
+                result = json.loads(content)
             except json.JSONDecodeError:
                 # Fallback if parsing fails, but return structure so it doesn't break frontend
-                return {
+                result = {
                     "error": "Failed to parse JSON",
                     "raw_content": content
                 }
-                
+            if isinstance(result, dict):
+                result["token_usage"] = usage
+            return result
+
+        except LLMRateLimited:
+            raise
         except Exception as e:
-            return {"error": str(e)}
+            return {"error": str(e), "token_usage": usage}
+
+    def extract_fields_batch(self, items: List[Dict]) -> Dict[str, Dict]:
+        """One LLM call for several resumes' low-confidence fields.
+
+        `items` are {"id", "fields", "excerpt"}; returns {id: {field: value or None}}.
+        Raises when the LLM is unavailable or its answer is not JSON, so callers can count the failure.
+        """
+        if not self.llm:
+            raise RuntimeError("LLM not configured")
+
+        response = self._invoke("fields", FIELD_EXTRACTION_TEMPLATE, {"items": json.dumps(items, ensure_ascii=False)})
+        result = json.loads(_strip_code_fences(response.content))
+        if not isinstance(result, dict):
+            raise ValueError("Field extraction response is not a JSON object")
+        return result
 
     def generate_job_description(self, role: str, experience: str, skills: str) -> str:
         if not self.llm:
@@ -93,16 +168,14 @@ class ResumeAnalyzerAgent:
         Tone: Professional, Engaging.
         """
         
-        from langchain_core.prompts import PromptTemplate
-        prompt = PromptTemplate(template=template, input_variables=["role", "experience", "skills"])
-        chain = prompt | self.llm
-        
         try:
-            response = chain.invoke({
+            response = self._invoke("job_description", template, {
                 "role": role, 
                 "experience": experience, 
                 "skills": skills
             })
             return response.content
+        except LLMRateLimited:
+            raise
         except Exception as e:
             return f"Error generating JD: {str(e)}"
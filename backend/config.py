@@ -0,0 +1,24 @@
+import os
+from functools import lru_cache
+
+import toml
+
+SECRETS_PATHS = ("secrets.toml", "../secrets.toml")
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> dict:
+    """Load secrets.toml once per process.
+
+    SECRETS_FILE overrides the search path. A missing or unreadable file yields
+    empty settings so callers fall back to environment variables and defaults.
+    """
+    paths = [os.environ["SECRETS_FILE"]] if os.getenv("SECRETS_FILE") else SECRETS_PATHS
+    for path in paths:
+        if os.path.exists(path):
+            try:
+                return toml.load(path)
+            except Exception as e:
+                print(f"Warning: Could not load {path}: {e}")
+                return {}
+    return {}
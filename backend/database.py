@@ -1,25 +1,54 @@
 import os
+import time
+import itertools
+import threading
+import contextvars
 import psycopg2
+import psycopg2.extensions
 from psycopg2.extras import RealDictCursor
-import toml
-from typing import Generator, Optional
+from backend.config import get_settings
+from typing import Dict, Generator, Hashable, List, Optional
+
+# Workload lane of the code running in this context (see services/workload.py);
+# connections opened inside a lane count against that lane's reservation
+current_lane: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_lane", default=None)
+_lane_slots: Dict[str, threading.BoundedSemaphore] = {}
+_lane_limits: Dict[str, int] = {}
+LANE_CONNECTION_WAIT_SECONDS = 30
+
+def configure_lane_connections(limits: Dict[str, int]):
+    """Cap concurrent connections per lane, e.g. {"interactive": 8, "bulk": 3}."""
+    for lane, limit in limits.items():
+        _lane_slots[lane] = threading.BoundedSemaphore(limit)
+        _lane_limits[lane] = limit
+
+def lane_connections_in_use() -> Dict[str, Dict[str, int]]:
+    # _value is the number of free slots; there is no public accessor
+    return {lane: {"in_use": _lane_limits[lane] - slots._value, "limit": _lane_limits[lane]}
+            for lane, slots in _lane_slots.items()}
+
+class _LaneConnection(psycopg2.extensions.connection):
+    """Connection that gives its lane slot back when closed."""
+    _slot = None
+
+    def _release(self):
+        slot, self._slot = self._slot, None
+        if slot is not None:
+            slot.release()
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._release()
+
+    def __del__(self):
+        self._release()
 
 def get_db_config():
     """Load database config from secrets.toml or environment variables."""
-    config = {}
-    if os.path.exists("secrets.toml"):
-        try:
-            secrets = toml.load("secrets.toml")
-            config = secrets.get('database', {})
-        except Exception as e:
-            print(f"Warning: Could not load secrets.toml: {e}")
-    elif os.path.exists("../secrets.toml"):
-        try:
-            secrets = toml.load("../secrets.toml")
-            config = secrets.get('database', {})
-        except Exception as e:
-            print(f"Warning: Could not load ../secrets.toml: {e}")
-    
+    config = get_settings().get('database', {})
+
     return {
         'host': config.get('host', os.getenv('DB_HOST', 'localhost')),
         'database': config.get('name', os.getenv('DB_NAME', 'resume_analyzer')),
@@ -28,13 +57,161 @@ def get_db_config():
         'port': config.get('port', os.getenv('DB_PORT', '5432'))
     }
 
-def get_db_connection():
-    """Create a new database connection."""
+# --- Read replicas ---
+# Read-only service methods ask for get_db_connection(readonly=True). Those go to a
+# replica that is up and within max_replica_lag_seconds of the primary; everything
+# else, and reads of a scope written in the last read_your_writes_seconds, go to
+# the primary.
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        -- Everything received is replayed: caught up, however long ago the last commit was
+        WHEN pg_last_wal_receive_lsn() <= pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+class _ReplicaState:
+    def __init__(self, config: Dict):
+        self.config = config
+        self.checked_at = float("-inf")
+        self.unavailable_until = float("-inf")
+        self.lag: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.reads = 0
+
+_replicas: Optional[List[_ReplicaState]] = None
+_replicas_lock = threading.Lock()
+_replica_turn = itertools.count()
+_recent_writes: Dict[Hashable, float] = {}
+_routing_counts = {"replica": 0, "primary_fallback": 0, "read_your_writes": 0}
+
+def get_replica_settings() -> Dict:
+    config = get_settings().get('database', {})
+    return {
+        'max_lag_seconds': float(config.get('max_replica_lag_seconds', 5)),
+        'check_seconds': float(config.get('replica_check_seconds', 2)),
+        'retry_seconds': float(config.get('replica_retry_seconds', 30)),
+        'read_your_writes_seconds': float(config.get('read_your_writes_seconds', 10)),
+        # Whole seconds, as libpq takes it
+        'connect_timeout_seconds': int(config.get('replica_connect_timeout_seconds', 2)),
+    }
+
+def get_replica_configs() -> List[Dict]:
+    """Connection settings of each replica: [[database.replicas]] entries or DB_REPLICAS=host[:port],...
+
+    Anything a replica entry leaves out (database name, user, password) is taken from the primary.
+    """
+    primary = get_db_config()
+    entries = get_settings().get('database', {}).get('replicas')
+    if entries is None:
+        entries = []
+        for item in filter(None, (h.strip() for h in os.getenv('DB_REPLICAS', '').split(','))):
+            host, _, port = item.rpartition(':')
+            if not port.isdigit():
+                host, port = item, primary['port']
+            entries.append({'host': host, 'port': port})
+    return [dict(primary, database=e.get('name', primary['database']),
+                 **{k: e[k] for k in ('host', 'port', 'user', 'password') if k in e})
+            for e in entries]
+
+def _replica_states() -> List[_ReplicaState]:
+    global _replicas
+    if _replicas is None:
+        with _replicas_lock:
+            if _replicas is None:
+                _replicas = [_ReplicaState(c) for c in get_replica_configs()]
+    return _replicas
+
+def note_write(scope: Hashable):
+    """Record that `scope` (e.g. ("resumes", user_id)) was just written, so its reads stay on the primary."""
+    if _replica_states():
+        _recent_writes[scope] = time.monotonic()
+
+def _wrote_recently(scope: Optional[Hashable], window: float) -> bool:
+    written = _recent_writes.get(scope) if scope is not None else None
+    if written is None:
+        return False
+    if time.monotonic() - written >= window:
+        _recent_writes.pop(scope, None)
+        return False
+    return True
+
+def _connect_replica():
+    """A connection to a healthy replica, or None when every replica is down or lagging."""
+    states = _replica_states()
+    settings = get_replica_settings()
+    start = next(_replica_turn)
+    for i in range(len(states)):
+        state = states[(start + i) % len(states)]
+        now = time.monotonic()
+        if now < state.unavailable_until:
+            continue
+        try:
+            # A replica that drops packets would otherwise hold every read until the OS gives up on TCP
+            conn = psycopg2.connect(**state.config, connection_factory=_LaneConnection,
+                                    connect_timeout=settings['connect_timeout_seconds'])
+        except Exception as e:
+            state.unavailable_until = now + settings['retry_seconds']
+            state.last_error = str(e)
+            print(f"Replica {state.config['host']}:{state.config['port']} unavailable: {e}")
+            continue
+        if now - state.checked_at >= settings['check_seconds']:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(REPLICA_LAG_SQL)
+                    state.lag = float(cur.fetchone()[0])
+                conn.rollback()
+                state.checked_at = now
+            except Exception as e:
+                state.lag = None
+                state.last_error = str(e)
+            if state.lag is None or state.lag > settings['max_lag_seconds']:
+                # Lagging replicas sit out until the next check
+                state.unavailable_until = now + settings['check_seconds']
+                conn.close()
+                continue
+        conn.set_session(readonly=True)
+        state.reads += 1
+        return conn
+    return None
+
+def replica_status() -> Dict:
+    now = time.monotonic()
+    return {
+        "replicas": [{
+            "host": s.config['host'], "port": s.config['port'],
+            "available": now >= s.unavailable_until,
+            "lag_seconds": s.lag, "reads": s.reads, "last_error": s.last_error,
+        } for s in _replica_states()],
+        "routing": dict(_routing_counts),
+    }
+
+def get_db_connection(readonly: bool = False, scope: Optional[Hashable] = None):
+    """Create a new database connection.
+
+    readonly=True allows a read replica (see above); `scope` names what the
+    caller reads, for read-your-writes after note_write(scope).
+    """
     config = get_db_config()
+    slot = _lane_slots.get(current_lane.get())
+    if slot is not None and not slot.acquire(timeout=LANE_CONNECTION_WAIT_SECONDS):
+        raise TimeoutError(f"No database connection free in the {current_lane.get()} lane")
     try:
-        conn = psycopg2.connect(**config)
+        conn = None
+        if readonly and _replica_states():
+            if _wrote_recently(scope, get_replica_settings()['read_your_writes_seconds']):
+                _routing_counts["read_your_writes"] += 1
+            else:
+                conn = _connect_replica()
+                _routing_counts["replica" if conn is not None else "primary_fallback"] += 1
+        if conn is None:
+            conn = psycopg2.connect(**config, connection_factory=_LaneConnection)
+        conn._slot = slot
         return conn
     except Exception as e:
+        if slot is not None:
+            slot.release()
         print(f"Database connection failed: {e}")
         raise e
 
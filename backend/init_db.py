@@ -1,4 +1,10 @@
 from backend.database import get_db_connection
+from backend.services.feedback_service import rebuild_scorecards
+from backend.services.pipeline_service import backfill_candidates
+from backend.services.scheduling_service import cancel_overlapping_interviews
+from backend.services.dedup_service import backfill_signatures
+from backend.services.candidate_search_service import create_search_indexes
+from backend.services.tenant_service import stash_unpartitioned_tables, restore_stashed_tables
 
 def init_db():
     conn = get_db_connection()
@@ -32,27 +38,32 @@ def init_db():
                 )
             """)
 
+            # Resume tables are LIST-partitioned by user_id, one partition per tenant
+            # (see tenant_service); tables from before partitioning are migrated in place
+            migrating = stash_unpartitioned_tables(cur)
+
             # Resume Files
             cur.execute("""
                 CREATE TABLE IF NOT EXISTS resume_files (
-                    id SERIAL PRIMARY KEY,
-                    user_id INTEGER REFERENCES users(id),
+                    id SERIAL,
+                    user_id INTEGER NOT NULL REFERENCES users(id),
                     filename VARCHAR(255) NOT NULL,
                     file_size INTEGER,
                     file_type VARCHAR(20),
                     processed BOOLEAN DEFAULT FALSE,
                     upload_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     session_id VARCHAR(50),
+                    PRIMARY KEY (user_id, id),
                     UNIQUE(user_id, filename)
-                )
+                ) PARTITION BY LIST (user_id)
             """)
 
             # Resume Data
             cur.execute("""
                 CREATE TABLE IF NOT EXISTS resume_data (
-                    id SERIAL PRIMARY KEY,
-                    resume_file_id INTEGER REFERENCES resume_files(id) ON DELETE CASCADE,
-                    user_id INTEGER REFERENCES users(id),
+                    id SERIAL,
+                    resume_file_id INTEGER,
+                    user_id INTEGER NOT NULL REFERENCES users(id),
                     candidate_name VARCHAR(100),
                     candidate_email VARCHAR(100),
                     candidate_phone VARCHAR(50),
@@ -61,9 +72,27 @@ def init_db():
                     extracted_text TEXT,
                     interview_status VARCHAR(20),
                     last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(resume_file_id)
-                )
+                    -- Near-duplicate detection: MinHash signature and the first upload of the cluster
+                    minhash BYTEA,
+                    duplicate_of INTEGER,
+                    PRIMARY KEY (user_id, id),
+                    UNIQUE(user_id, resume_file_id),
+                    FOREIGN KEY (user_id, resume_file_id) REFERENCES resume_files(user_id, id) ON DELETE CASCADE,
+                    FOREIGN KEY (user_id, duplicate_of) REFERENCES resume_data(user_id, id)
+                        ON DELETE SET NULL (duplicate_of)
+                ) PARTITION BY LIST (user_id)
             """)
+            # Lookups by id alone (GET /resume/{id}, analyses) cannot use the (user_id, id) key
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_resume_data_id ON resume_data (id)")
+
+            # Candidate search (/candidates/search): phone numbers are matched on their digits alone
+            cur.execute("""
+                ALTER TABLE resume_data ADD COLUMN IF NOT EXISTS candidate_phone_digits TEXT
+                GENERATED ALWAYS AS (regexp_replace(candidate_phone, '[^0-9]', '', 'g')) STORED
+            """)
+            create_search_indexes(cur)
+            # Exports (/export/candidates) read a tenant in last_updated order for incremental syncs
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_resume_data_last_updated ON resume_data (user_id, last_updated, id)")
 
             # Interview Schedules
             cur.execute("""
@@ -82,6 +111,31 @@ def init_db():
                 )
             """)
 
+            # No two live interviews may overlap for the same interviewer, even under
+            # concurrent booking; needs btree_gist for the equality part of the constraint
+            cur.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+            cur.execute("SELECT 1 FROM pg_constraint WHERE conname = 'interview_schedules_no_overlap'")
+            if not cur.fetchone():
+                # Double bookings made before the constraint existed would make adding it fail
+                for c in cancel_overlapping_interviews(cur):
+                    print(f"Cancelled interview {c['id']} ({c['candidate_email']}, interviewer {c['interviewer_id']} "
+                          f"at {c['scheduled_time']}): overlaps interview {c['overlaps']}")
+            cur.execute("""
+                DO $$
+                BEGIN
+                    IF NOT EXISTS (
+                        SELECT 1 FROM pg_constraint WHERE conname = 'interview_schedules_no_overlap'
+                    ) THEN
+                        ALTER TABLE interview_schedules ADD CONSTRAINT interview_schedules_no_overlap
+                        EXCLUDE USING gist (
+                            interviewer_id WITH =,
+                            tsrange(scheduled_time,
+                                    scheduled_time + COALESCE(duration_minutes, 30) * INTERVAL '1 minute') WITH &&
+                        ) WHERE (status <> 'cancelled');
+                    END IF;
+                END $$;
+            """)
+
             # Interview Feedback
             cur.execute("""
                 CREATE TABLE IF NOT EXISTS interview_feedback (
@@ -101,6 +155,221 @@ def init_db():
                 )
             """)
 
+            # Per-candidate feedback aggregates, maintained on every feedback submit
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS candidate_scorecards (
+                    candidate_email VARCHAR(100) PRIMARY KEY,
+                    candidate_name VARCHAR(100),
+                    feedback_count INTEGER NOT NULL DEFAULT 0,
+                    technical_skills_sum INTEGER NOT NULL DEFAULT 0,
+                    technical_skills_count INTEGER NOT NULL DEFAULT 0,
+                    communication_skills_sum INTEGER NOT NULL DEFAULT 0,
+                    communication_skills_count INTEGER NOT NULL DEFAULT 0,
+                    overall_rating_sum INTEGER NOT NULL DEFAULT 0,
+                    overall_rating_count INTEGER NOT NULL DEFAULT 0,
+                    recommendation_sum INTEGER NOT NULL DEFAULT 0,
+                    recommendation_count INTEGER NOT NULL DEFAULT 0,
+                    avg_technical_skills NUMERIC GENERATED ALWAYS AS
+                        (technical_skills_sum::numeric / NULLIF(technical_skills_count, 0)) STORED,
+                    avg_communication_skills NUMERIC GENERATED ALWAYS AS
+                        (communication_skills_sum::numeric / NULLIF(communication_skills_count, 0)) STORED,
+                    avg_overall_rating NUMERIC GENERATED ALWAYS AS
+                        (overall_rating_sum::numeric / NULLIF(overall_rating_count, 0)) STORED,
+                    avg_recommendation NUMERIC GENERATED ALWAYS AS
+                        (recommendation_sum::numeric / NULLIF(recommendation_count, 0)) STORED,
+                    last_feedback_at TIMESTAMP
+                )
+            """)
+            for column in ("avg_overall_rating", "avg_technical_skills", "avg_communication_skills",
+                           "avg_recommendation", "feedback_count", "last_feedback_at"):
+                cur.execute(f"""
+                    CREATE INDEX IF NOT EXISTS idx_scorecards_{column}
+                    ON candidate_scorecards ({column} DESC NULLS LAST, candidate_email)
+                """)
+            cur.execute("SELECT EXISTS (SELECT 1 FROM candidate_scorecards)")
+            if not cur.fetchone()[0]:
+                rebuild_scorecards(cur)
+
+            # Candidate pipeline: one row per person (by email) with their current stage
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS candidates (
+                    id SERIAL PRIMARY KEY,
+                    email VARCHAR(100) UNIQUE NOT NULL,
+                    name VARCHAR(100),
+                    phone VARCHAR(50),
+                    stage VARCHAR(30) NOT NULL DEFAULT 'applied',
+                    stage_updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS candidate_stage_events (
+                    id BIGSERIAL PRIMARY KEY,
+                    candidate_id INTEGER REFERENCES candidates(id) ON DELETE CASCADE,
+                    stage VARCHAR(30) NOT NULL,
+                    entered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            cur.execute("ALTER TABLE resume_data ADD COLUMN IF NOT EXISTS candidate_id INTEGER REFERENCES candidates(id)")
+            cur.execute("ALTER TABLE interview_schedules ADD COLUMN IF NOT EXISTS candidate_id INTEGER REFERENCES candidates(id)")
+            # Funnel counts are index-only scans; email lookups no longer scan resume_data
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_candidates_stage ON candidates (stage, stage_updated_at)")
+            # Incremental exports also send resumes whose candidate changed stage since the last sync
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_candidates_stage_updated ON candidates (stage_updated_at)")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_stage_events_entered ON candidate_stage_events (entered_at, stage)")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_stage_events_candidate ON candidate_stage_events (candidate_id)")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_resume_data_email ON resume_data (lower(candidate_email))")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_resume_data_candidate ON resume_data (candidate_id)")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_interview_schedules_candidate ON interview_schedules (candidate_id)")
+            cur.execute("SELECT EXISTS (SELECT 1 FROM candidates)")
+            if not cur.fetchone()[0]:
+                backfill_candidates(cur)
+
+            # Onboarding
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS onboarding_tasks (
+                    id SERIAL PRIMARY KEY,
+                    candidate_email VARCHAR(255),
+                    status VARCHAR(50),
+                    offer_letter_text TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            cur.execute("ALTER TABLE onboarding_tasks ADD COLUMN IF NOT EXISTS candidate_id INTEGER REFERENCES candidates(id)")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_onboarding_tasks_candidate ON onboarding_tasks (candidate_id)")
+
+            # Outbound email, written in the same transaction as the event that triggers it
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS email_outbox (
+                    id SERIAL PRIMARY KEY,
+                    recipient VARCHAR(255) NOT NULL,
+                    subject VARCHAR(255),
+                    body TEXT,
+                    interview_id INTEGER REFERENCES interview_schedules(id) ON DELETE SET NULL,
+                    status VARCHAR(20) DEFAULT 'pending',
+                    attempts INTEGER DEFAULT 0,
+                    last_error TEXT,
+                    next_attempt_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    claimed_at TIMESTAMP,
+                    sent_at TIMESTAMP,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_email_outbox_due
+                ON email_outbox (next_attempt_at) WHERE status IN ('pending', 'sending')
+            """)
+
+            # Near-duplicate detection: LSH bucket rows for candidate lookup, scoped to the tenant
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_resume_data_duplicate_of ON resume_data (duplicate_of)")
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS resume_lsh_bands (
+                    user_id INTEGER NOT NULL,
+                    bucket BIGINT NOT NULL,
+                    resume_id INTEGER NOT NULL,
+                    PRIMARY KEY (user_id, bucket, resume_id),
+                    FOREIGN KEY (user_id, resume_id) REFERENCES resume_data(user_id, id) ON DELETE CASCADE
+                ) PARTITION BY LIST (user_id)
+            """)
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_resume_lsh_bands_resume ON resume_lsh_bands (user_id, resume_id)")
+
+            # LLM analyses precomputed in the background after ingest
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS resume_analysis (
+                    resume_id INTEGER PRIMARY KEY,
+                    user_id INTEGER NOT NULL,
+                    status VARCHAR(20) NOT NULL,
+                    analysis JSONB,
+                    tokens_sent INTEGER,
+                    text_md5 CHAR(32),
+                    error TEXT,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            cur.execute("ALTER TABLE resume_analysis ADD COLUMN IF NOT EXISTS user_id INTEGER")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_resume_analysis_user ON resume_analysis (user_id)")
+
+            if migrating:
+                tenants = restore_stashed_tables(cur)
+                print(f"Partitioned resume tables for {len(tenants)} tenants")
+                cur.execute("""
+                    UPDATE resume_analysis ra SET user_id = rd.user_id
+                    FROM resume_data rd WHERE rd.id = ra.resume_id
+                """)
+                cur.execute("DELETE FROM resume_analysis WHERE user_id IS NULL")
+            cur.execute("""
+                DO $$
+                BEGIN
+                    IF NOT EXISTS (
+                        SELECT 1 FROM pg_constraint WHERE conname = 'resume_analysis_resume_fkey'
+                    ) THEN
+                        ALTER TABLE resume_analysis ALTER COLUMN user_id SET NOT NULL;
+                        ALTER TABLE resume_analysis ADD CONSTRAINT resume_analysis_resume_fkey
+                        FOREIGN KEY (user_id, resume_id) REFERENCES resume_data(user_id, id) ON DELETE CASCADE;
+                    END IF;
+                END $$;
+            """)
+
+            # Standing JDs: saved JDs, a term -> JD reverse index, and the resumes each one matched at ingest
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS standing_jds (
+                    id SERIAL PRIMARY KEY,
+                    user_id INTEGER NOT NULL REFERENCES users(id),
+                    title VARCHAR(255),
+                    jd_text TEXT NOT NULL,
+                    term_count INTEGER NOT NULL,
+                    min_score DOUBLE PRECISION NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_standing_jds_user ON standing_jds (user_id)")
+            # The JD's size and threshold ride along in the index, so scoring never reads standing_jds
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS standing_jd_terms (
+                    user_id INTEGER NOT NULL,
+                    term TEXT NOT NULL,
+                    jd_id INTEGER NOT NULL REFERENCES standing_jds(id) ON DELETE CASCADE,
+                    jd_term_count INTEGER NOT NULL,
+                    min_score DOUBLE PRECISION NOT NULL,
+                    PRIMARY KEY (user_id, term, jd_id) INCLUDE (jd_term_count, min_score)
+                )
+            """)
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_standing_jd_terms_jd ON standing_jd_terms (jd_id)")
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS standing_jd_matches (
+                    id BIGSERIAL PRIMARY KEY,
+                    jd_id INTEGER NOT NULL REFERENCES standing_jds(id) ON DELETE CASCADE,
+                    user_id INTEGER NOT NULL,
+                    resume_id INTEGER NOT NULL,
+                    score DOUBLE PRECISION NOT NULL,
+                    matched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    notified_at TIMESTAMP,
+                    UNIQUE (jd_id, resume_id),
+                    FOREIGN KEY (user_id, resume_id) REFERENCES resume_data(user_id, id) ON DELETE CASCADE
+                )
+            """)
+            # Resumes ingested but not yet scored against the standing JDs (see StandingJDService.mark_pending)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS standing_jd_pending (
+                    user_id INTEGER NOT NULL,
+                    resume_id INTEGER NOT NULL,
+                    queued_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (user_id, resume_id),
+                    FOREIGN KEY (user_id, resume_id) REFERENCES resume_data(user_id, id) ON DELETE CASCADE
+                )
+            """)
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_standing_jd_pending_queued ON standing_jd_pending (queued_at)")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_standing_jd_matches_user ON standing_jd_matches (user_id, id)")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_standing_jd_matches_resume ON standing_jd_matches (user_id, resume_id)")
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_standing_jd_matches_pending
+                ON standing_jd_matches (id) WHERE notified_at IS NULL
+            """)
+
+            cur.execute("SELECT EXISTS (SELECT 1 FROM resume_data WHERE minhash IS NULL AND extracted_text <> '')")
+            if cur.fetchone()[0]:
+                backfill_signatures(cur)
+
             print("Database initialized successfully!")
             conn.commit()
     except Exception as e:
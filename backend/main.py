@@ -1,20 +1,42 @@
 import sys
 import os
+import math
+import uuid
 
 # Add project root to sys.path to allow running this script directly
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
 from pydantic import BaseModel
+import psycopg2.errors
 from typing import Dict, Optional, List
-from backend.services.resume_service import parse_resume, save_resume_to_db, save_resumes_batch
-from backend.database import get_db_connection
+from datetime import datetime, timezone
+from backend.services.resume_service import (
+    parse_resume, save_resume_to_db, save_resumes_batch, get_resume, register_ingest_hook, register_ingest_transaction_hook,
+)
+from backend.database import get_db_connection, note_write, replica_status
 from backend.services.scheduling_service import SchedulingService
 from backend.services.feedback_service import FeedbackService
 from backend.services.onboarding_service import OnboardingService
 from backend.agents.resume_analyzer import ResumeAnalyzerAgent
+from backend.agents.llm_limiter import LLMLimiter, LLMRateLimited
 from backend.services.matching_service import MatchingService
+from backend.services.pipeline_service import PipelineService
+from backend.services.email_service import EmailSender, get_delivery_status, get_outbox_summary
+from backend.services.extraction_fallback import apply_llm_fallback, get_fallback_stats
+from backend.services.tenant_service import drop_tenant_partitions
+from backend.services.standing_jd_service import StandingJDService
+from backend.services.candidate_search_service import CandidateSearchService
+from backend.services.export_service import ExportService, Export, MEDIA_TYPE as NDJSON
+from backend.services.parse_pool import ParsePool, ParseLimitExceeded
+from backend.services.workload import WorkloadScheduler, LaneFull, INTERACTIVE, BULK
+from backend.services.analysis_worker import AnalysisWorker, analyze_resume as compute_resume_analysis, get_analyses
+from backend.config import get_settings
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from fastapi.middleware.cors import CORSMiddleware
+from functools import lru_cache
 
 app = FastAPI(title="HR Automation Agent API")
 
@@ -26,35 +48,183 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Services
-scheduler = SchedulingService()
-feedback_service = FeedbackService()
-onboarding_service = OnboardingService()
-resume_agent = ResumeAnalyzerAgent()
-matcher_service = MatchingService()
+# Services are built on first use so importing the app stays cheap and never
+# reaches the network (Google discovery, LLM client setup) during startup
+@lru_cache(maxsize=None)
+def get_scheduler() -> SchedulingService:
+    return SchedulingService()
+
+@lru_cache(maxsize=None)
+def get_feedback_service() -> FeedbackService:
+    return FeedbackService()
+
+@lru_cache(maxsize=None)
+def get_onboarding_service() -> OnboardingService:
+    return OnboardingService()
+
+@lru_cache(maxsize=None)
+def get_llm_limiter() -> LLMLimiter:
+    return LLMLimiter(get_settings().get('llm', {}))
+
+@lru_cache(maxsize=None)
+def get_resume_agent() -> ResumeAnalyzerAgent:
+    return ResumeAnalyzerAgent(get_llm_limiter())
+
+@lru_cache(maxsize=None)
+def get_matcher_service() -> MatchingService:
+    matching_config = get_settings().get('matching', {})
+    return MatchingService(max_shards=int(matching_config.get('max_shards', 32)),
+                           shard_ttl_seconds=float(matching_config.get('shard_ttl_seconds', 300)))
+
+@lru_cache(maxsize=None)
+def get_pipeline_service() -> PipelineService:
+    return PipelineService()
+
+@lru_cache(maxsize=None)
+def get_email_sender() -> Optional[EmailSender]:
+    email_config = get_settings().get('email')
+    return EmailSender(email_config) if email_config else None
+
+@lru_cache(maxsize=None)
+def get_webhook_dispatcher():
+    webhook_config = get_settings().get('webhook', {})
+    if not webhook_config.get('url'):
+        return None
+    from backend.services.webhook_service import WebhookDispatcher
+    return WebhookDispatcher(webhook_config)
+
+@lru_cache(maxsize=None)
+def get_analysis_worker() -> Optional[AnalysisWorker]:
+    analysis_config = get_settings().get('analysis', {})
+    if not analysis_config.get('precompute', False):
+        return None
+    return AnalysisWorker(get_resume_agent(), analysis_config)
+
+@lru_cache(maxsize=None)
+def get_standing_jd_service() -> StandingJDService:
+    return StandingJDService(get_settings().get('standing_jds', {}), get_webhook_dispatcher())
+
+@lru_cache(maxsize=None)
+def get_candidate_search_service() -> CandidateSearchService:
+    return CandidateSearchService(get_settings().get('candidate_search', {}))
+
+@lru_cache(maxsize=None)
+def get_export_service() -> ExportService:
+    return ExportService(get_settings().get('export', {}))
+
+@lru_cache(maxsize=None)
+def get_parse_pool() -> Optional[ParsePool]:
+    parsing_config = get_settings().get('parsing', {})
+    if not parsing_config.get('isolated', True):
+        return None
+    return ParsePool(parsing_config)
+
+@lru_cache(maxsize=None)
+def get_workload_scheduler() -> WorkloadScheduler:
+    return WorkloadScheduler(get_settings().get('workload', {}))
+
+@app.on_event("startup")
+def start_email_sender():
+    if get_email_sender():
+        get_email_sender().start()
+
+@app.on_event("startup")
+def start_analysis_worker():
+    worker = get_analysis_worker()
+    if not worker:
+        return
+    register_ingest_hook(worker.enqueue)
+    worker.start()
+    try:
+        queued = worker.enqueue_backlog(int(get_settings()['analysis'].get('backlog_limit', 1000)))
+        print(f"Queued {queued} resumes for background analysis")
+    except Exception as e:
+        print(f"Could not queue analysis backlog: {e}")
+
+@app.on_event("startup")
+def start_standing_jds():
+    service = get_standing_jd_service()
+    register_ingest_transaction_hook(service.mark_pending)
+    register_ingest_hook(service.evaluate_resumes)
+    # Resumes whose evaluation failed or was cut short by a restart
+    try:
+        service.evaluate_resumes([])
+    except Exception as e:
+        print(f"Could not evaluate pending standing JD resumes: {e}")
+    # Matches recorded while the webhook was down or the app was stopped
+    service.schedule_push()
+
+@app.on_event("startup")
+def start_parse_pool():
+    if get_parse_pool():
+        get_parse_pool().warm()
+
+@app.on_event("shutdown")
+def stop_email_sender():
+    if get_email_sender():
+        get_email_sender().stop()
+
+@app.on_event("shutdown")
+def stop_analysis_worker():
+    if get_analysis_worker():
+        get_analysis_worker().stop()
+
+@app.on_event("shutdown")
+def stop_standing_jds():
+    get_standing_jd_service().shutdown()
+
+@app.on_event("shutdown")
+def stop_parse_pool():
+    if get_parse_pool():
+        get_parse_pool().shutdown()
+
+@app.on_event("shutdown")
+def stop_workload_lanes():
+    get_workload_scheduler().shutdown()
+
+def fill_low_confidence_fields(parsed: List[Dict]) -> List[Dict]:
+    """Ask the LLM for fields the regex extractors scored below the threshold, if enabled."""
+    config = get_settings().get('extraction', {})
+    if not config.get('llm_fallback', False):
+        return parsed
+    return apply_llm_fallback(parsed, get_resume_agent(),
+                              threshold=float(config.get('confidence_threshold', 0.6)),
+                              batch_size=int(config.get('llm_batch_size', 10)))
+
+def parse_upload(content: bytes, filename: str) -> Dict:
+    """parse_resume with text extraction in the isolated parser processes, unless [parsing] isolated = false."""
+    pool = get_parse_pool()
+    return parse_resume(content, filename, pool.extract) if pool else parse_resume(content, filename)
 
 def process_batch_files(files_data: List[Dict], user_id: int):
-    """Background task to process files and save to DB."""
+    """Bulk lane job: parse files and save them to the DB, yielding to interactive traffic."""
+    scheduler = get_workload_scheduler()
     try:
         # files_data is a list of {"filename": str, "content": bytes}
         parsed_data = []
         for f in files_data:
+            scheduler.admit_bulk()
             try:
-                data = parse_resume(f['content'], f['filename'])
+                data = parse_upload(f['content'], f['filename'])
                 parsed_data.append(data)
             except Exception as e:
+                # A file that times out or breaks a limit is skipped; the rest of the batch goes on
                 print(f"Error parsing {f['filename']}: {e}")
         
         if parsed_data:
+            fill_low_confidence_fields(parsed_data)
+            scheduler.admit_bulk()
             save_resumes_batch(parsed_data, user_id)
-            print(f"Values saved for batch of {len(parsed_data)} files")
+            get_matcher_service().invalidate(user_id)
+            duplicates = [d['filename'] for d in parsed_data if d.get('duplicate_of')]
+            print(f"Values saved for batch of {len(parsed_data)} files ({len(duplicates)} near-duplicates flagged)")
             
     except Exception as e:
         print(f"Batch processing failed: {e}")
 
 # --- Phase 2: Resume Screening ---
 @app.post("/resume/upload-batch")
-async def upload_resume_batch(background_tasks: BackgroundTasks, files: List[UploadFile] = File(...), user_id: int = 1):
+async def upload_resume_batch(files: List[UploadFile] = File(...), user_id: int = 1):
     try:
         # Read files into memory (careful with large batches, but 50 files * 1MB = 50MB is fine)
         # If files are too large, we should save to disk first. Assuming controlled batch size from frontend.
@@ -63,29 +233,51 @@ async def upload_resume_batch(background_tasks: BackgroundTasks, files: List[Upl
             content = await file.read()
             files_data.append({"filename": file.filename, "content": content})
         
-        background_tasks.add_task(process_batch_files, files_data, user_id)
+        get_workload_scheduler().submit(BULK, process_batch_files, files_data, user_id)
         
         return {"status": "processing", "message": f"Received {len(files)} files for processing in background."}
+    except LaneFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def parse_and_save_resume(content: bytes, filename: str, user_id: int) -> Dict:
+    data = parse_upload(content, filename)
+    fill_low_confidence_fields([data])
+    file_id = save_resume_to_db(data, user_id)
+    get_matcher_service().invalidate(user_id)
+    return {"status": "success", "file_id": file_id, "data": data}
+
 @app.post("/resume/analyze")
 async def analyze_resume(file: UploadFile = File(...), user_id: int = 1):
     try:
         content = await file.read()
-        data = parse_resume(content, file.filename)
-        file_id = save_resume_to_db(data, user_id)
-        return {"status": "success", "file_id": file_id, "data": data}
+        return await get_workload_scheduler().run(INTERACTIVE, parse_and_save_resume, content, file.filename, user_id)
+    except LaneFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except ParseLimitExceeded as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def llm_busy(e: LLMRateLimited) -> HTTPException:
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
+
 @app.post("/resume/sentiment")
 async def resume_sentiment(file: UploadFile = File(...)):
     try:
         content = await file.read()
-        data = parse_resume(content, file.filename)
-        analysis = resume_agent.analyze_sentiment_and_summary(data['raw_text'])
+        # Parsing blocks until the parser process answers; it runs on the lane, not the event loop
+        data = await get_workload_scheduler().run(INTERACTIVE, parse_upload, content, file.filename)
+        # Off the event loop: the call may queue for the LLM rate limit
+        analysis = await run_in_threadpool(get_resume_agent().analyze_sentiment_and_summary, data['raw_text'])
         return {"filename": file.filename, "analysis": analysis}
+    except LLMRateLimited as e:
+        raise llm_busy(e)
+    except LaneFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except ParseLimitExceeded as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -95,8 +287,10 @@ class SentimentTextRequest(BaseModel):
 @app.post("/resume/sentiment-text")
 def sentiment_text(req: SentimentTextRequest):
     try:
-        analysis = resume_agent.analyze_sentiment_and_summary(req.resume_text)
+        analysis = get_resume_agent().analyze_sentiment_and_summary(req.resume_text)
         return {"status": "success", "analysis": analysis}
+    except LLMRateLimited as e:
+        raise llm_busy(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -104,9 +298,13 @@ def sentiment_text(req: SentimentTextRequest):
 async def extract_text_from_file(file: UploadFile = File(...)):
     try:
         content = await file.read()
-        # reusing parse_resume to extract text
-        data = parse_resume(content, file.filename)
+        # reusing parse_resume to extract text, on the lane as /resume/analyze does
+        data = await get_workload_scheduler().run(INTERACTIVE, parse_upload, content, file.filename)
         return {"filename": file.filename, "text": data['raw_text']}
+    except LaneFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except ParseLimitExceeded as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -116,36 +314,295 @@ class GenerateJDRequest(BaseModel):
     skills: str
 
 @app.post("/utils/generate-jd")
-async def generate_jd_endpoint(req: GenerateJDRequest):
+def generate_jd_endpoint(req: GenerateJDRequest):
     try:
-        jd_text = resume_agent.generate_job_description(req.role, req.experience, req.skills)
+        jd_text = get_resume_agent().generate_job_description(req.role, req.experience, req.skills)
         return {"jd_text": jd_text}
+    except LLMRateLimited as e:
+        raise llm_busy(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/utils/reset")
-async def reset_database():
+async def reset_database(user_id: Optional[int] = None):
+    """Delete one tenant's resumes by dropping its partitions, or every tenant's when user_id is omitted."""
     try:
         conn = get_db_connection()
-        with conn.cursor() as cur:
-            cur.execute("TRUNCATE TABLE resume_data, resume_files CASCADE;")
-        conn.commit()
-        conn.close()
-        return {"status": "success", "message": "Database reset successfully"}
+        try:
+            with conn.cursor() as cur:
+                if user_id is None:
+                    cur.execute("TRUNCATE TABLE resume_data, resume_files CASCADE;")
+                    dropped = None
+                else:
+                    dropped = drop_tenant_partitions(cur, user_id)
+            conn.commit()
+        finally:
+            conn.close()
+        if user_id is None:
+            get_matcher_service().invalidate()
+        else:
+            note_write(("resumes", user_id))
+            get_matcher_service().invalidate(user_id)
+        response = {"status": "success", "message": "Database reset successfully"}
+        if dropped is not None:
+            response["dropped"] = dropped
+        return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 class MatchRequest(BaseModel):
     jd_text: str
     top_k: int = 5
+    # Tenant whose resumes are searched; only that tenant's partition is read
+    user_id: int = 1
+    include_text: bool = True
+    # Post the results to the configured n8n webhook from the server (compact payload, gzip)
+    dispatch: bool = False
+    dispatch_include_text: Optional[bool] = None
+    # Attach precomputed LLM analyses (None until the background worker has reached a resume)
+    include_analysis: bool = False
 
 @app.post("/resume/match")
-def match_resumes_to_jd(req: MatchRequest):
+async def match_resumes_to_jd(req: MatchRequest, background_tasks: BackgroundTasks):
     try:
-        results = matcher_service.match_resumes(req.jd_text, req.top_k)
-        return {"matches": results}
+        return await get_workload_scheduler().run(INTERACTIVE, match_and_dispatch, req, background_tasks)
+    except LaneFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+def match_and_dispatch(req: MatchRequest, background_tasks: BackgroundTasks) -> Dict:
+    dispatch_text = False
+    if req.dispatch:
+        dispatch_text = req.dispatch_include_text
+        if dispatch_text is None:
+            # Unset on the request: [webhook] include_text decides, as in build_payload
+            dispatcher = get_webhook_dispatcher()
+            dispatch_text = bool(dispatcher and dispatcher.include_text)
+    fetch_text = req.include_text or dispatch_text
+    try:
+        results = get_matcher_service().match_resumes(req.jd_text, req.top_k, fetch_text, req.user_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if req.include_text or not fetch_text:
+        response = {"matches": results}
+    else:
+        # Text was only fetched for the webhook; keep it out of the HTTP response
+        response = {"matches": [{k: v for k, v in r.items() if k != "ResumeText"} for r in results]}
+    worker = get_analysis_worker()
+    if worker:
+        # Shortlisted resumes are the ones a recruiter opens next
+        worker.boost(r['id'] for r in results)
+    if req.include_analysis:
+        try:
+            analyses = get_analyses([r['id'] for r in results], user_id=req.user_id)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        for r in response["matches"]:
+            r["Analysis"] = analyses.get(r['id'])
+    if req.dispatch:
+        dispatcher = get_webhook_dispatcher()
+        if dispatcher is None:
+            response["dispatch"] = {"status": "not_configured"}
+        else:
+            run_id = uuid.uuid4().hex
+            background_tasks.add_task(
+                dispatcher.dispatch_matches, req.jd_text, results, req.top_k, run_id, req.dispatch_include_text,
+                req.user_id
+            )
+            response["dispatch"] = {"status": "queued", "run_id": run_id}
+    return response
+
+class MatchBatchRequest(BaseModel):
+    jd_texts: List[str]
+    top_k: int = 5
+    include_text: bool = False
+    user_id: int = 1
+
+MAX_BATCH_JDS = 100
+
+@app.post("/resume/match-batch")
+async def match_resumes_to_jds(req: MatchBatchRequest):
+    """Top-k matches for many JDs at once; results are in the order of jd_texts."""
+    if len(req.jd_texts) > MAX_BATCH_JDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_JDS} JDs per batch")
+    try:
+        results = await get_workload_scheduler().run(
+            INTERACTIVE, get_matcher_service().match_batch, req.jd_texts, req.top_k, req.include_text, req.user_id
+        )
+    except LaneFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    worker = get_analysis_worker()
+    if worker:
+        worker.boost(r['id'] for matches in results for r in matches)
+    return {"results": [{"jd_index": i, "matches": matches} for i, matches in enumerate(results)]}
+
+# --- Standing JDs: saved JDs matched against every new resume at ingest ---
+class StandingJDRequest(BaseModel):
+    jd_text: str
+    title: Optional[str] = None
+    user_id: int = 1
+    # Jaccard score a new resume needs to be recorded as a match; [standing_jds].min_score when omitted
+    min_score: Optional[float] = None
+
+@app.post("/standing-jds")
+def create_standing_jd(req: StandingJDRequest):
+    try:
+        return get_standing_jd_service().create(req.user_id, req.jd_text, req.title, req.min_score)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/standing-jds")
+def list_standing_jds(user_id: int = 1):
+    try:
+        return {"standing_jds": get_standing_jd_service().get_standing_jds(user_id)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/standing-jds/matches")
+def standing_jd_matches(user_id: int = 1, jd_id: Optional[int] = None, after_id: int = 0, limit: int = 100):
+    """New matches since match id `after_id`; with [webhook] configured they are also pushed as they happen."""
+    try:
+        matches = get_standing_jd_service().get_matches(user_id, jd_id, after_id, min(limit, 1000))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"matches": matches, "last_id": matches[-1]["match_id"] if matches else after_id}
+
+@app.delete("/standing-jds/{jd_id}")
+def delete_standing_jd(jd_id: int, user_id: int = 1):
+    try:
+        deleted = get_standing_jd_service().delete(jd_id, user_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Standing JD not found")
+    return {"status": "deleted", "id": jd_id}
+
+# --- Candidate search ---
+@app.get("/candidates/search")
+async def search_candidates(q: str, user_id: int = 1, mode: str = "prefix", fields: Optional[str] = None,
+                            limit: int = 10):
+    """Autocomplete (mode=prefix) or typo-tolerant (mode=fuzzy) lookup by name, email, filename or phone.
+
+    `fields` is a comma-separated subset of name,email,filename,phone; phone-like queries match on digits only.
+    """
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    try:
+        results = await get_workload_scheduler().run(
+            INTERACTIVE, get_candidate_search_service().search, user_id, q, mode, field_list, limit)
+    except LaneFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"query": q, "mode": mode, "results": results}
+
+# --- Streaming exports ---
+async def open_export(fn, *args) -> Export:
+    # Opened on the bulk lane: the export's connection then counts against bulk_db_connections
+    # for as long as the stream runs, not against the connections interactive requests need
+    try:
+        return await get_workload_scheduler().run(BULK, fn, *args)
+    except (LaneFull, TimeoutError) as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def ndjson_response(export: Export, compress: bool) -> StreamingResponse:
+    headers = {"X-Export-Watermark": export.watermark.isoformat()}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(get_export_service().encode(export.rows, compress), media_type=NDJSON,
+                             headers=headers, background=BackgroundTask(export.close))
+
+@app.get("/export/candidates")
+async def export_candidates(user_id: int = 1, fields: Optional[str] = None, since: Optional[str] = None,
+                            gzip: bool = False):
+    """The tenant's candidates as NDJSON, oldest change first; pass X-Export-Watermark back as `since`.
+
+    `fields` is a comma-separated subset of the /resume/match result keys plus InterviewStatus and
+    LastUpdated; ResumeText is only included when named.
+    """
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    export = await open_export(get_export_service().open_candidates, user_id, field_list, since)
+    return ndjson_response(export, gzip)
+
+class MatchExportRequest(BaseModel):
+    jd_text: str
+    user_id: int = 1
+    fields: Optional[List[str]] = None
+    # Only candidates updated after this timestamp (the previous export's X-Export-Watermark)
+    since: Optional[str] = None
+    min_score: float = 0.0
+    limit: Optional[int] = None
+    gzip: bool = False
+
+@app.post("/export/matches")
+async def export_matches(req: MatchExportRequest):
+    """Every unique candidate ranked for the JD as NDJSON, best first, with Rank and MatchScore."""
+    export = await open_export(get_export_service().open_matches, get_matcher_service(), req.jd_text, req.user_id,
+                               req.fields, req.since, req.min_score, req.limit)
+    return ndjson_response(export, req.gzip)
+
+@app.get("/metrics/lanes")
+def workload_lane_metrics():
+    """Per-lane pool, queue, DB connection and latency figures, and bulk admission throttling."""
+    return get_workload_scheduler().metrics()
+
+@app.get("/metrics/replicas")
+def read_replica_metrics():
+    """Replica availability and lag, and how read-only queries were routed since startup."""
+    return replica_status()
+
+@app.get("/resume/parse-stats")
+def parse_pool_stats():
+    """Files parsed in the isolated workers since startup, by outcome, and their latency."""
+    pool = get_parse_pool()
+    return pool.stats() if pool else {"status": "disabled"}
+
+@app.get("/resume/extraction-stats")
+def extraction_stats():
+    """How often parsed resumes needed the LLM fallback since startup."""
+    return get_fallback_stats()
+
+@app.get("/utils/llm-stats")
+def llm_stats():
+    """LLM calls since startup: coalesced, queued and shed by the limiter, and provider 429s."""
+    return get_llm_limiter().stats()
+
+@app.get("/resume/analysis-worker")
+def analysis_worker_stats():
+    worker = get_analysis_worker()
+    return worker.stats() if worker else {"status": "disabled"}
+
+@app.get("/resume/{resume_id}/analysis")
+def get_resume_analysis(resume_id: int, user_id: int = 1):
+    """Stored analysis, computed on the spot if the background worker has not reached it yet."""
+    try:
+        analysis = compute_resume_analysis(get_resume_agent(), resume_id, user_id)
+    except LLMRateLimited as e:
+        raise llm_busy(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if analysis is None:
+        raise HTTPException(status_code=404, detail="No analysis available for this resume")
+    return {"resume_id": resume_id, "analysis": analysis}
+
+@app.get("/resume/{resume_id}")
+def get_resume_by_id(resume_id: int, user_id: int = 1):
+    try:
+        resume = get_resume(resume_id, user_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not resume:
+        raise HTTPException(status_code=404, detail="Resume not found")
+    return resume
 
 # --- Phase 3: Scheduling ---
 class ScheduleRequest(BaseModel):
@@ -159,14 +616,83 @@ def schedule_interview(req: ScheduleRequest):
     try:
         # Construct dict expected by service
         candidate_data = {"email": req.candidate_email, "name": req.candidate_name}
-        interview_id = scheduler.schedule_interview(candidate_data, req.interviewer_id, req.slot_iso)
+        interview_id = get_scheduler().schedule_interview(candidate_data, req.interviewer_id, req.slot_iso)
         return {"status": "scheduled", "interview_id": interview_id}
+    except psycopg2.errors.ExclusionViolation:
+        raise HTTPException(status_code=409, detail="Slot overlaps an existing interview")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+class BatchCandidate(BaseModel):
+    candidate_email: str
+    candidate_name: str
+    interviewer_ids: Optional[List[int]] = None
+
+class BatchScheduleRequest(BaseModel):
+    candidates: List[BatchCandidate]
+    interviewer_ids: List[int]
+    start_date: str
+    end_date: Optional[str] = None
+    duration_minutes: int = 30
+    step_minutes: int = 30
+
+@app.post("/interview/schedule-batch")
+def schedule_interview_batch(req: BatchScheduleRequest):
+    try:
+        candidates = [
+            {"email": c.candidate_email, "name": c.candidate_name, "interviewer_ids": c.interviewer_ids}
+            for c in req.candidates
+        ]
+        result = get_scheduler().schedule_batch(
+            candidates, req.interviewer_ids, req.start_date, req.end_date, req.duration_minutes, req.step_minutes
+        )
+        return {"status": "scheduled", **result}
+    except psycopg2.errors.ExclusionViolation:
+        raise HTTPException(status_code=409, detail="Slots were taken concurrently, please retry")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/interview/availability/{interviewer_id}")
 def get_availability(interviewer_id: int, date: str):
-    return scheduler.get_availability(interviewer_id, date)
+    return get_scheduler().get_availability(interviewer_id, date)
+
+class AvailabilityRequest(BaseModel):
+    interviewer_ids: List[int]
+    start_date: str
+    end_date: Optional[str] = None
+    duration_minutes: int = 30
+    step_minutes: int = 30
+
+@app.post("/interview/availability")
+def get_availability_bulk(req: AvailabilityRequest):
+    try:
+        availability = get_scheduler().get_availability_bulk(
+            req.interviewer_ids, req.start_date, req.end_date, req.duration_minutes, req.step_minutes
+        )
+        return {"availability": availability}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/email/outbox")
+def email_outbox_summary():
+    try:
+        return {"counts": get_outbox_summary()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/email/outbox/{email_id}")
+def email_delivery_status(email_id: int):
+    try:
+        status = get_delivery_status(email_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not status:
+        raise HTTPException(status_code=404, detail="Email not found")
+    return status
 
 # --- Phase 4: Feedback ---
 class FeedbackRequest(BaseModel):
@@ -180,11 +706,33 @@ class FeedbackRequest(BaseModel):
 @app.post("/interview/feedback")
 def submit_feedback(req: FeedbackRequest):
     try:
-        feedback_service.submit_feedback(req.interview_id, req.model_dump())
+        get_feedback_service().submit_feedback(req.interview_id, req.model_dump())
         return {"status": "submitted"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/interview/scorecards")
+def list_scorecards(sort_by: str = "avg_overall_rating", order: str = "desc", limit: int = 20, offset: int = 0,
+                    after_value: Optional[str] = None, after_email: Optional[str] = None):
+    """A page of scorecards; pass the returned `next` as after_value/after_email for the following page."""
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be 'asc' or 'desc'")
+    if (after_value is None) != (after_email is None):
+        raise HTTPException(status_code=400, detail="after_value and after_email go together")
+    limit = max(1, min(limit, 200))
+    after = (after_value, after_email) if after_value is not None else None
+    try:
+        scorecards, next_key = get_feedback_service().get_scorecards(sort_by, order == "desc", limit,
+                                                                     max(0, offset), after)
+        return {
+            "scorecards": scorecards, "limit": limit, "offset": 0 if after else offset,
+            "next": {"after_value": next_key[0], "after_email": next_key[1]} if next_key else None,
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # --- Phase 5: Onboarding ---
 class OnboardingRequest(BaseModel):
     candidate_email: str
@@ -195,11 +743,35 @@ class OnboardingRequest(BaseModel):
 @app.post("/onboarding/initiate")
 def initiate_onboarding(req: OnboardingRequest):
     try:
-        success = onboarding_service.initiate_onboarding(req.candidate_email, req.model_dump())
-        if success:
-            return {"status": "onboarding_started"}
-        else:
-            raise HTTPException(status_code=404, detail="Candidate not found")
+        success = get_onboarding_service().initiate_onboarding(req.candidate_email, req.model_dump())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not success:
+        raise HTTPException(status_code=404, detail="Candidate not found")
+    return {"status": "onboarding_started"}
+
+class BatchOnboardingRequest(BaseModel):
+    offers: List[OnboardingRequest]
+
+@app.post("/onboarding/initiate-batch")
+def initiate_onboarding_batch(req: BatchOnboardingRequest):
+    try:
+        result = get_onboarding_service().initiate_onboarding_batch([o.model_dump() for o in req.offers])
+        return {"status": "onboarding_started", **result}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# --- Pipeline ---
+@app.get("/pipeline/summary")
+def pipeline_summary(since: Optional[str] = None):
+    try:
+        since_dt = datetime.fromisoformat(since) if since else None
+        if since_dt and since_dt.tzinfo:
+            since_dt = since_dt.astimezone(timezone.utc).replace(tzinfo=None)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="since must be an ISO date or timestamp")
+    try:
+        return get_pipeline_service().get_summary(since_dt)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -0,0 +1,210 @@
+"""Background precomputation of LLM resume analyses.
+
+Freshly ingested resumes are queued at low priority; resumes that show up in
+a /resume/match shortlist are boosted to the front so the recruiter opening
+that shortlist finds the analysis already stored in `resume_analysis`. The
+worker paces its LLM calls to `rate_per_minute`; a call the process-wide LLM
+limiter sheds is put back in the queue at its priority and retried later.
+"""
+import heapq
+import itertools
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from psycopg2.extras import Json
+from backend.agents.llm_limiter import LLMRateLimited
+from backend.database import get_db_connection
+
+# Lower runs first
+PRIORITY_MATCHED = 0
+PRIORITY_INGESTED = 10
+PRIORITY_BACKLOG = 20
+
+
+def load_text_to_analyze(resume_id: int, user_id: Optional[int] = None) -> Optional[Tuple[str, str]]:
+    """(text, md5) when the resume has no current analysis, else None.
+
+    With `user_id` only that tenant's resume is considered (requests); the worker, which only
+    queues ids it was handed by ingest and matching, looks ids up across tenants.
+    """
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT rd.extracted_text, md5(rd.extracted_text)
+                FROM resume_data rd
+                LEFT JOIN resume_analysis ra ON ra.resume_id = rd.id
+                WHERE (%s::int IS NULL OR rd.user_id = %s) AND rd.id = %s AND rd.extracted_text IS NOT NULL
+                  AND (ra.resume_id IS NULL OR ra.status <> 'done' OR ra.text_md5 <> md5(rd.extracted_text))
+            """, (user_id, user_id, resume_id))
+            return cur.fetchone()
+    finally:
+        conn.close()
+
+
+def store_analysis(resume_id: int, result: Dict, text_md5: str) -> str:
+    if not isinstance(result, dict):
+        # A model answering with a list or a bare string is stored as a failed analysis, not raised
+        result = {"error": "non-object response", "raw_response": str(result)[:1000]}
+    status = "failed" if "error" in result else "done"
+    tokens_sent = (result.get("token_usage") or {}).get("tokens_sent")
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO resume_analysis (resume_id, user_id, status, analysis, tokens_sent, text_md5, error,
+                                             updated_at)
+                SELECT id, user_id, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP FROM resume_data WHERE id = %s
+                ON CONFLICT (resume_id) DO UPDATE SET
+                    status = EXCLUDED.status, analysis = EXCLUDED.analysis, tokens_sent = EXCLUDED.tokens_sent,
+                    text_md5 = EXCLUDED.text_md5, error = EXCLUDED.error, updated_at = EXCLUDED.updated_at
+            """, (status, Json(result), tokens_sent, text_md5, result.get("error"), resume_id))
+        conn.commit()
+        return status
+    except Exception as e:
+        conn.rollback()
+        raise e
+    finally:
+        conn.close()
+
+
+def get_analyses(resume_ids: List[int], readonly: bool = True, user_id: Optional[int] = None) -> Dict[int, Dict]:
+    """Stored analyses for the given resumes (of `user_id` when given); ids without a finished analysis are absent."""
+    if not resume_ids:
+        return {}
+    conn = get_db_connection(readonly=readonly, scope=("resumes", user_id) if user_id is not None else None)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT resume_id, analysis FROM resume_analysis
+                WHERE resume_id = ANY(%s) AND status = 'done' AND (%s::int IS NULL OR user_id = %s)
+            """, (list(resume_ids), user_id, user_id))
+            return dict(cur.fetchall())
+    finally:
+        conn.close()
+
+
+def analyze_resume(agent, resume_id: int, user_id: int) -> Optional[Dict]:
+    """Compute and store an analysis of the tenant's resume now if it is missing or stale; returns the stored analysis."""
+    row = load_text_to_analyze(resume_id, user_id)
+    if row:
+        store_analysis(resume_id, agent.analyze_sentiment_and_summary(row[0]), row[1])
+    # Read back from the primary when it was just written
+    return get_analyses([resume_id], readonly=not row, user_id=user_id).get(resume_id)
+
+
+class AnalysisWorker:
+    def __init__(self, agent, config: Dict):
+        self.agent = agent
+        self.min_interval = 60.0 / max(0.1, float(config.get('rate_per_minute', 30)))
+        self.max_queue = int(config.get('max_queue', 10000))
+        self._heap: List[Tuple[int, int, int]] = []
+        self._queued: Dict[int, int] = {}  # resume id -> best priority it is queued at
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._next_call = 0.0
+        self.counts = dict.fromkeys(("done", "failed", "skipped", "dropped", "deferred", "errors"), 0)
+
+    # --- Lifecycle ---
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="analysis-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+
+    # --- Queue ---
+    def enqueue(self, resume_ids: Iterable[int], priority: int = PRIORITY_INGESTED):
+        with self._cond:
+            for resume_id in resume_ids:
+                current = self._queued.get(resume_id)
+                if current is not None and current <= priority:
+                    continue
+                if current is None and len(self._queued) >= self.max_queue:
+                    self.counts["dropped"] += 1
+                    continue
+                # A boosted id leaves its old heap entry behind; _pop skips it
+                self._queued[resume_id] = priority
+                heapq.heappush(self._heap, (priority, next(self._seq), resume_id))
+            self._cond.notify()
+
+    def boost(self, resume_ids: Iterable[int]):
+        self.enqueue(resume_ids, PRIORITY_MATCHED)
+
+    def enqueue_backlog(self, limit: int = 1000) -> int:
+        """Queue the newest resumes that have no current analysis."""
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT rd.id FROM resume_data rd
+                    LEFT JOIN resume_analysis ra ON ra.resume_id = rd.id
+                    WHERE ra.resume_id IS NULL OR ra.status <> 'done'
+                    ORDER BY rd.id DESC
+                    LIMIT %s
+                """, (limit,))
+                ids = [r[0] for r in cur.fetchall()]
+        finally:
+            conn.close()
+        self.enqueue(ids, PRIORITY_BACKLOG)
+        return len(ids)
+
+    def _pop(self) -> Optional[Tuple[int, int]]:
+        with self._cond:
+            while not self._stop.is_set():
+                while self._heap:
+                    priority, _, resume_id = heapq.heappop(self._heap)
+                    if self._queued.get(resume_id) == priority:
+                        del self._queued[resume_id]
+                        return resume_id, priority
+                self._cond.wait()
+            return None
+
+    def stats(self) -> Dict:
+        with self._cond:
+            queued = list(self._queued.values())
+        return dict(self.counts, queued=len(queued),
+                    queued_matched=sum(1 for p in queued if p == PRIORITY_MATCHED))
+
+    # --- Work ---
+    def _run(self):
+        while True:
+            popped = self._pop()
+            if popped is None:
+                return
+            resume_id, priority = popped
+            try:
+                self.process(resume_id, priority)
+            except Exception as e:
+                self.counts["errors"] += 1
+                print(f"Analysis of resume {resume_id} failed: {e}")
+
+    def process(self, resume_id: int, priority: int = PRIORITY_INGESTED):
+        row = load_text_to_analyze(resume_id)
+        if not row:
+            self.counts["skipped"] += 1
+            return
+        delay = self._next_call - time.monotonic()
+        if delay > 0 and self._stop.wait(delay):
+            return
+        self._next_call = time.monotonic() + self.min_interval
+        try:
+            result = self.agent.analyze_sentiment_and_summary(row[0])
+        except LLMRateLimited as e:
+            # The shared LLM budget is spent; back off and leave it to interactive requests for now
+            self.counts["deferred"] += 1
+            self._next_call = time.monotonic() + max(self.min_interval, e.retry_after)
+            self.enqueue([resume_id], priority)
+            return
+        status = store_analysis(resume_id, result, row[1])
+        self.counts[status] += 1
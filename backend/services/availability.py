@@ -0,0 +1,201 @@
+"""Interval arithmetic and busy-time sources for interviewer availability.
+
+All intervals are half-open (start, end) pairs of timezone-aware UTC datetimes.
+"""
+import json
+import os
+import time
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+Interval = Tuple[datetime, datetime]
+
+
+def get_zone(name: Optional[str]):
+    try:
+        return ZoneInfo(name or "UTC")
+    except (ZoneInfoNotFoundError, ValueError):
+        return timezone.utc
+
+
+def to_utc(value: datetime) -> datetime:
+    """Naive timestamps from the database are stored in UTC."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def parse_slot(slot_iso: str) -> datetime:
+    """Parse an ISO slot into a naive UTC datetime suitable for a TIMESTAMP column."""
+    return to_utc(datetime.fromisoformat(slot_iso)).replace(tzinfo=None)
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def subtract_intervals(windows: Sequence[Interval], busy: Sequence[Interval]) -> List[Interval]:
+    """Sweep sorted, merged `busy` intervals out of sorted `windows`."""
+    free: List[Interval] = []
+    j = 0
+    for w_start, w_end in windows:
+        cursor = w_start
+        # Skip busy blocks that end before this window
+        while j < len(busy) and busy[j][1] <= w_start:
+            j += 1
+        k = j
+        while k < len(busy) and busy[k][0] < w_end:
+            b_start, b_end = busy[k]
+            if b_start > cursor:
+                free.append((cursor, b_start))
+            cursor = max(cursor, b_end)
+            if cursor >= w_end:
+                break
+            k += 1
+        if cursor < w_end:
+            free.append((cursor, w_end))
+    return free
+
+
+def working_windows(start_date: date, end_date: date, tz_name: Optional[str],
+                    day_start: Optional[dtime], day_end: Optional[dtime]) -> List[Interval]:
+    """Working hours for each local day in [start_date, end_date], converted to UTC."""
+    zone = get_zone(tz_name)
+    day_start = day_start or dtime(9, 0)
+    day_end = day_end or dtime(17, 0)
+    windows = []
+    day = start_date
+    while day <= end_date:
+        local_start = datetime.combine(day, day_start, tzinfo=zone)
+        local_end = datetime.combine(day, day_end, tzinfo=zone)
+        if local_end > local_start:
+            windows.append((to_utc(local_start), to_utc(local_end)))
+        day += timedelta(days=1)
+    return windows
+
+
+def align_to_step(start: datetime, step: timedelta, zone=timezone.utc) -> datetime:
+    """Round `start` up to the step grid counted from the top of the hour in `zone`."""
+    anchor = start.astimezone(zone).replace(minute=0, second=0, microsecond=0)
+    offset = (start - anchor) % step
+    return start if not offset else start + (step - offset)
+
+
+def slots_from_free(free: Sequence[Interval], duration: timedelta, step: timedelta,
+                    not_before: Optional[datetime] = None, zone=timezone.utc) -> List[datetime]:
+    """Slot start times that fit inside free intervals, aligned to `step` from the local hour."""
+    slots = []
+    for start, end in free:
+        if not_before and start < not_before:
+            start = not_before
+        cursor = align_to_step(start, step, zone)
+        while cursor + duration <= end:
+            slots.append(cursor)
+            cursor += step
+    return slots
+
+
+def first_slot(free: List[Interval], duration: timedelta, step: timedelta,
+               not_before: Optional[datetime] = None, zone=timezone.utc) -> Optional[datetime]:
+    """Earliest aligned slot in `free`; intervals that can never fit `duration` are dropped in place."""
+    while free:
+        start, end = free[0]
+        if not_before and start < not_before:
+            start = not_before
+        cursor = align_to_step(start, step, zone)
+        if cursor + duration <= end:
+            return cursor
+        free.pop(0)
+    return None
+
+
+class LocalBusyProvider:
+    """Stand-in for the calendar API: busy blocks read from a JSON file.
+
+    Format: {"<calendar_id or email>": [["2025-01-06T10:00:00+00:00", "2025-01-06T11:00:00+00:00"], ...]}
+    """
+
+    def __init__(self, path: str = "busy_calendar.json"):
+        self.path = path
+
+    def get_busy(self, calendar_ids: Sequence[str], start: datetime, end: datetime) -> Dict[str, List[Interval]]:
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path) as f:
+            data = json.load(f)
+        busy = {}
+        for cid in calendar_ids:
+            blocks = []
+            for b_start, b_end in data.get(cid, []):
+                s, e = to_utc(datetime.fromisoformat(b_start)), to_utc(datetime.fromisoformat(b_end))
+                if s < end and e > start:
+                    blocks.append((s, e))
+            busy[cid] = blocks
+        return busy
+
+
+class GoogleBusyProvider:
+    """Busy blocks from the Google Calendar freebusy API."""
+
+    def __init__(self, service):
+        self.service = service
+
+    def get_busy(self, calendar_ids: Sequence[str], start: datetime, end: datetime) -> Dict[str, List[Interval]]:
+        body = {
+            "timeMin": start.isoformat(),
+            "timeMax": end.isoformat(),
+            "items": [{"id": cid} for cid in calendar_ids],
+        }
+        response = self.service.freebusy().query(body=body).execute()
+        busy = {}
+        for cid, cal in response.get("calendars", {}).items():
+            busy[cid] = [
+                (to_utc(datetime.fromisoformat(b["start"].replace("Z", "+00:00"))),
+                 to_utc(datetime.fromisoformat(b["end"].replace("Z", "+00:00"))))
+                for b in cal.get("busy", [])
+            ]
+        return busy
+
+
+class CachedBusyProvider:
+    """TTL cache in front of a busy provider, keyed by calendar and queried range."""
+
+    def __init__(self, provider, ttl_seconds: int = 300):
+        self.provider = provider
+        self.ttl = ttl_seconds
+        self._cache: Dict[Tuple[str, datetime, datetime], Tuple[float, List[Interval]]] = {}
+
+    def get_busy(self, calendar_ids: Sequence[str], start: datetime, end: datetime) -> Dict[str, List[Interval]]:
+        now = time.monotonic()
+        result, missing = {}, []
+        for cid in calendar_ids:
+            hit = self._cache.get((cid, start, end))
+            if hit and now - hit[0] < self.ttl:
+                result[cid] = hit[1]
+            else:
+                missing.append(cid)
+        if len(self._cache) > 1024:
+            self._cache = {k: v for k, v in self._cache.items() if now - v[0] < self.ttl}
+        if missing:
+            try:
+                fetched = self.provider.get_busy(missing, start, end)
+            except Exception as e:
+                # Don't cache failures; the next call retries the calendar
+                print(f"Busy-time lookup failed, using bookings only: {e}")
+                result.update({cid: [] for cid in missing})
+                return result
+            for cid in missing:
+                blocks = fetched.get(cid, [])
+                self._cache[(cid, start, end)] = (now, blocks)
+                result[cid] = blocks
+        return result
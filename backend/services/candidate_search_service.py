@@ -0,0 +1,189 @@
+"""Candidate lookup by name, email, phone or filename within one tenant.
+
+Two modes. "prefix" is for autocomplete: each field has a C-collated
+expression index, so `lower(name) LIKE 'jan%'` is a short range scan that
+already comes out in order. "fuzzy" is for typos and partial words: with
+pg_trgm installed names, emails and filenames have trigram GiST indexes, walked
+in word-similarity distance order (`q <<-> col`) so LIMIT stops the scan after
+the best few however many rows pass the threshold; without pg_trgm it falls back
+to substring LIKE, which scans the tenant's partition. Queries made of phone
+characters with at least MIN_PHONE_DIGITS digits also search
+candidate_phone_digits, the digits-only form of candidate_phone, so
+"+91 98765-43210", "9876543210" and "43210" all find the same number (as a
+substring through a trigram GIN index with pg_trgm, as a prefix without it).
+"""
+import re
+import threading
+from typing import Dict, List, Optional
+
+from psycopg2.extras import RealDictCursor
+from backend.database import get_db_connection
+
+PREFIX = "prefix"
+FUZZY = "fuzzy"
+FIELDS = ("name", "email", "filename", "phone")
+
+MIN_PHONE_DIGITS = 3
+PHONE_QUERY_RE = re.compile(r"^[\d\s()+.\-/]+$")
+
+# field -> (table, searched expression with {} for the table alias); init_db indexes each expression twice
+SEARCH_EXPRESSIONS = {
+    "name": ("resume_data", "lower({}candidate_name)"),
+    "email": ("resume_data", "lower({}candidate_email)"),
+    "filename": ("resume_files", "lower({}filename)"),
+    "phone": ("resume_data", "{}candidate_phone_digits"),
+}
+# Fuzzy fields ranked by trigram distance need GiST (GIN cannot return rows in distance order);
+# phone digits are only matched as substrings, which GIN serves best
+KNN_FIELDS = ("name", "email", "filename")
+
+
+def create_search_indexes(cur):
+    """Prefix indexes always; trigram indexes when pg_trgm can be installed. Returns whether it was."""
+    for field, (table, expression) in SEARCH_EXPRESSIONS.items():
+        cur.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_{field}_prefix ON {table} '
+                    f'(({expression.format("")}) COLLATE "C")')
+    cur.execute("SAVEPOINT trigram_search")
+    try:
+        cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for field, (table, expression) in SEARCH_EXPRESSIONS.items():
+            if field in KNN_FIELDS:
+                # Replaces the GIN index earlier versions created
+                cur.execute(f"DROP INDEX IF EXISTS idx_{table}_{field}_trgm")
+                cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{field}_trgm_knn ON {table} "
+                            f"USING gist (({expression.format('')}) gist_trgm_ops)")
+            else:
+                cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{field}_trgm ON {table} "
+                            f"USING gin (({expression.format('')}) gin_trgm_ops)")
+        cur.execute("RELEASE SAVEPOINT trigram_search")
+        return True
+    except Exception as e:
+        cur.execute("ROLLBACK TO SAVEPOINT trigram_search")
+        print(f"pg_trgm unavailable, fuzzy candidate search will scan instead: {e}")
+        return False
+
+
+def escape_like(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def phone_digits(query: str) -> Optional[str]:
+    """Digits of a query that looks like (part of) a phone number, else None."""
+    digits = re.sub(r"\D", "", query)
+    if PHONE_QUERY_RE.match(query) and len(digits) >= MIN_PHONE_DIGITS:
+        return digits
+    return None
+
+
+class CandidateSearchService:
+    def __init__(self, config: Optional[Dict] = None):
+        config = config or {}
+        self.word_similarity_threshold = float(config.get('word_similarity_threshold', 0.5))
+        self.max_limit = int(config.get('max_limit', 50))
+        self._has_trigrams: Optional[bool] = None
+        self._lock = threading.Lock()
+
+    def has_trigrams(self, cur) -> bool:
+        if self._has_trigrams is None:
+            cur.execute("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+            with self._lock:
+                self._has_trigrams = bool(cur.fetchone()['exists'])
+        return self._has_trigrams
+
+    def _field_query(self, branch: int, field: str, mode: str, trigrams: bool) -> str:
+        """Resume ids (with score) matching %(q)s on one field, best first, at most %(limit)s."""
+        alias = "rf" if field == "filename" else "rd"
+        column = SEARCH_EXPRESSIONS[field][1].format(alias + ".")
+        source = ("resume_files rf JOIN resume_data rd ON rd.user_id = rf.user_id AND rd.resume_file_id = rf.id"
+                  if field == "filename" else "resume_data rd")
+        if field == "phone" and trigrams:
+            # Typed digits may be any part of the number (no country code, last digits only)
+            where, order, score = f"{column} LIKE %(digits_substring)s", column, "1.0"
+        elif mode == PREFIX or field == "phone":
+            # Same expression and collation as the prefix index: a range scan already in order
+            pattern = "%(digits_prefix)s" if field == "phone" else "%(prefix)s"
+            where = f'{column} COLLATE "C" LIKE {pattern}'
+            order, score = f'{column} COLLATE "C"', "1.0"
+        elif trigrams:
+            # Nearest first straight off the GiST index; the threshold only trims the tail
+            where = f"%(q)s <%% {column}"
+            score = f"word_similarity(%(q)s, {column})"
+            order = f"%(q)s <<-> {column}"
+        else:
+            where = f"{column} LIKE %(substring)s"
+            order, score = f"position(%(q)s in {column}), {column}", "1.0"
+        return f"""
+            (SELECT rd.id, '{field}' AS matched_on, {score}::float8 AS score, {branch} AS branch,
+                    row_number() OVER (ORDER BY {order}) AS pos
+             FROM {source}
+             WHERE {alias}.user_id = %(user_id)s AND {where}
+             ORDER BY {order}
+             LIMIT %(limit)s)
+        """
+
+    def search(self, user_id: int, query: str, mode: str = PREFIX, fields: Optional[List[str]] = None,
+               limit: int = 10) -> List[Dict]:
+        """Candidates whose name, email, filename or phone match `query`, at most `limit`, one row each.
+
+        Results come field by field (in `fields` order), each field's best matches first.
+        """
+        query = (query or "").strip().lower()
+        if not query:
+            raise ValueError("Search query is empty")
+        if mode not in (PREFIX, FUZZY):
+            raise ValueError(f"Unknown search mode {mode!r}; use {PREFIX!r} or {FUZZY!r}")
+        requested = bool(fields)
+        fields = list(fields or FIELDS)
+        unknown = set(fields) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown search fields: {', '.join(sorted(unknown))}")
+        limit = max(1, min(int(limit), self.max_limit))
+
+        digits = phone_digits(query)
+        if not digits:
+            # Too few digits to be worth matching against phone numbers
+            fields = [f for f in fields if f != "phone"]
+        elif not requested:
+            # Looks like a phone number: phones first, but "2023" still finds resume_2023.pdf
+            fields = ["phone"] + [f for f in fields if f != "phone"]
+        if not fields:
+            return []
+
+        conn = get_db_connection(readonly=True, scope=("resumes", user_id))
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                trigrams = self.has_trigrams(cur)
+                if mode == FUZZY and trigrams:
+                    cur.execute("SET LOCAL pg_trgm.word_similarity_threshold = %s", (self.word_similarity_threshold,))
+                branches = " UNION ALL ".join(self._field_query(i, f, mode, trigrams) for i, f in enumerate(fields))
+                cur.execute(f"""
+                    WITH hits AS ({branches}), best AS (
+                        SELECT DISTINCT ON (id) id, matched_on, score, branch, pos FROM hits ORDER BY id, branch, pos
+                    )
+                    SELECT rd.id, rd.candidate_name, rd.candidate_email, rd.candidate_phone, rf.filename,
+                           b.matched_on, b.score
+                    FROM best b
+                    JOIN resume_data rd ON rd.user_id = %(user_id)s AND rd.id = b.id
+                    LEFT JOIN resume_files rf ON rf.user_id = rd.user_id AND rf.id = rd.resume_file_id
+                    ORDER BY b.branch, b.pos
+                    LIMIT %(limit)s
+                """, {
+                    "user_id": user_id, "limit": limit, "q": query,
+                    "prefix": escape_like(query) + "%",
+                    "substring": "%" + escape_like(query) + "%",
+                    "digits_prefix": f"{digits}%",
+                    "digits_substring": f"%{digits}%",
+                })
+                rows = cur.fetchall()
+            conn.commit()  # ends the transaction SET LOCAL applied to
+        finally:
+            conn.close()
+        return [{
+            "id": row['id'],
+            "Name": row['candidate_name'] or "Unknown Candidate",
+            "Email": row['candidate_email'],
+            "Phone": row['candidate_phone'] or "",
+            "File": row['filename'] or "Unknown File",
+            "MatchedOn": row['matched_on'],
+            "Score": round(row['score'], 4),
+        } for row in rows]
@@ -0,0 +1,125 @@
+"""Near-duplicate resume detection with MinHash signatures and LSH buckets.
+
+Each resume gets a MinHash signature over word shingles of its extracted
+text, stored on resume_data. The signature is cut into bands and every band
+is hashed into a bucket row in `resume_lsh_bands`. Resumes of the same tenant
+sharing a bucket are near-duplicate candidates, so a new upload is compared
+against only a handful of rows in that tenant's partition. Confirmed duplicates point at the
+first upload of the cluster through resume_data.duplicate_of.
+"""
+import hashlib
+import re
+import zlib
+from functools import lru_cache
+from typing import List, Optional
+
+NUM_PERM = 128
+BANDS = 16            # 16 bands x 8 rows: pairs above ~0.7 Jaccard almost always share a bucket
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 3
+SIMILARITY_THRESHOLD = 0.8
+
+
+@lru_cache(maxsize=1)
+def _permutations():
+    # Multiply-shift hashing: (a*x + b) mod 2^64, top 32 bits; a must be odd
+    import numpy as np
+    rng = np.random.default_rng(1)
+    a = rng.integers(0, 1 << 64, size=NUM_PERM, dtype=np.uint64, endpoint=False) | np.uint64(1)
+    b = rng.integers(0, 1 << 64, size=NUM_PERM, dtype=np.uint64, endpoint=False)
+    return a, b
+
+
+def shingles(text: str) -> set:
+    words = re.findall(r"\w+", (text or "").lower())
+    if len(words) < SHINGLE_WORDS:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def minhash_signature(text: str):
+    """uint32[NUM_PERM] signature, or None for empty text."""
+    import numpy as np
+    items = shingles(text)
+    if not items:
+        return None
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in items), dtype=np.uint64, count=len(items))
+    a, b = _permutations()
+    # One row per permutation; uint64 arithmetic wraps, which is the mod 2^64 we want
+    values = (np.outer(a, hashes) + b[:, None]) >> np.uint64(32)
+    return values.min(axis=1).astype(np.uint32)
+
+
+def signature_to_bytes(signature) -> bytes:
+    return signature.astype("<u4").tobytes()
+
+
+def signature_from_bytes(raw):
+    import numpy as np
+    return np.frombuffer(bytes(raw), dtype="<u4")
+
+
+def band_buckets(signature) -> List[int]:
+    """One signed 64-bit bucket id per band; the band index is mixed in so ids never collide across bands."""
+    buckets = []
+    for band in range(BANDS):
+        chunk = signature[band * ROWS:(band + 1) * ROWS].astype("<u4").tobytes()
+        digest = hashlib.blake2b(bytes([band]) + chunk, digest_size=8).digest()
+        buckets.append(int.from_bytes(digest, "little", signed=True))
+    return buckets
+
+
+def estimate_similarity(sig_a, sig_b) -> float:
+    return float((sig_a == sig_b).mean())
+
+
+def flag_duplicate(cur, resume_id: int, text: str, user_id: int) -> Optional[int]:
+    """Store the signature and LSH buckets of `resume_id` and link it to an earlier near-duplicate.
+
+    Runs on the caller's cursor inside the ingest transaction, so resumes earlier
+    in the same batch are visible. Returns the id of the cluster's first resume,
+    or None when the resume is unique.
+    """
+    signature = minhash_signature(text)
+    cur.execute("DELETE FROM resume_lsh_bands WHERE user_id = %s AND resume_id = %s", (user_id, resume_id))
+    if signature is None:
+        cur.execute("UPDATE resume_data SET minhash = NULL, duplicate_of = NULL WHERE user_id = %s AND id = %s",
+                    (user_id, resume_id))
+        return None
+
+    buckets = band_buckets(signature)
+    placeholders = ", ".join(["%s"] * len(buckets))
+    cur.execute(f"""
+        SELECT rd.id, rd.duplicate_of, rd.minhash
+        FROM resume_data rd
+        WHERE rd.user_id = %s
+          AND rd.id IN (SELECT DISTINCT resume_id FROM resume_lsh_bands
+                        WHERE user_id = %s AND bucket IN ({placeholders}))
+          AND rd.id <> %s
+        ORDER BY rd.id
+    """, (user_id, user_id, *buckets, resume_id))
+
+    duplicate_of = None
+    for row in cur.fetchall():
+        other_id, other_root, other_sig = (row['id'], row['duplicate_of'], row['minhash']) if isinstance(row, dict) else row
+        root = other_root or other_id
+        if other_sig is None or root == resume_id:
+            continue
+        if estimate_similarity(signature, signature_from_bytes(other_sig)) >= SIMILARITY_THRESHOLD:
+            duplicate_of = root
+            break
+
+    cur.execute("UPDATE resume_data SET minhash = %s, duplicate_of = %s WHERE user_id = %s AND id = %s",
+                (signature_to_bytes(signature), duplicate_of, user_id, resume_id))
+    # One multi-row statement: a round trip per band would dominate ingest time on Postgres
+    cur.execute("INSERT INTO resume_lsh_bands (user_id, bucket, resume_id) VALUES "
+                + ", ".join(["(%s, %s, %s)"] * len(buckets)),
+                [v for bucket in buckets for v in (user_id, bucket, resume_id)])
+    return duplicate_of
+
+
+def backfill_signatures(cur):
+    """Sign resumes stored before deduplication existed, oldest first so clusters root at the first upload."""
+    cur.execute("SELECT id, extracted_text, user_id FROM resume_data WHERE minhash IS NULL ORDER BY id")
+    for resume_id, text, user_id in cur.fetchall():
+        flag_duplicate(cur, resume_id, text, user_id)
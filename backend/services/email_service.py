@@ -0,0 +1,220 @@
+"""Transactional email outbox and background SMTP sender.
+
+Messages are written to `email_outbox` inside the caller's transaction, so an
+invite exists if and only if its booking committed. `EmailSender` drains the
+outbox on a background thread over one long-lived SMTP session, retrying
+failures with exponential backoff.
+"""
+import smtplib
+import threading
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Dict, List, Optional
+
+from psycopg2.extras import RealDictCursor
+from backend.database import get_db_connection
+
+_wakeup = threading.Event()
+
+# A row stuck in 'sending' this long belongs to a sender that died mid-batch
+STALE_CLAIM_MINUTES = 10
+
+
+def enqueue_email(cur, recipient: str, subject: str, body: str, interview_id: Optional[int] = None) -> int:
+    """Queue a message using the caller's cursor; delivery happens after commit."""
+    cur.execute("""
+        INSERT INTO email_outbox (recipient, subject, body, interview_id)
+        VALUES (%s, %s, %s, %s)
+        RETURNING id
+    """, (recipient, subject, body, interview_id))
+    row = cur.fetchone()
+    return row['id'] if isinstance(row, dict) else row[0]
+
+
+def notify_outbox():
+    """Wake the sender so freshly committed messages go out without waiting for the next poll."""
+    _wakeup.set()
+
+
+def get_delivery_status(email_id: int) -> Optional[Dict]:
+    conn = get_db_connection()
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("""
+                SELECT id, recipient, subject, status, attempts, last_error, created_at, sent_at, next_attempt_at
+                FROM email_outbox WHERE id = %s
+            """, (email_id,))
+            return cur.fetchone()
+    finally:
+        conn.close()
+
+
+def get_outbox_summary() -> Dict[str, int]:
+    conn = get_db_connection(readonly=True)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT status, COUNT(*) FROM email_outbox GROUP BY status")
+            return {status: count for status, count in cur.fetchall()}
+    finally:
+        conn.close()
+
+
+class EmailSender:
+    def __init__(self, email_config: Dict):
+        self.config = email_config
+        self.batch_size = int(email_config.get('batch_size', 50))
+        self.max_attempts = int(email_config.get('max_attempts', 5))
+        self.poll_seconds = float(email_config.get('poll_seconds', 5))
+        self.backoff_seconds = float(email_config.get('backoff_seconds', 30))
+        self.max_backoff_seconds = float(email_config.get('max_backoff_seconds', 3600))
+        self.idle_seconds = float(email_config.get('session_idle_seconds', 60))
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # --- Lifecycle ---
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="email-sender", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        self._stop.set()
+        _wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self._close_session()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                sent = self.process_batch()
+            except Exception as e:
+                print(f"Email sender error: {e}")
+                sent = 0
+            if sent < self.batch_size:
+                # Outbox drained (or failing); sleep until the next poll or an explicit wakeup
+                _wakeup.wait(self.poll_seconds)
+                _wakeup.clear()
+            if self._smtp and time.monotonic() - self._last_used > self.idle_seconds:
+                self._close_session()
+
+    # --- SMTP session ---
+    def _open_session(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.config['smtp_server'], int(self.config.get('smtp_port', 587)), timeout=30)
+        if self.config.get('use_tls', True):
+            server.starttls()
+        if self.config.get('sender_password'):
+            server.login(self.config['sender_email'], self.config['sender_password'])
+        return server
+
+    def _close_session(self):
+        if self._smtp:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+
+    def _session(self) -> smtplib.SMTP:
+        if self._smtp is not None and time.monotonic() - self._last_used > self.idle_seconds:
+            # Server may have timed us out; check before reusing
+            try:
+                self._smtp.noop()
+            except Exception:
+                self._smtp = None
+        if self._smtp is None:
+            self._smtp = self._open_session()
+        return self._smtp
+
+    def _send(self, row: Dict):
+        msg = MIMEMultipart()
+        msg['From'] = self.config.get('sender_email')
+        msg['To'] = row['recipient']
+        msg['Subject'] = row['subject']
+        msg.attach(MIMEText(row['body'], 'plain'))
+        try:
+            self._session().send_message(msg)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            # Reconnect once; the message itself is fine
+            self._smtp = None
+            self._session().send_message(msg)
+        self._last_used = time.monotonic()
+
+    # --- Outbox ---
+    def _claim(self) -> List[Dict]:
+        conn = get_db_connection()
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute("""
+                    UPDATE email_outbox
+                    SET status = 'sending', attempts = attempts + 1, claimed_at = CURRENT_TIMESTAMP
+                    WHERE id IN (
+                        SELECT id FROM email_outbox
+                        WHERE (status = 'pending' AND next_attempt_at <= CURRENT_TIMESTAMP)
+                           OR (status = 'sending' AND claimed_at < CURRENT_TIMESTAMP - %s * INTERVAL '1 minute')
+                        ORDER BY id
+                        LIMIT %s
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING id, recipient, subject, body, attempts
+                """, (STALE_CLAIM_MINUTES, self.batch_size))
+                rows = cur.fetchall()
+            conn.commit()
+            return sorted(rows, key=lambda r: r['id'])
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+
+    def _backoff(self, attempts: int) -> float:
+        return min(self.max_backoff_seconds, self.backoff_seconds * (2 ** max(0, attempts - 1)))
+
+    def process_batch(self) -> int:
+        """Send one batch of due messages; returns how many rows were claimed."""
+        rows = self._claim()
+        if not rows:
+            return 0
+
+        sent, retry, failed = [], [], []
+        for row in rows:
+            try:
+                self._send(row)
+                sent.append(row['id'])
+            except Exception as e:
+                if row['attempts'] >= self.max_attempts:
+                    failed.append((str(e), row['id']))
+                else:
+                    retry.append((str(e), self._backoff(row['attempts']), row['id']))
+
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                if sent:
+                    cur.execute("""
+                        UPDATE email_outbox SET status = 'sent', sent_at = CURRENT_TIMESTAMP, last_error = NULL
+                        WHERE id = ANY(%s)
+                    """, (sent,))
+                if retry:
+                    cur.executemany("""
+                        UPDATE email_outbox
+                        SET status = 'pending', last_error = %s,
+                            next_attempt_at = CURRENT_TIMESTAMP + %s * INTERVAL '1 second'
+                        WHERE id = %s
+                    """, retry)
+                if failed:
+                    cur.executemany("""
+                        UPDATE email_outbox SET status = 'failed', last_error = %s WHERE id = %s
+                    """, failed)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+        return len(rows)
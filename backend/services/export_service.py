@@ -0,0 +1,166 @@
+"""Streaming NDJSON exports: a tenant's candidates, or every candidate ranked for a JD.
+
+Rows go out one JSON object per line as they are produced, so memory stays
+flat however large the tenant is. Candidates are read through a named
+(server-side) cursor batch_rows at a time in (last_updated, id) order; ranked
+matches are scored on the tenant's in-memory match shard, with `since` checked
+against the database a batch at a time (see MatchingService.iter_matches). Both accept `since` for incremental syncs and
+return a watermark to pass as the next `since`. The watermark is the database
+time at the start of the export minus sync_overlap_seconds, so rows committed
+late or not yet on a read replica when the export ran are sent again next time
+rather than missed; consumers should upsert by id.
+"""
+import json
+import zlib
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from backend.database import get_db_connection
+
+MEDIA_TYPE = "application/x-ndjson"
+
+# Output field -> SQL; names and defaults match /resume/match results
+CANDIDATE_COLUMNS = {
+    "id": "rd.id",
+    "Name": "COALESCE(rd.candidate_name, 'Unknown Candidate')",
+    "Email": "rd.candidate_email",
+    "Phone": "COALESCE(rd.candidate_phone, '')",
+    "Education": "COALESCE(rd.education, '')",
+    "File": "COALESCE(rf.filename, 'Unknown File')",
+    "Skills": "COALESCE(rd.skills, '')",
+    "ClusterId": "COALESCE(rd.duplicate_of, rd.id)",
+    # Stage changes from scheduling, feedback and offers are recorded on candidates, not on each tenant's resume
+    "InterviewStatus": "COALESCE(c.stage, rd.interview_status)",
+    "LastUpdated": "rd.last_updated",
+    "ResumeText": "rd.extracted_text",
+}
+MATCH_FIELDS = ("Rank", "MatchScore", "id", "Name", "Email", "Phone", "Education", "File", "Skills", "ClusterId",
+                "LastUpdated", "ResumeText")
+# Resume text is large; it is only exported when asked for by name
+OPT_IN_FIELDS = {"ResumeText"}
+
+
+def select_fields(fields: Optional[List[str]], available) -> List[str]:
+    if not fields:
+        return [f for f in available if f not in OPT_IN_FIELDS]
+    unknown = [f for f in fields if f not in available]
+    if unknown:
+        raise ValueError(f"Unknown export fields: {', '.join(unknown)}; choose from {', '.join(available)}")
+    return list(dict.fromkeys(fields))
+
+
+def parse_since(since: Optional[str]) -> Optional[str]:
+    if not since:
+        return None
+    try:
+        datetime.fromisoformat(since)
+    except ValueError:
+        raise ValueError(f"since must be an ISO 8601 timestamp, got {since!r}")
+    return since
+
+
+def _json_default(value):
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+class Export:
+    """An open export: `rows` to stream, the `watermark` for the next sync, and close() for its connection."""
+
+    def __init__(self, rows: Iterator[Dict], watermark: datetime, close: Optional[Callable] = None):
+        self.rows = rows
+        self.watermark = watermark
+        self._close = close
+
+    def close(self):
+        self.rows.close()
+        if self._close:
+            self._close()
+
+
+class ExportService:
+    def __init__(self, config: Optional[Dict] = None):
+        config = config or {}
+        self.batch_rows = int(config.get('batch_rows', 1000))
+        self.sync_overlap_seconds = float(config.get('sync_overlap_seconds', 60))
+
+    def _watermark(self, cur, since: Optional[str]):
+        """(watermark, since as a timestamp in the database's time zone like last_updated)."""
+        cur.execute("SELECT LOCALTIMESTAMP - make_interval(secs => %s), (%s::timestamptz)::timestamp",
+                    (self.sync_overlap_seconds, since))
+        return cur.fetchone()
+
+    def open_candidates(self, user_id: int, fields: Optional[List[str]] = None,
+                        since: Optional[str] = None) -> Export:
+        """Every resume of the tenant (updated, or whose candidate changed stage, after `since`)."""
+        fields = select_fields(fields, list(CANDIDATE_COLUMNS))
+        since = parse_since(since)
+        joins = []
+        if "File" in fields:
+            joins.append("LEFT JOIN resume_files rf ON rf.user_id = rd.user_id AND rf.id = rd.resume_file_id")
+        if "InterviewStatus" in fields:
+            joins.append("LEFT JOIN candidates c ON c.id = rd.candidate_id")
+        conn = get_db_connection(readonly=True, scope=("resumes", user_id))
+        try:
+            with conn.cursor() as cur:
+                watermark, since_ts = self._watermark(cur, since)
+            # Named cursor: rows stay on the server until fetched, batch_rows per round trip
+            cur = conn.cursor(name=f"export_candidates_{user_id}")
+            cur.itersize = self.batch_rows
+            cur.execute(f"""
+                SELECT {", ".join(CANDIDATE_COLUMNS[f] for f in fields)}
+                FROM resume_data rd {" ".join(joins)}
+                WHERE rd.user_id = %s AND (
+                    %s::timestamp IS NULL OR rd.last_updated > %s::timestamp
+                    -- An array, not IN (...): both arms are then index scans, combined with BitmapOr
+                    OR rd.candidate_id = ANY(ARRAY(SELECT id FROM candidates WHERE stage_updated_at > %s::timestamp))
+                )
+                ORDER BY rd.last_updated, rd.id
+            """, (user_id, since_ts, since_ts, since_ts))
+        except Exception:
+            conn.close()
+            raise
+
+        def rows():
+            try:
+                for row in cur:
+                    yield dict(zip(fields, row))
+            finally:
+                conn.close()
+
+        return Export(rows(), watermark, conn.close)
+
+    def open_matches(self, matcher, jd_text: str, user_id: int, fields: Optional[List[str]] = None,
+                     since: Optional[str] = None, min_score: float = 0.0, limit: Optional[int] = None) -> Export:
+        """Every unique candidate ranked for `jd_text` as /resume/match ranks them, best first."""
+        fields = select_fields(fields, MATCH_FIELDS)
+        since = parse_since(since)
+        conn = get_db_connection(readonly=True, scope=("resumes", user_id))
+        try:
+            with conn.cursor() as cur:
+                watermark, since_ts = self._watermark(cur, since)
+        finally:
+            conn.close()
+        matches = matcher.iter_matches(jd_text, user_id, "ResumeText" in fields, since_ts, self.batch_rows)
+
+        def rows():
+            for n, match in enumerate(matches):
+                # Ranked best first: everything after the first score under min_score is too
+                if (limit is not None and n >= limit) or match['MatchScore'] < min_score:
+                    return
+                yield {f: match.get(f) for f in fields}
+
+        return Export(rows(), watermark)
+
+    def encode(self, rows: Iterable[Dict], compress: bool = False) -> Iterator[bytes]:
+        """NDJSON bytes for `rows`, a chunk per batch_rows rows; gzip when `compress`."""
+        compressor = zlib.compressobj(wbits=31) if compress else None  # 31: gzip container
+        lines = []
+        for row in rows:
+            lines.append(json.dumps(row, default=_json_default, separators=(",", ":")))
+            if len(lines) >= self.batch_rows:
+                chunk = ("\n".join(lines) + "\n").encode("utf-8")
+                lines = []
+                # Sync flush so each batch reaches the client now instead of waiting in the compressor
+                yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH) if compressor else chunk
+        chunk = ("\n".join(lines) + "\n").encode("utf-8") if lines else b""
+        yield compressor.compress(chunk) + compressor.flush() if compressor else chunk
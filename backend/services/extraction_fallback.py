@@ -0,0 +1,131 @@
+"""LLM fallback for resume fields the regex extractors are unsure about.
+
+parse_resume attaches a 0-1 confidence to name, email, mobile and education.
+Only fields under the threshold are sent to the LLM, each with the part of the
+resume that should contain it, and several resumes share one call. Values
+the LLM returns are validated before they replace the regex result.
+"""
+import re
+import threading
+from typing import Dict, List, Optional
+
+from backend.services.resume_service import EMAIL_RE
+from backend.agents.prompt_budget import segment_resume
+
+FALLBACK_FIELDS = ("name", "email", "mobile", "education")
+DEFAULT_THRESHOLD = 0.6
+DEFAULT_BATCH_SIZE = 10
+LLM_CONFIDENCE = 0.8
+CONTACT_LINES = 12
+MAX_EXCERPT_CHARS = 800
+
+
+class FallbackStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = dict.fromkeys(
+            ("resumes_seen", "resumes_sent", "fields_sent", "fields_filled", "llm_calls", "llm_errors"), 0)
+
+    def add(self, **deltas: int):
+        with self._lock:
+            for key, value in deltas.items():
+                self.counts[key] += value
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counts = dict(self.counts)
+        seen = counts["resumes_seen"]
+        counts["fallback_rate"] = round(counts["resumes_sent"] / seen, 4) if seen else 0.0
+        counts["fill_rate"] = round(counts["fields_filled"] / counts["fields_sent"], 4) if counts["fields_sent"] else 0.0
+        return counts
+
+
+stats = FallbackStats()
+
+
+def get_fallback_stats() -> Dict:
+    return stats.snapshot()
+
+
+def excerpt_for(text: str, fields: List[str]) -> str:
+    """The part of the resume that should hold `fields`: the top lines for contact details, the education section."""
+    lines = [l.strip() for l in text.splitlines() if l.strip()]
+    parts = []
+    if any(f in ("name", "email", "mobile") for f in fields):
+        parts.append(lines[:CONTACT_LINES])
+    if "education" in fields:
+        section = next((body for title, body in segment_resume(text) if title == "education"), None)
+        if section is None:
+            # No header; lines mentioning a school are the best guess
+            section = [l for l in lines if re.search(r"universit|college|institute|school|degree", l, re.I)]
+        # Short resumes put education inside the contact window already
+        seen = set(parts[0]) if parts else set()
+        parts.append([l for l in section if l not in seen])
+    return "\n...\n".join("\n".join(p) for p in parts if p)[:MAX_EXCERPT_CHARS]
+
+
+def _validated(field: str, value) -> Optional[str]:
+    if value is None:
+        return None
+    if field == "education":
+        entries = value if isinstance(value, list) else [value]
+        entries = [str(e).strip() for e in entries if str(e).strip()]
+        return "; ".join(entries[:3]) or None
+    value = str(value).strip()
+    if field == "email":
+        return value if EMAIL_RE.fullmatch(value) else None
+    if field == "mobile":
+        return value if 8 <= len(re.sub(r"\D", "", value)) <= 15 else None
+    if field == "name":
+        return value if 0 < len(value) <= 60 and not re.search(r"\d|@", value) else None
+    return None
+
+
+def low_confidence_fields(data: Dict, threshold: float) -> List[str]:
+    confidence = data.get("confidence") or {}
+    return [f for f in FALLBACK_FIELDS if confidence.get(f, 1.0) < threshold]
+
+
+def apply_llm_fallback(parsed: List[Dict], agent, threshold: float = DEFAULT_THRESHOLD,
+                       batch_size: int = DEFAULT_BATCH_SIZE) -> List[Dict]:
+    """Fill low-confidence fields of parse_resume results in place; returns the list for chaining."""
+    pending = []
+    for i, data in enumerate(parsed):
+        fields = low_confidence_fields(data, threshold)
+        excerpt = excerpt_for(data.get("raw_text", ""), fields) if fields else ""
+        if fields and excerpt:
+            pending.append((i, fields, excerpt))
+    stats.add(resumes_seen=len(parsed), resumes_sent=len(pending), fields_sent=sum(len(f) for _, f, _ in pending))
+
+    for start in range(0, len(pending), batch_size):
+        chunk = pending[start:start + batch_size]
+        items = [{"id": str(i), "fields": fields, "excerpt": excerpt} for i, fields, excerpt in chunk]
+        try:
+            stats.add(llm_calls=1)
+            answers = agent.extract_fields_batch(items)
+        except Exception as e:
+            stats.add(llm_errors=1)
+            print(f"Field extraction fallback failed for {len(chunk)} resumes: {e}")
+            continue
+        if not isinstance(answers, dict):
+            stats.add(llm_errors=1)
+            print(f"Field extraction fallback returned {type(answers).__name__}, not an object, for {len(chunk)} resumes")
+            continue
+
+        filled = 0
+        for i, fields, _ in chunk:
+            answer = answers.get(str(i)) or {}
+            if not isinstance(answer, dict):
+                # A model answering with a bare string or list for one resume should not fail the batch
+                stats.add(llm_errors=1)
+                continue
+            data = parsed[i]
+            for field in fields:
+                value = _validated(field, answer.get(field))
+                if value:
+                    data[field] = value
+                    data["confidence"][field] = LLM_CONFIDENCE
+                    data.setdefault("llm_fields", []).append(field)
+                    filled += 1
+        stats.add(fields_filled=filled)
+    return parsed
@@ -1,7 +1,51 @@
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
 import json
-from backend.database import get_db_connection
+from backend.database import get_db_connection, note_write
 from backend.services.scheduling_service import SchedulingService # For email reuse potentially
+from backend.services.pipeline_service import advance_candidates
+from psycopg2.extras import RealDictCursor
+
+# Free-text recommendations mapped to a numeric score so candidates can be ranked by them
+RECOMMENDATION_SCORE_SQL = """
+    CASE lower(regexp_replace(trim({col}), '[\\s-]+', '_', 'g'))
+        WHEN 'strong_hire' THEN 2
+        WHEN 'hire' THEN 1
+        WHEN 'yes' THEN 1
+        WHEN 'maybe' THEN 0
+        WHEN 'hold' THEN 0
+        WHEN 'no_hire' THEN -1
+        WHEN 'no' THEN -1
+        WHEN 'strong_no_hire' THEN -2
+    END
+"""
+
+SCORECARD_SORT_COLUMNS = {
+    "avg_overall_rating", "avg_technical_skills", "avg_communication_skills",
+    "avg_recommendation", "feedback_count", "last_feedback_at",
+}
+
+def rebuild_scorecards(cur):
+    """Recompute every scorecard from interview_feedback (backfill / repair)."""
+    cur.execute("TRUNCATE candidate_scorecards")
+    cur.execute(f"""
+        INSERT INTO candidate_scorecards (
+            candidate_email, candidate_name, feedback_count,
+            technical_skills_sum, technical_skills_count,
+            communication_skills_sum, communication_skills_count,
+            overall_rating_sum, overall_rating_count,
+            recommendation_sum, recommendation_count, last_feedback_at
+        )
+        SELECT s.candidate_email, MAX(s.candidate_name), COUNT(*),
+               COALESCE(SUM(f.technical_skills), 0), COUNT(f.technical_skills),
+               COALESCE(SUM(f.communication_skills), 0), COUNT(f.communication_skills),
+               COALESCE(SUM(f.overall_rating), 0), COUNT(f.overall_rating),
+               COALESCE(SUM(r.score), 0), COUNT(r.score), MAX(f.created_at)
+        FROM interview_feedback f
+        JOIN interview_schedules s ON s.id = f.interview_id
+        CROSS JOIN LATERAL (SELECT {RECOMMENDATION_SCORE_SQL.format(col='f.recommendation')} AS score) r
+        WHERE s.candidate_email IS NOT NULL
+        GROUP BY s.candidate_email
+    """)
 
 class FeedbackService:
     def submit_feedback(self, interview_id: int, feedback_data: Dict):
@@ -24,11 +68,98 @@ class FeedbackService:
                 ))
                 
                 # Update status
-                cur.execute("UPDATE interview_schedules SET status='completed', feedback_submitted=TRUE WHERE id=%s", (interview_id,))
+                cur.execute("""
+                    UPDATE interview_schedules SET status='completed', feedback_submitted=TRUE WHERE id=%s
+                    RETURNING candidate_email, candidate_name
+                """, (interview_id,))
+                interview = cur.fetchone()
+                if interview:
+                    advance_candidates(cur, [{'email': interview[0], 'name': interview[1]}], 'interviewed')
+                self._update_scorecard(cur, interview_id, feedback_data)
                 conn.commit()
+                note_write("scorecards")
                 return True
         except Exception as e:
             conn.rollback()
             raise e
         finally:
             conn.close()
+
+    def _update_scorecard(self, cur, interview_id: int, feedback_data: Dict):
+        """Fold one feedback row into the candidate's running totals (same transaction as the insert)."""
+        values = []
+        for field in ('technical_skills', 'communication_skills', 'overall_rating'):
+            v = feedback_data.get(field)
+            values += [v or 0, 0 if v is None else 1]
+        cur.execute(f"""
+            INSERT INTO candidate_scorecards AS sc (
+                candidate_email, candidate_name, feedback_count,
+                technical_skills_sum, technical_skills_count,
+                communication_skills_sum, communication_skills_count,
+                overall_rating_sum, overall_rating_count,
+                recommendation_sum, recommendation_count, last_feedback_at
+            )
+            SELECT s.candidate_email, s.candidate_name, 1, %s, %s, %s, %s, %s, %s,
+                   COALESCE(r.score, 0), (r.score IS NOT NULL)::int, CURRENT_TIMESTAMP
+            FROM interview_schedules s
+            CROSS JOIN LATERAL (SELECT {RECOMMENDATION_SCORE_SQL.format(col='%s')} AS score) r
+            WHERE s.id = %s AND s.candidate_email IS NOT NULL
+            ON CONFLICT (candidate_email) DO UPDATE SET
+                candidate_name = COALESCE(EXCLUDED.candidate_name, sc.candidate_name),
+                feedback_count = sc.feedback_count + 1,
+                technical_skills_sum = sc.technical_skills_sum + EXCLUDED.technical_skills_sum,
+                technical_skills_count = sc.technical_skills_count + EXCLUDED.technical_skills_count,
+                communication_skills_sum = sc.communication_skills_sum + EXCLUDED.communication_skills_sum,
+                communication_skills_count = sc.communication_skills_count + EXCLUDED.communication_skills_count,
+                overall_rating_sum = sc.overall_rating_sum + EXCLUDED.overall_rating_sum,
+                overall_rating_count = sc.overall_rating_count + EXCLUDED.overall_rating_count,
+                recommendation_sum = sc.recommendation_sum + EXCLUDED.recommendation_sum,
+                recommendation_count = sc.recommendation_count + EXCLUDED.recommendation_count,
+                last_feedback_at = EXCLUDED.last_feedback_at
+        """, (*values, feedback_data.get('recommendation'), interview_id))
+
+    def get_scorecards(self, sort_by: str = "avg_overall_rating", descending: bool = True,
+                       limit: int = 20, offset: int = 0,
+                       after: Optional[Tuple[str, str]] = None) -> Tuple[List[Dict], Optional[Tuple[str, str]]]:
+        """A page of scorecards and the (sort value, candidate_email) key to pass as `after` for the next one.
+
+        With `after` the page starts right after that key (keyset pagination) and `offset` is ignored.
+        """
+        if sort_by not in SCORECARD_SORT_COLUMNS:
+            raise ValueError(f"sort_by must be one of {sorted(SCORECARD_SORT_COLUMNS)}")
+        # Both directions walk the (column DESC NULLS LAST, candidate_email) index, forwards or backwards
+        if descending:
+            order = f"{sort_by} DESC NULLS LAST, candidate_email"
+            seek = f"AND {sort_by} <= %s AND ({sort_by} < %s OR candidate_email > %s)"
+        else:
+            order = f"{sort_by} ASC NULLS FIRST, candidate_email DESC"
+            seek = f"AND {sort_by} >= %s AND ({sort_by} > %s OR candidate_email < %s)"
+        params = []
+        if after:
+            # The first bound starts the index scan at the key; the second skips its ties already sent
+            params = [after[0], after[0], after[1]]
+            offset = 0
+        else:
+            seek = ""
+        conn = get_db_connection(readonly=True, scope="scorecards")
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                # Served straight off the per-column index; cost follows the page, not feedback volume
+                cur.execute(f"""
+                    SELECT candidate_email, candidate_name, feedback_count,
+                           ROUND(avg_technical_skills, 2) AS avg_technical_skills,
+                           ROUND(avg_communication_skills, 2) AS avg_communication_skills,
+                           ROUND(avg_overall_rating, 2) AS avg_overall_rating,
+                           ROUND(avg_recommendation, 2) AS avg_recommendation,
+                           last_feedback_at, {sort_by}::text AS sort_key
+                    FROM candidate_scorecards
+                    WHERE {sort_by} IS NOT NULL {seek}
+                    ORDER BY {order}
+                    LIMIT %s OFFSET %s
+                """, (*params, limit, offset))
+                rows = cur.fetchall()
+        finally:
+            conn.close()
+        # The unrounded value, so the next page starts exactly after this one
+        keys = [(row.pop('sort_key'), row['candidate_email']) for row in rows]
+        return rows, keys[-1] if len(rows) == limit else None
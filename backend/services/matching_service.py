@@ -1,84 +1,275 @@
-from typing import List, Dict
+from typing import Iterator, List, Dict, Optional
+from collections import Counter, OrderedDict
+import itertools
 import re
+import threading
+import time
 from backend.database import get_db_connection
 import psycopg2.extras
 
+def tokenize(text: str) -> set:
+    """Lower-cased word tokens; the representation every match score is computed on."""
+    if not text: return set()
+    return set(re.findall(r"\w+", text.lower()))
+
+class _TenantShard:
+    """One tenant's resumes in memory: display fields plus an inverted index of their tokens."""
+
+    def __init__(self, rows: List[Dict], token_sets: List[set], updated: Optional[List] = None):
+        self.rows = rows
+        # last_updated per row, for exports that only want candidates changed since a sync
+        self.updated = updated or [None] * len(rows)
+        self.sizes = [len(tokens) for tokens in token_sets]
+        self.postings: Dict[str, List[int]] = {}
+        for i, tokens in enumerate(token_sets):
+            for token in tokens:
+                self.postings.setdefault(token, []).append(i)
+        self.loaded_at = time.monotonic()
+        self._matrix = None
+
+    def matrix(self):
+        """(vocabulary, resume x term CSR matrix of 0/1, token counts), built on first batch match."""
+        if self._matrix is None:
+            import numpy as np
+            from scipy import sparse
+            vocabulary = {token: col for col, token in enumerate(self.postings)}
+            rows = np.fromiter((i for postings in self.postings.values() for i in postings), dtype=np.int32)
+            cols = np.repeat(np.arange(len(vocabulary), dtype=np.int32),
+                             [len(postings) for postings in self.postings.values()])
+            data = np.ones(len(rows), dtype=np.float32)
+            terms = sparse.csr_matrix((data, (rows, cols)), shape=(len(self.rows), len(vocabulary)))
+            self._matrix = (vocabulary, terms, np.asarray(self.sizes, dtype=np.float32))
+        return self._matrix
+
 class MatchingService:
-    def __init__(self):
-        # Optional: Load embeddings model here if needed for heavy lifting
-        # For simplicity/speed in this demo, using basic keyword/set matching
-        pass
+    def __init__(self, max_shards: int = 32, shard_ttl_seconds: float = 300):
+        # For simplicity/speed in this demo, using basic keyword/set matching.
+        # Each tenant's resumes are tokenized once and kept as an in-memory shard until
+        # that tenant uploads or resets (see invalidate) or the shard expires.
+        self.max_shards = max_shards
+        self.shard_ttl_seconds = shard_ttl_seconds
+        self._shards: "OrderedDict[int, _TenantShard]" = OrderedDict()
+        self._generation = Counter()  # bumped by invalidate so in-flight loads are not cached
+        self._lock = threading.Lock()
 
     def _normalize_text(self, text: str) -> set:
-        if not text: return set()
-        text = text.lower()
-        tokens = re.findall(r"\w+", text)
-        return set(tokens)
+        return tokenize(text)
 
-    def match_resumes(self, jd_text: str, top_k: int = 5) -> List[Dict]:
-        jd_tokens = self._normalize_text(jd_text)
-        
-        results = []
-        conn = get_db_connection()
+    def invalidate(self, user_id: Optional[int] = None):
+        """Forget the cached shard of one tenant, or of every tenant."""
+        with self._lock:
+            if user_id is None:
+                self._generation[None] += 1
+                self._shards.clear()
+            else:
+                self._generation[user_id] += 1
+                self._shards.pop(user_id, None)
+
+    def _load_shard(self, user_id: int) -> _TenantShard:
+        conn = get_db_connection(readonly=True, scope=("resumes", user_id))
         try:
             from psycopg2.extras import RealDictCursor
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                # Fetch all resumes
-                # Fetch resumes with filename from resume_files
+                # user_id prunes the scan to the tenant's partition
                 cur.execute("""
-                    SELECT 
-                        rd.id, 
-                        rd.candidate_name, 
+                    SELECT
+                        rd.id,
+                        rd.candidate_name,
                         rd.candidate_email,
                         rd.candidate_phone,
                         rd.education,
-                        rd.extracted_text, 
+                        rd.extracted_text,
                         rd.skills,
-                        rf.filename 
+                        rd.duplicate_of,
+                        rd.last_updated,
+                        rf.filename
                     FROM resume_data rd
-                    LEFT JOIN resume_files rf ON rd.resume_file_id = rf.id
+                    LEFT JOIN resume_files rf ON rf.user_id = rd.user_id AND rf.id = rd.resume_file_id
+                    WHERE rd.user_id = %s
                     ORDER BY rd.id ASC
-                """)
+                """, (user_id,))
                 resumes = cur.fetchall()
-                
-                for res in resumes:
-                    resume_text = res.get('extracted_text', '')
-                    resume_tokens = self._normalize_text(resume_text)
-                    
-                    if not jd_tokens or not resume_tokens:
-                        score = 0.0
-                    else:
-                        # Jaccard Similarity
-                        intersection = jd_tokens.intersection(resume_tokens)
-                        union = jd_tokens.union(resume_tokens)
-                        score = len(intersection) / len(union)
-                    
-                    results.append({
-                        "id": res['id'],
-                        "Name": res['candidate_name'] or "Unknown Candidate",
-                        "Email": res['candidate_email'],
-                        "Phone": res['candidate_phone'] or "",
-                        "Education": res['education'] or "",
-                        "MatchScore": score, # 0.0 to 1.0 for frontend multiplication
-                        "File": res['filename'] or "Unknown File",
-                        "Skills": res['skills'] or "",
-                        "ResumeText": res.get('extracted_text', '') # Include text for n8n analysis
-                    })
-                
-                # Sort by score descending
-                results.sort(key=lambda x: x['MatchScore'], reverse=True)
-                
-                # Deduplicate by Email (if present) or Filename
-                seen = set()
-                unique_results = []
-                for r in results:
-                    # Use email as primary dedupe key, fallback to filename
-                    key = r['Email'] if r['Email'] else r['File']
-                    if key not in seen:
-                        seen.add(key)
-                        unique_results.append(r)
-                
-                return unique_results[:top_k]
-                
         finally:
             conn.close()
+
+        rows, token_sets, updated = [], [], []
+        for res in resumes:
+            token_sets.append(self._normalize_text(res.pop('extracted_text', '')))
+            updated.append(res['last_updated'])
+            rows.append({
+                "id": res['id'],
+                "Name": res['candidate_name'] or "Unknown Candidate",
+                "Email": res['candidate_email'],
+                "Phone": res['candidate_phone'] or "",
+                "Education": res['education'] or "",
+                "File": res['filename'] or "Unknown File",
+                "Skills": res['skills'] or "",
+                # Near-duplicate uploads share the id of the cluster's first resume
+                "ClusterId": res['duplicate_of'] or res['id'],
+            })
+        return _TenantShard(rows, token_sets, updated)
+
+    def _shard(self, user_id: int) -> _TenantShard:
+        with self._lock:
+            shard = self._shards.get(user_id)
+            if shard and time.monotonic() - shard.loaded_at < self.shard_ttl_seconds:
+                self._shards.move_to_end(user_id)
+                return shard
+            generation = (self._generation[user_id], self._generation[None])
+        shard = self._load_shard(user_id)
+        with self._lock:
+            if generation != (self._generation[user_id], self._generation[None]):
+                return shard
+            self._shards[user_id] = shard
+            self._shards.move_to_end(user_id)
+            while len(self._shards) > self.max_shards:
+                self._shards.popitem(last=False)
+        return shard
+
+    def _fetch_texts(self, user_id: int, resume_ids: List[int]) -> Dict[int, str]:
+        conn = get_db_connection(readonly=True, scope=("resumes", user_id))
+        try:
+            with conn.cursor() as cur:
+                placeholders = ", ".join(["%s"] * len(resume_ids))
+                cur.execute(f"SELECT id, extracted_text FROM resume_data WHERE user_id = %s AND id IN ({placeholders})",
+                            (user_id, *resume_ids))
+                return {row[0]: row[1] for row in cur.fetchall()}
+        finally:
+            conn.close()
+
+    def _fetch_changed(self, user_id: int, resume_ids: List[int], since) -> Dict:
+        """last_updated of those resume_ids updated, or whose candidate changed stage, after `since`."""
+        conn = get_db_connection(readonly=True, scope=("resumes", user_id))
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT rd.id, rd.last_updated FROM resume_data rd
+                    WHERE rd.user_id = %s AND rd.id = ANY(%s) AND (
+                        rd.last_updated > %s::timestamp
+                        OR rd.candidate_id = ANY(ARRAY(SELECT id FROM candidates WHERE stage_updated_at > %s::timestamp))
+                    )
+                """, (user_id, resume_ids, since, since))
+                return {row[0]: row[1] for row in cur.fetchall()}
+        finally:
+            conn.close()
+
+    def _scores(self, shard: _TenantShard, jd_text: str) -> Dict[int, float]:
+        jd_tokens = self._normalize_text(jd_text)
+        # Jaccard Similarity from posting-list overlap counts; resumes sharing no token score 0
+        overlap = Counter()
+        for token in jd_tokens:
+            overlap.update(shard.postings.get(token, ()))
+        scores = {}
+        for i, intersection in overlap.items():
+            scores[i] = intersection / (len(jd_tokens) + shard.sizes[i] - intersection)
+        return scores
+
+    def match_resumes(self, jd_text: str, top_k: int = 5, include_text: bool = True,
+                      user_id: int = 1) -> List[Dict]:
+        shard = self._shard(user_id)
+        scores = self._scores(shard, jd_text)
+        unique_results = self._top_unique(shard, sorted(scores, key=lambda i: (-scores[i], i)), scores, top_k)
+        if include_text:
+            self._attach_texts(user_id, unique_results)
+        return unique_results
+
+    def iter_matches(self, jd_text: str, user_id: int = 1, include_text: bool = False, since=None,
+                     batch_size: int = 500) -> Iterator[Dict]:
+        """Every unique candidate for the JD, best first: match_resumes without a top_k, produced lazily.
+
+        Scoring happens now; the returned iterator builds result rows (and fetches resume text)
+        batch_size at a time. Each row also carries its Rank in the full list and LastUpdated;
+        with `since` only candidates updated (or moved to another stage) after it are produced.
+        """
+        shard = self._shard(user_id)
+        scores = self._scores(shard, jd_text)
+        ranked = sorted(scores, key=lambda i: (-scores[i], i))
+
+        def produce(batch):
+            if since is not None:
+                # The shard can be minutes old; which rows changed is read from the database
+                changed = self._fetch_changed(user_id, [r['id'] for r in batch], since)
+                batch = [dict(r, LastUpdated=changed[r['id']]) for r in batch if r['id'] in changed]
+            if include_text:
+                self._attach_texts(user_id, batch)
+            return batch
+
+        def results():
+            batch = []
+            for rank, (i, result) in enumerate(self._iter_unique(shard, ranked, scores), 1):
+                batch.append(dict(result, Rank=rank, LastUpdated=shard.updated[i]))
+                if len(batch) >= batch_size:
+                    yield from produce(batch)
+                    batch = []
+            if batch:
+                yield from produce(batch)
+
+        return results()
+
+    def match_batch(self, jd_texts: List[str], top_k: int = 5, include_text: bool = False,
+                    user_id: int = 1) -> List[List[Dict]]:
+        """Top-k resumes for each JD, scored together as one sparse (JD x term) @ (term x resume) product.
+
+        Same scores and ordering as calling match_resumes once per JD.
+        """
+        if not jd_texts:
+            return []
+        import numpy as np
+        from scipy import sparse
+        shard = self._shard(user_id)
+        vocabulary, terms, sizes = shard.matrix()
+
+        jd_tokens = [self._normalize_text(jd) for jd in jd_texts]
+        rows, cols = [], []
+        for row, tokens in enumerate(jd_tokens):
+            for token in tokens:
+                col = vocabulary.get(token)
+                if col is not None:
+                    rows.append(row)
+                    cols.append(col)
+        queries = sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)),
+                                    shape=(len(jd_texts), len(vocabulary)))
+        overlap = (queries @ terms.T).tocsr()
+
+        results = []
+        for row, tokens in enumerate(jd_tokens):
+            start, end = overlap.indptr[row], overlap.indptr[row + 1]
+            idx = overlap.indices[start:end]
+            inter = overlap.data[start:end].astype(np.float64)
+            # Jaccard Similarity: |J & R| / (|J| + |R| - |J & R|)
+            values = inter / (len(tokens) + sizes[idx] - inter)
+            order = np.lexsort((idx, -values))
+            scores = dict(zip(idx[order].tolist(), values[order].tolist()))
+            results.append(self._top_unique(shard, scores, scores, top_k))
+
+        if include_text:
+            self._attach_texts(user_id, [r for matches in results for r in matches])
+        return results
+
+    def _top_unique(self, shard: _TenantShard, ranked, scores: Dict[int, float], top_k: int) -> List[Dict]:
+        """The first top_k unique candidates of `ranked` shard rows (see _iter_unique)."""
+        return [r for _, r in itertools.islice(self._iter_unique(shard, ranked, scores), top_k)]
+
+    def _iter_unique(self, shard: _TenantShard, ranked, scores: Dict[int, float]):
+        """(shard row, result) for each unique candidate of `ranked`; zero scores follow in id order."""
+        ranked = itertools.chain(ranked, (i for i in range(len(shard.rows)) if i not in scores))
+
+        # Deduplicate by Email (if present) or Filename, and by near-duplicate cluster
+        seen = set()
+        seen_clusters = set()
+        for i in ranked:
+            r = shard.rows[i]
+            # Use email as primary dedupe key, fallback to filename
+            key = r['Email'] if r['Email'] else r['File']
+            if key not in seen and r['ClusterId'] not in seen_clusters:
+                seen.add(key)
+                seen_clusters.add(r['ClusterId'])
+                yield i, dict(r, MatchScore=scores.get(i, 0.0))  # 0.0 to 1.0 for frontend multiplication
+
+    def _attach_texts(self, user_id: int, results: List[Dict]):
+        if not results:
+            return
+        # Include text for n8n analysis; only the shortlist's text leaves the database
+        texts = self._fetch_texts(user_id, list({r['id'] for r in results}))
+        for r in results:
+            r["ResumeText"] = texts.get(r['id'], '')
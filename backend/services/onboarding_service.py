@@ -1,54 +1,74 @@
-from typing import Dict
+from typing import Dict, List
+from functools import lru_cache
 from backend.database import get_db_connection
+from backend.services.pipeline_service import advance_candidates
+from psycopg2.extras import execute_values
 from datetime import datetime
 
-class OnboardingService:
-    def generate_offer_letter(self, candidate_name: str, role: str, start_date: str, salary: str):
-        # In a real app, this would use a template engine like Jinja2 or python-docx
-        return f"""
+OFFER_LETTER_TEMPLATE = """
         OFFER LETTER
         
-        Dear {candidate_name},
+        Dear {{ candidate_name }},
         
-        We are thrilled to offer you the position of {role}!
+        We are thrilled to offer you the position of {{ role }}!
         
-        Start Date: {start_date}
-        Salary: {salary}
+        Start Date: {{ start_date }}
+        Salary: {{ salary }}
         
         Welcome to the team!
         """
+
+@lru_cache(maxsize=1)
+def get_offer_template():
+    """Compile the offer letter template once per process."""
+    from jinja2 import Environment, StrictUndefined
+    env = Environment(autoescape=False, undefined=StrictUndefined, keep_trailing_newline=True)
+    return env.from_string(OFFER_LETTER_TEMPLATE)
+
+class OnboardingService:
+    def generate_offer_letter(self, candidate_name: str, role: str, start_date: str, salary: str):
+        return get_offer_template().render(
+            candidate_name=candidate_name, role=role, start_date=start_date, salary=salary
+        )
         
     def initiate_onboarding(self, candidate_email: str, offer_details: Dict):
+        result = self.initiate_onboarding_batch([dict(offer_details, candidate_email=candidate_email)])
+        return bool(result['started'])
+
+    def initiate_onboarding_batch(self, offers: List[Dict]) -> Dict:
+        """Extend offers to a cohort: one lookup, one multi-row insert, one pipeline update."""
+        by_email = {}
+        for offer in offers:
+            by_email.setdefault(offer['candidate_email'].strip().lower(), offer)
+        if not by_email:
+            return {"started": [], "not_found": []}
+
         conn = get_db_connection()
         try:
             with conn.cursor() as cur:
-                # Mocking a candidates table lookup or similar
-                cur.execute("SELECT candidate_name FROM resume_data WHERE candidate_email = %s LIMIT 1", (candidate_email,))
-                res = cur.fetchone()
-                if not res:
-                    return False
-                
-                name = res['candidate_name']
-                letter = self.generate_offer_letter(name, offer_details['role'], offer_details['start_date'], offer_details['salary'])
-                
-                # Save to onboarding_tasks
-                cur.execute("""
-                    CREATE TABLE IF NOT EXISTS onboarding_tasks (
-                        id SERIAL PRIMARY KEY,
-                        candidate_email VARCHAR(255),
-                        status VARCHAR(50),
-                        offer_letter_text TEXT,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                """)
-                
-                cur.execute("""
-                    INSERT INTO onboarding_tasks (candidate_email, status, offer_letter_text)
-                    VALUES (%s, 'offer_sent', %s)
-                """, (candidate_email, letter))
+                cur.execute("SELECT id, email, name FROM candidates WHERE email = ANY(%s)", (list(by_email),))
+                found = {email: (cid, name) for cid, email, name in cur.fetchall()}
+
+                rows = []
+                for email, offer in by_email.items():
+                    if email not in found:
+                        continue
+                    cid, name = found[email]
+                    letter = self.generate_offer_letter(name or email, offer['role'], offer['start_date'], offer['salary'])
+                    rows.append((offer['candidate_email'], cid, 'offer_sent', letter))
+
+                if rows:
+                    execute_values(cur, """
+                        INSERT INTO onboarding_tasks (candidate_email, candidate_id, status, offer_letter_text)
+                        VALUES %s
+                    """, rows)
+                    advance_candidates(cur, [{'email': email} for email in found], 'offer_sent')
                 
             conn.commit()
-            return True
+            return {
+                "started": [by_email[e]['candidate_email'] for e in by_email if e in found],
+                "not_found": [by_email[e]['candidate_email'] for e in by_email if e not in found],
+            }
         except Exception as e:
             conn.rollback()
             raise e
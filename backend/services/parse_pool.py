@@ -0,0 +1,216 @@
+"""Text extraction in recycled worker subprocesses.
+
+PyMuPDF runs native code that a malformed or enormous PDF can send into a
+long loop or a huge allocation, which no Python-level timeout can interrupt.
+ParsePool runs extract_text_and_links in separate processes instead: each file
+gets a wall-clock timeout after which its worker is killed and replaced, each
+worker's address space is capped (RLIMIT_AS) so a runaway allocation fails
+inside the worker, PDFs over max_pages are refused, and workers are recycled
+after max_tasks_per_child files so leaked native memory does not pile up.
+The regex field extraction stays in the calling process.
+"""
+import collections
+import multiprocessing
+import os
+import queue
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+DEFAULTS = {
+    "workers": 4,
+    "timeout_seconds": 20,
+    "memory_limit_mb": 512,
+    "max_pages": 50,
+    "max_tasks_per_child": 50,
+}
+
+
+# How MuPDF reports an allocation refused by the address-space cap
+ALLOCATION_FAILED_RE = re.compile(r"\b(?:m|re|c)alloc\b.*\bfailed\b")
+
+
+class ParseLimitExceeded(ValueError):
+    """The file broke a parsing limit (time, memory, pages, or the worker died on it)."""
+
+
+class ParseTimeout(ParseLimitExceeded):
+    pass
+
+
+def _address_space_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def _worker_main(conn, memory_limit_mb: int, max_pages: int):
+    from backend.services.resume_service import TooManyPages, extract_text_and_links
+    import fitz  # loaded before the cap so the limit is headroom for the document alone
+    if memory_limit_mb:
+        import resource
+        used = _address_space_bytes()
+        if used is not None:
+            limit = used + memory_limit_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            return
+        if task is None:
+            return
+        content, filename = task
+        try:
+            result = ("ok", extract_text_and_links(content, filename, max_pages))
+        except MemoryError:
+            result = ("memory", f"Parsing exceeded the {memory_limit_mb} MB memory limit")
+        except TooManyPages as e:
+            result = ("pages", str(e))
+        except Exception as e:
+            if ALLOCATION_FAILED_RE.search(str(e)):
+                result = ("memory", f"Parsing exceeded the {memory_limit_mb} MB memory limit ({e})")
+            else:
+                result = ("error", str(e) or type(e).__name__)
+        try:
+            conn.send(result)
+        except MemoryError:
+            conn.send(("memory", f"Parsing exceeded the {memory_limit_mb} MB memory limit"))
+
+
+class _Worker:
+    def __init__(self, context, config: Dict):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn, int(config["memory_limit_mb"]), int(config["max_pages"])),
+            name="parse-worker", daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.tasks = 0
+
+    def stop(self, kill: bool = False):
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except (OSError, ValueError):
+                self.process.kill()
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class ParsePool:
+    def __init__(self, config: Optional[Dict] = None):
+        self.config = dict(DEFAULTS, **(config or {}))
+        self.timeout = float(self.config["timeout_seconds"])
+        self.max_tasks_per_child = int(self.config["max_tasks_per_child"])
+        # spawn: the API process is multi-threaded, and forking it could copy a held lock
+        self._context = multiprocessing.get_context("spawn")
+        self._idle: "queue.Queue[Optional[_Worker]]" = queue.Queue()
+        for _ in range(int(self.config["workers"])):
+            self._idle.put(None)  # started on first use or by warm()
+        self._lock = threading.Lock()
+        self._latencies = collections.deque(maxlen=500)
+        self.counts = dict.fromkeys(("parsed", "errors", "timeouts", "memory", "too_many_pages", "crashes",
+                                     "recycled"), 0)
+        self._closed = False
+
+    def _count(self, outcome: str, started: float):
+        with self._lock:
+            self.counts[outcome] += 1
+            self._latencies.append(time.monotonic() - started)
+
+    def warm(self):
+        """Start every worker now, so the first files do not wait for interpreter start-up."""
+        for _ in range(int(self.config["workers"])):
+            worker = self._idle.get()
+            if worker is None and not self._closed:
+                worker = _Worker(self._context, self.config)
+            self._idle.put(worker)
+
+    def extract(self, content: bytes, filename: str) -> Tuple[str, List[str]]:
+        """(text, links) of one file, as extract_text_and_links returns them, under the pool's limits."""
+        if self._closed:
+            raise RuntimeError("Parse pool is shut down")
+        worker = self._idle.get()
+        started = time.monotonic()
+        try:
+            if worker is None or not worker.process.is_alive():
+                worker = _Worker(self._context, self.config)
+            try:
+                worker.conn.send((content, filename))
+                # Start-up of a fresh worker counts against the file's time: it is part of the wait
+                if not worker.conn.poll(self.timeout):
+                    worker.stop(kill=True)
+                    worker = None
+                    self._count("timeouts", started)
+                    raise ParseTimeout(f"Parsing {filename} took longer than {self.timeout:g}s")
+                status, value = worker.conn.recv()
+            except (EOFError, OSError):
+                # Killed by the kernel or crashed in native code
+                worker.stop(kill=True)
+                worker = None
+                self._count("crashes", started)
+                raise ParseLimitExceeded(f"Parser worker died on {filename}")
+            worker.tasks += 1
+            if status == "ok":
+                self._count("parsed", started)
+                return value
+            if status == "memory":
+                # A worker that hit the cap may have fragmented its heap; start clean
+                worker.stop()
+                worker = None
+                self._count("memory", started)
+                raise ParseLimitExceeded(value)
+            if status == "pages":
+                self._count("too_many_pages", started)
+                raise ParseLimitExceeded(value)
+            self._count("errors", started)
+            raise ValueError(value)
+        finally:
+            if worker is not None and self._closed:
+                worker.stop()
+                worker = None
+            elif worker is not None and worker.tasks >= self.max_tasks_per_child:
+                worker.stop()
+                worker = None
+                with self._lock:
+                    self.counts["recycled"] += 1
+            if worker is None and not self._closed:
+                # Replace a killed or retired worker right away; it starts up while the next file is on its way
+                try:
+                    worker = _Worker(self._context, self.config)
+                except Exception as e:
+                    print(f"Could not start a parse worker: {e}")
+            self._idle.put(worker)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            counts = dict(self.counts)
+
+        def pct(p):
+            return round(latencies[max(0, min(len(latencies) - 1, int(round(p / 100.0 * len(latencies))) - 1))]
+                         * 1000, 2) if latencies else None
+
+        return dict(counts, limits={k: self.config[k] for k in DEFAULTS},
+                    latency_ms={"samples": len(latencies), "p50": pct(50), "p99": pct(99),
+                                "max": pct(100)})
+
+    def shutdown(self):
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            if worker is not None:
+                worker.stop()
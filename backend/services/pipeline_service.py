@@ -0,0 +1,139 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional
+from psycopg2.extras import execute_values
+from backend.database import get_db_connection
+
+# Candidates only ever move forward through these stages
+PIPELINE_STAGES = ("applied", "interview_scheduled", "interviewed", "offer_sent", "hired", "rejected")
+_STAGES_SQL = "ARRAY[" + ", ".join(f"'{s}'" for s in PIPELINE_STAGES) + "]::varchar[]"
+
+
+def advance_candidates(cur, people: Iterable[Dict], stage: str, user_id: Optional[int] = None) -> Dict[str, int]:
+    """Upsert candidates by email and move them to `stage` unless they are already past it.
+
+    Runs on the caller's cursor so the stage change commits atomically with the
+    event that caused it. Every actual transition is logged to
+    candidate_stage_events. With `user_id` (ingest) that tenant's resumes of these
+    candidates are linked to them (candidate_id, interview_status); other tenants'
+    partitions are never touched. Readers take the current stage from candidates.
+    Returns {normalized email: candidate id}.
+    """
+    if stage not in PIPELINE_STAGES:
+        raise ValueError(f"Unknown pipeline stage: {stage}")
+    rows = {}
+    for p in people:
+        email = (p.get('email') or '').strip().lower()
+        if email:
+            rows[email] = (email, p.get('name') or None, p.get('phone') or p.get('mobile') or None, stage)
+    if not rows:
+        return {}
+
+    # Locks are taken in email order (new rows as they are inserted, then existing ones) so
+    # concurrent batches queue on each other instead of deadlocking. Whether a candidate moved
+    # comes from the stage read under the lock: stage_updated_at cannot tell, as CURRENT_TIMESTAMP
+    # is the start of the transaction, which may already have moved it.
+    emails = sorted(rows)
+    inserted = dict(execute_values(cur, """
+        INSERT INTO candidates (email, name, phone, stage) VALUES %s
+        ON CONFLICT (email) DO NOTHING
+        RETURNING email, id
+    """, [rows[email] for email in emails], template="(%s, %s, %s, %s::varchar)", fetch=True))
+    existing = [email for email in emails if email not in inserted]
+    prior = {}
+    if existing:
+        cur.execute("SELECT email, stage FROM candidates WHERE email = ANY(%s) ORDER BY email FOR UPDATE",
+                    (existing,))
+        prior = dict(cur.fetchall())
+
+    synced = "" if user_id is None else f""",
+        synced AS (
+            UPDATE resume_data rd
+            SET candidate_id = m.id, interview_status = m.stage, last_updated = CURRENT_TIMESTAMP
+            FROM merged m
+            WHERE rd.user_id = {int(user_id)} AND lower(rd.candidate_email) = m.email
+              AND (rd.candidate_id IS DISTINCT FROM m.id OR rd.interview_status IS DISTINCT FROM m.stage)
+        )"""
+    result = execute_values(cur, f"""
+        WITH incoming AS (
+            SELECT * FROM (VALUES %s) AS v(email, name, phone, stage, prior_stage, new_id)
+        ),
+        updated AS (
+            UPDATE candidates c SET
+                name = COALESCE(i.name, c.name),
+                phone = COALESCE(i.phone, c.phone),
+                stage = CASE WHEN array_position({_STAGES_SQL}, i.stage) > array_position({_STAGES_SQL}, c.stage)
+                             THEN i.stage ELSE c.stage END,
+                stage_updated_at = CASE WHEN array_position({_STAGES_SQL}, i.stage)
+                                             > array_position({_STAGES_SQL}, c.stage)
+                                        THEN CURRENT_TIMESTAMP ELSE c.stage_updated_at END
+            FROM incoming i
+            WHERE i.new_id IS NULL AND c.email = i.email
+            RETURNING c.id, c.email, c.stage, i.prior_stage
+        ),
+        merged AS (
+            SELECT id, email, stage, prior_stage FROM updated
+            UNION ALL
+            SELECT new_id, email, stage, NULL FROM incoming WHERE new_id IS NOT NULL
+        ),
+        logged AS (
+            INSERT INTO candidate_stage_events (candidate_id, stage)
+            SELECT id, stage FROM merged WHERE prior_stage IS DISTINCT FROM stage
+        ){synced}
+        SELECT email, id FROM merged
+    """, [rows[email] + (prior.get(email), inserted.get(email)) for email in emails],
+        template="(%s, %s, %s, %s::varchar, %s::varchar, %s::int)", fetch=True)
+    return {email: cid for email, cid in result}
+
+
+def backfill_candidates(cur):
+    """Seed the candidates table from resumes and interviews recorded before it existed."""
+    cur.execute("""
+        SELECT DISTINCT ON (lower(candidate_email)) candidate_email, candidate_name, candidate_phone
+        FROM resume_data WHERE candidate_email IS NOT NULL AND candidate_email <> ''
+        ORDER BY lower(candidate_email), id DESC
+    """)
+    advance_candidates(cur, [{'email': e, 'name': n, 'phone': p} for e, n, p in cur.fetchall()], 'applied')
+    cur.execute("""
+        SELECT candidate_email, MAX(candidate_name), BOOL_OR(feedback_submitted)
+        FROM interview_schedules WHERE candidate_email IS NOT NULL
+        GROUP BY candidate_email
+    """)
+    interviews = cur.fetchall()
+    advance_candidates(cur, [{'email': e, 'name': n} for e, n, _ in interviews], 'interview_scheduled')
+    advance_candidates(cur, [{'email': e, 'name': n} for e, n, done in interviews if done], 'interviewed')
+    cur.execute("""
+        UPDATE resume_data rd SET candidate_id = c.id
+        FROM candidates c
+        WHERE rd.candidate_id IS NULL AND lower(rd.candidate_email) = c.email
+    """)
+    cur.execute("""
+        UPDATE interview_schedules s SET candidate_id = c.id
+        FROM candidates c
+        WHERE s.candidate_id IS NULL AND lower(s.candidate_email) = c.email
+    """)
+
+
+class PipelineService:
+    def get_summary(self, since: Optional[datetime] = None) -> Dict:
+        """Current head-count per stage plus how many candidates entered each stage since `since`."""
+        since = since or datetime.utcnow() - timedelta(days=7)
+        conn = get_db_connection(readonly=True)
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT stage, COUNT(*) FROM candidates GROUP BY stage")
+                current = dict(cur.fetchall())
+                cur.execute("""
+                    SELECT stage, COUNT(*) FROM candidate_stage_events
+                    WHERE entered_at >= %s
+                    GROUP BY stage
+                """, (since,))
+                entered = dict(cur.fetchall())
+        finally:
+            conn.close()
+        return {
+            "since": since.isoformat(),
+            "stages": [
+                {"stage": s, "current": current.get(s, 0), "entered_since": entered.get(s, 0)}
+                for s in PIPELINE_STAGES
+            ],
+        }
@@ -1,10 +1,33 @@
 import re
 import os
-from typing import List, Dict, Any, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import json
-import fitz  # PyMuPDF
-from docx import Document
-from backend.database import get_db_connection
+from backend.database import get_db_connection, note_write
+from backend.services.pipeline_service import advance_candidates
+from backend.services.dedup_service import flag_duplicate
+from backend.services.tenant_service import with_tenant_partitions
+
+# Called with the resume_data ids of every committed ingest, after its connection is closed
+_ingest_hooks: List[Callable[[List[int]], None]] = []
+# Called as hook(cur, user_id, resume_ids) inside the ingest transaction, e.g. to record
+# follow-up work durably; an error here fails the ingest
+_ingest_transaction_hooks: List[Callable] = []
+
+def register_ingest_hook(hook: Callable[[List[int]], None]):
+    if hook not in _ingest_hooks:
+        _ingest_hooks.append(hook)
+
+def register_ingest_transaction_hook(hook: Callable):
+    if hook not in _ingest_transaction_hooks:
+        _ingest_transaction_hooks.append(hook)
+
+def _run_ingest_hooks(resume_ids: List[int]):
+    for hook in _ingest_hooks:
+        try:
+            hook(resume_ids)
+        except Exception as e:
+            # Downstream stages must never fail an ingest that already committed
+            print(f"Ingest hook {getattr(hook, '__name__', hook)} failed: {e}")
 
 # Regex Patterns
 EMAIL_RE = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b")
@@ -22,6 +45,43 @@ PHONE_RE = re.compile(
     r"|\b(?:6|7|8|9)\d{9}\b"
     r"|\b\d{4}[-.\s]?\d{3}[-.\s]?\d{3}\b)"
 )
+# A PHONE_RE match is made of digits, separators and brackets, with a '+' only as
+# its first character, and holds at least 5 digits. So every match sits inside
+# one run found by this single class scan (plus a '+' or '(' just before it).
+_PHONE_RUN_RE = re.compile(r"\d[\d()\s.-]*")
+PHONE_MIN_DIGITS = 5
+# Every branch starts with '+', '(' or a digit at a word boundary. Checking that
+# once up front rejects a position in three steps instead of twelve failed branches.
+_PHONE_SCAN_RE = re.compile(r"(?=[+(]|\b\d)" + PHONE_RE.pattern)
+
+def iter_phone_matches(text: str):
+    """Yield exactly the matches of PHONE_RE.finditer(text), in linear time with a small constant.
+
+    Text between digit runs is skipped at the speed of the run scan, and inside
+    a run only positions that can start a number reach the alternation.
+    """
+    for run in _PHONE_RUN_RE.finditer(text):
+        start, end = run.span()
+        if end - start < PHONE_MIN_DIGITS:
+            continue
+        if start and text[start - 1] in "+(":
+            start -= 1
+        # endpos keeps the character after the run so a trailing \b sees real context
+        yield from _PHONE_SCAN_RE.finditer(text, start, end + 1)
+
+def find_phone_numbers(text: str) -> List[str]:
+    """Same result as PHONE_RE.findall(text)."""
+    return [m.group(0) for m in iter_phone_matches(text)]
+
+def contains_phone_number(text: str) -> bool:
+    return next(iter_phone_matches(text), None) is not None
+
+def phone_score(phone: str) -> int:
+    score = 0
+    if "+" in phone: score += 2
+    if len(re.sub(r"\D", "", phone)) == 10: score += 1
+    if re.search(r"[6-9]\d{9}", phone): score += 1
+    return score
 
 MAJOR_SECTION_HINTS = (
     "education", "experience", "work experience", "employment", "skills", "projects",
@@ -68,14 +128,18 @@ def guess_name_from_email(email: str) -> Optional[str]:
     return " ".join(parts).strip() or None
 
 def extract_name(text: str) -> Optional[str]:
+    return extract_name_scored(text)[0]
+
+def extract_name_scored(text: str) -> Tuple[Optional[str], float]:
+    """Best name guess and a 0-1 confidence reflecting which heuristic found it."""
     lines = [clean_line_for_name(l) for l in text.splitlines() if l.strip()]
     if not lines:
-        return None
+        return None, 0.0
 
     contact_idx = None
     first_section_idx = None
     for i, l in enumerate(lines[:100]):
-        if contact_idx is None and (EMAIL_RE.search(l) or PHONE_RE.search(l)):
+        if contact_idx is None and (EMAIL_RE.search(l) or contains_phone_number(l)):
             contact_idx = i
         low = l.lower()
         if first_section_idx is None and any(h in low for h in MAJOR_SECTION_HINTS):
@@ -106,7 +170,8 @@ def extract_name(text: str) -> Optional[str]:
 
     if candidates:
         candidates.sort(key=lambda x: (-x[0], x[1]))
-        return candidates[0][2]
+        # Two or three capitalised tokens near the top scores 6+
+        return candidates[0][2], min(1.0, candidates[0][0] / 6)
     
     # Fallback strategies
     if contact_idx and contact_idx > 0:
@@ -115,35 +180,33 @@ def extract_name(text: str) -> Optional[str]:
             if not (looks_like_section_header(l) or "@" in l or re.search(r"\d", l)):
                 tokens = re.findall(r"[A-Za-z][A-Za-z'’\-]*\.?", l)
                 if 1 <= len(tokens) <= 5:
-                    return " ".join(t.strip(" .") for t in tokens)
+                    return " ".join(t.strip(" .") for t in tokens), 0.5
     
     m = EMAIL_RE.search("\n".join(lines[:100]))
     if m:
-        return guess_name_from_email(m.group(0))
+        guess = guess_name_from_email(m.group(0))
+        return guess, 0.3 if guess else 0.0
         
-    return None
+    return None, 0.0
 
 def extract_contact_number(text: str) -> Optional[str]:
     all_matches = []
-    for match in re.findall(PHONE_RE, text):
-        if isinstance(match, tuple): match = max(match, key=len)
+    seen = set()
+    for match in find_phone_numbers(text):
         cleaned = re.sub(r"[^\d\+]", "", match)
-        if 8 <= len(cleaned.replace("+", "")) <= 15 and match not in all_matches:
+        if 8 <= len(cleaned.replace("+", "")) <= 15 and match not in seen:
+            seen.add(match)
             all_matches.append(match)
     
     if not all_matches: return None
 
-    def phone_score(phone: str) -> int:
-        score = 0
-        if "+" in phone: score += 2
-        if len(re.sub(r"\D", "", phone)) == 10: score += 1
-        if re.search(r"[6-9]\d{9}", phone): score += 1
-        return score
-
     all_matches.sort(key=phone_score, reverse=True)
     return all_matches[0]
 
 def extract_email(text: str) -> Optional[str]:
+    return extract_email_scored(text)[0]
+
+def extract_email_scored(text: str) -> Tuple[Optional[str], float]:
     # Try finding "Email:" or similar label first for higher confidence
     lines = text.splitlines()
     for line in lines[:50]: # Look in first 50 lines usually
@@ -151,15 +214,21 @@ def extract_email(text: str) -> Optional[str]:
             # Extract email from this line
             matches = EMAIL_RE.findall(line)
             if matches:
-                 return matches[0]
+                 return matches[0], 1.0
 
     # Fallback to general search
     matches = EMAIL_RE.findall(text)
     if matches:
         for email in matches:
             if not any(stop in email.lower() for stop in ["example.com", "test.com", "placeholder"]):
-                return email
-    return None
+                return email, 0.8
+    return None, 0.0
+
+def contact_number_confidence(phone: Optional[str]) -> float:
+    if not phone:
+        return 0.0
+    digits = re.sub(r"\D", "", phone)
+    return 0.9 if "+" in phone or len(digits) == 10 else 0.6
 
 def extract_skills(text: str) -> List[str]:
     found_skills = set()
@@ -318,9 +387,26 @@ def extract_education(text: str) -> List[str]:
                 
     return entries[:3]
 
-def extract_text_and_links_from_pdf_stream(file_stream: bytes) -> Tuple[str, List[str]]:
+def education_confidence(entries: List[str]) -> float:
+    if not entries:
+        return 0.0
+    # Entries with an institution or grade attached are rarely false positives
+    return 0.9 if any(", " in e for e in entries) else 0.5
+
+class TooManyPages(ValueError):
+    pass
+
+def extract_text_and_links_from_pdf_stream(file_stream: bytes, max_pages: Optional[int] = None) -> Tuple[str, List[str]]:
+    import fitz  # PyMuPDF; imported on first parse to keep API startup fast
     try:
         doc = fitz.open(stream=file_stream, filetype="pdf")
+    except Exception as e:
+        raise ValueError(f"PDF read failed: {e}")
+    if max_pages and doc.page_count > max_pages:
+        pages = doc.page_count
+        doc.close()
+        raise TooManyPages(f"PDF has {pages} pages, over the limit of {max_pages}")
+    try:
         text = ""
         links = []
         for page in doc:
@@ -335,24 +421,110 @@ def extract_text_and_links_from_pdf_stream(file_stream: bytes) -> Tuple[str, Lis
     except Exception as e:
         raise ValueError(f"PDF read failed: {e}")
 
-def parse_resume(file_content: bytes, filename: str) -> Dict[str, Any]:
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+R_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+HYPERLINK_FIELD_RE = re.compile(r'HYPERLINK\s+"([^"]+)"')
+
+def _docx_relationship_targets(zf) -> Dict[str, str]:
+    try:
+        data = zf.read("word/_rels/document.xml.rels")
+    except KeyError:
+        return {}
+    import xml.etree.ElementTree as ET
+    root = ET.fromstring(data)
+    return {
+        rel.get("Id"): rel.get("Target")
+        for rel in root.iter(PKG_REL_NS + "Relationship")
+        if rel.get("Type", "").endswith("/hyperlink")
+    }
+
+def extract_text_and_links_from_docx_stream(file_stream: bytes) -> Tuple[str, List[str]]:
+    """Stream text and hyperlinks out of word/document.xml without building an object model.
+
+    Paragraphs become lines in document order; each table row becomes one line of
+    cell texts joined by " | ". Hyperlinks are resolved through the document's
+    relationships, plus HYPERLINK field codes.
+    """
+    import io
+    import zipfile
+    import xml.etree.ElementTree as ET
+    try:
+        zf = zipfile.ZipFile(io.BytesIO(file_stream))
+        targets = _docx_relationship_targets(zf)
+        lines: List[str] = []
+        links: List[str] = []
+        paragraphs: List[List[str]] = []   # open paragraphs (text boxes can nest them)
+        rows: List[List[str]] = []         # open table rows, innermost last
+        cells: List[List[str]] = []        # paragraph texts of open table cells
+
+        with zf.open("word/document.xml") as xml_stream:
+            for event, elem in ET.iterparse(xml_stream, events=("start", "end")):
+                tag = elem.tag
+                if event == "start":
+                    if tag == W_NS + "p":
+                        paragraphs.append([])
+                    elif tag == W_NS + "tr":
+                        rows.append([])
+                    elif tag == W_NS + "tc":
+                        cells.append([])
+                    elif tag == W_NS + "hyperlink":
+                        target = targets.get(elem.get(R_NS + "id"))
+                        if target:
+                            links.append(target)
+                    continue
+
+                if tag == W_NS + "t":
+                    if paragraphs and elem.text:
+                        paragraphs[-1].append(elem.text)
+                elif tag == W_NS + "tab":
+                    if paragraphs:
+                        paragraphs[-1].append("\t")
+                elif tag in (W_NS + "br", W_NS + "cr"):
+                    if paragraphs:
+                        paragraphs[-1].append("\n")
+                elif tag == W_NS + "instrText":
+                    m = HYPERLINK_FIELD_RE.search(elem.text or "")
+                    if m:
+                        links.append(m.group(1))
+                elif tag == W_NS + "p":
+                    text = "".join(paragraphs.pop())
+                    if cells:
+                        cells[-1].append(text)
+                    else:
+                        lines.append(text)
+                    elem.clear()
+                elif tag == W_NS + "tc":
+                    cell_text = " ".join(t for t in cells.pop() if t.strip())
+                    if rows:
+                        rows[-1].append(cell_text)
+                elif tag == W_NS + "tr":
+                    row_text = " | ".join(c for c in rows.pop() if c)
+                    if cells:
+                        cells[-1].append(row_text)
+                    else:
+                        lines.append(row_text)
+                    elem.clear()
+        return "\n".join(lines), links
+    except Exception as e:
+        raise ValueError(f"DOCX read failed: {e}")
+
+def extract_text_and_links(file_content: bytes, filename: str, max_pages: Optional[int] = None) -> Tuple[str, List[str]]:
     ext = os.path.splitext(filename)[1].lower()
-    text = ""
-    links = []
-    
     if ext == ".pdf":
-        text, links = extract_text_and_links_from_pdf_stream(file_content)
+        return extract_text_and_links_from_pdf_stream(file_content, max_pages)
     elif ext == ".docx":
-        # python-docx requires file-like object
-        import io
-        doc = Document(io.BytesIO(file_content))
-        text = "\n".join([p.text for p in doc.paragraphs])
-        # TODO: extracting links from docx is harder with python-docx, skipping for now as per likely PDF usage
+        return extract_text_and_links_from_docx_stream(file_content)
     else:
         raise ValueError(f"Unsupported file type: {ext}")
+
+def parse_resume(file_content: bytes, filename: str,
+                 extract: Callable[[bytes, str], Tuple[str, List[str]]] = extract_text_and_links) -> Dict[str, Any]:
+    """Fields of one resume file; `extract` gets its text and links (e.g. ParsePool.extract for isolation)."""
+    text, links = extract(file_content, filename)
         
-    name = extract_name(text) or ""
-    email = extract_email(text)
+    name, name_conf = extract_name_scored(text)
+    email, email_conf = extract_email_scored(text)
     
     # Fallback to links for email if not found in text
     if not email and links:
@@ -360,7 +532,7 @@ def parse_resume(file_content: bytes, filename: str) -> Dict[str, Any]:
             if link.startswith("mailto:"):
                 potential_email = link.replace("mailto:", "").strip()
                 if EMAIL_RE.match(potential_email):
-                    email = potential_email
+                    email, email_conf = potential_email, 0.9
                     break
 
     phone = extract_contact_number(text) or ""
@@ -369,15 +541,25 @@ def parse_resume(file_content: bytes, filename: str) -> Dict[str, Any]:
     
     return {
         "filename": filename,
-        "name": name,
+        "name": name or "",
         "email": email or "",
         "mobile": phone,
         "raw_text": text,
         "skills": ", ".join(skills),
-        "education": "; ".join(education)
+        "education": "; ".join(education),
+        # 0-1 per field; low scores are candidates for the LLM fallback (extraction_fallback)
+        "confidence": {
+            "name": round(name_conf, 2),
+            "email": email_conf,
+            "mobile": contact_number_confidence(phone),
+            "education": education_confidence(education),
+        },
     }
 
 def save_resume_to_db(data: Dict, user_id: int):
+    return with_tenant_partitions(user_id, lambda: _save_resume(data, user_id))
+
+def _save_resume(data: Dict, user_id: int):
     conn = get_db_connection()
     try:
         with conn.cursor() as cur:
@@ -402,25 +584,39 @@ def save_resume_to_db(data: Dict, user_id: int):
                 INSERT INTO resume_data (resume_file_id, user_id, candidate_name, candidate_email, 
                                          candidate_phone, extracted_text, skills, education)
                 VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (resume_file_id) DO UPDATE 
+                ON CONFLICT (user_id, resume_file_id) DO UPDATE 
                 SET candidate_name = EXCLUDED.candidate_name,
                     candidate_email = EXCLUDED.candidate_email,
                     extracted_text = EXCLUDED.extracted_text,
                     skills = EXCLUDED.skills,
-                    education = EXCLUDED.education
+                    education = EXCLUDED.education,
+                    last_updated = CURRENT_TIMESTAMP
+                RETURNING id
             """, (file_id, user_id, data['name'], data['email'], data['mobile'], data['raw_text'], data['skills'], data.get('education', '')))
+            resume_id = cur.fetchone()[0]
+            data['duplicate_of'] = flag_duplicate(cur, resume_id, data['raw_text'], user_id)
+            advance_candidates(cur, [data], 'applied', user_id)
+            for hook in _ingest_transaction_hooks:
+                hook(cur, user_id, [resume_id])
         
         conn.commit()
-        return file_id
     except Exception as e:
         conn.rollback()
         raise e
     finally:
         conn.close()
+    note_write(("resumes", user_id))
+    # Hooks may open connections of their own; this one is already back
+    _run_ingest_hooks([resume_id])
+    return file_id
 
 def save_resumes_batch(data_list: List[Dict], user_id: int) -> List[int]:
+    return with_tenant_partitions(user_id, lambda: _save_batch(data_list, user_id))
+
+def _save_batch(data_list: List[Dict], user_id: int) -> List[int]:
     conn = get_db_connection()
     file_ids = []
+    resume_ids = []
     try:
         with conn.cursor() as cur:
             # 1. Bulk Insert into resume_files
@@ -451,18 +647,50 @@ def save_resumes_batch(data_list: List[Dict], user_id: int) -> List[int]:
                     INSERT INTO resume_data (resume_file_id, user_id, candidate_name, candidate_email, 
                                              candidate_phone, extracted_text, skills, education)
                     VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (resume_file_id) DO UPDATE 
+                    ON CONFLICT (user_id, resume_file_id) DO UPDATE 
                     SET candidate_name = EXCLUDED.candidate_name,
                         candidate_email = EXCLUDED.candidate_email,
                         extracted_text = EXCLUDED.extracted_text,
                         skills = EXCLUDED.skills,
-                        education = EXCLUDED.education
+                        education = EXCLUDED.education,
+                        last_updated = CURRENT_TIMESTAMP
+                    RETURNING id
                 """, (file_id, user_id, d['name'], d['email'], d['mobile'], d['raw_text'], d.get('skills', ''), d.get('education', '')))
+                 resume_ids.append(cur.fetchone()[0])
+                 d['duplicate_of'] = flag_duplicate(cur, resume_ids[-1], d['raw_text'], user_id)
+
+            advance_candidates(cur, data_list, 'applied', user_id)
+            for hook in _ingest_transaction_hooks:
+                hook(cur, user_id, resume_ids)
 
         conn.commit()
-        return file_ids
     except Exception as e:
         conn.rollback()
         raise e
     finally:
         conn.close()
+    note_write(("resumes", user_id))
+    # Hooks may open connections of their own; this one is already back
+    _run_ingest_hooks(resume_ids)
+    return file_ids
+
+
+def get_resume(resume_id: int, user_id: int) -> Optional[Dict]:
+    """The tenant's stored resume row by resume_data id, including the extracted text."""
+    from psycopg2.extras import RealDictCursor
+    conn = get_db_connection(readonly=True, scope=("resumes", user_id))
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("""
+                SELECT rd.id, rd.candidate_name, rd.candidate_email, rd.candidate_phone, rd.skills,
+                       rd.education, rd.extracted_text, COALESCE(c.stage, rd.interview_status) AS interview_status,
+                       rd.last_updated, rd.duplicate_of,
+                       rd.user_id, rf.filename
+                FROM resume_data rd
+                LEFT JOIN resume_files rf ON rf.user_id = rd.user_id AND rf.id = rd.resume_file_id
+                LEFT JOIN candidates c ON c.id = rd.candidate_id
+                WHERE rd.user_id = %s AND rd.id = %s
+            """, (user_id, resume_id))
+            return cur.fetchone()
+    finally:
+        conn.close()
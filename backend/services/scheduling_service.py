@@ -1,37 +1,114 @@
 import os
-import toml
-from datetime import datetime, timedelta
+import threading
+from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+from backend.config import get_settings
 from backend.database import get_db_connection
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-import smtplib
+from backend.services.availability import (
+    CachedBusyProvider, GoogleBusyProvider, LocalBusyProvider, first_slot, get_zone, merge_intervals,
+    parse_slot, slots_from_free, subtract_intervals, to_utc, working_windows,
+)
+import psycopg2.errors
+from psycopg2.extras import RealDictCursor, execute_values
+from backend.services.email_service import enqueue_email, notify_outbox
+from backend.services.pipeline_service import advance_candidates
+
+MAX_AVAILABILITY_DAYS = 31
+# Re-solve a batch this many times if concurrent bookings trip the overlap constraint
+BATCH_SCHEDULE_ATTEMPTS = 3
+
+def cancel_overlapping_interviews(cur) -> List[Dict]:
+    """Cancel live interviews that overlap an earlier booking of the same interviewer; returns what was cancelled.
+
+    Run before adding interview_schedules_no_overlap to a database that already holds double
+    bookings: an EXCLUDE constraint cannot be added NOT VALID, so existing conflicts must go first.
+    The booking made first (lowest id) is kept.
+    """
+    cur.execute("""
+        WITH live AS (
+            SELECT id, interviewer_id, candidate_email, scheduled_time,
+                   tsrange(scheduled_time, scheduled_time + COALESCE(duration_minutes, 30) * INTERVAL '1 minute') AS span
+            FROM interview_schedules
+            WHERE status <> 'cancelled' AND scheduled_time IS NOT NULL
+        )
+        SELECT s.id, s.interviewer_id, s.candidate_email, lower(s.span), upper(s.span)
+        FROM live s
+        WHERE EXISTS (SELECT 1 FROM live o WHERE o.interviewer_id = s.interviewer_id AND o.id <> s.id AND o.span && s.span)
+        ORDER BY s.interviewer_id, s.id
+    """)
+    kept: Dict[int, List[tuple]] = {}
+    cancelled = []
+    # In booking order: keep each interview unless it overlaps one already kept
+    for interview_id, interviewer_id, email, starts, ends in cur.fetchall():
+        clash = next((k for k, k_start, k_end in kept.get(interviewer_id, []) if starts < k_end and k_start < ends),
+                     None)
+        if clash is None:
+            kept.setdefault(interviewer_id, []).append((interview_id, starts, ends))
+        else:
+            cancelled.append({"id": interview_id, "interviewer_id": interviewer_id, "candidate_email": email,
+                              "scheduled_time": starts.isoformat(), "overlaps": clash})
+    if cancelled:
+        cur.execute("""
+            UPDATE interview_schedules SET status = 'cancelled', updated_at = CURRENT_TIMESTAMP
+            WHERE id = ANY(%s)
+        """, ([c["id"] for c in cancelled],))
+    return cancelled
 
 class SchedulingService:
     def __init__(self):
         self.load_secrets()
-        self.setup_google_calendar()
+        self._service = None
+        self._busy_provider = None
+        self._calendar_ready = False
+        self._calendar_lock = threading.Lock()
 
     def load_secrets(self):
-        self.secrets = {}
-        if os.path.exists("secrets.toml"):
-            self.secrets = toml.load("secrets.toml")
-        elif os.path.exists("../secrets.toml"):
-            self.secrets = toml.load("../secrets.toml")
-        
+        self.secrets = get_settings()
+
+    @property
+    def service(self):
+        self.setup_google_calendar()
+        return self._service
+
+    @property
+    def busy_provider(self):
+        self.setup_google_calendar()
+        return self._busy_provider
+
     def setup_google_calendar(self):
-        self.service = None
-        google_config = self.secrets.get('google_calendar', {})
-        # Note: In a real backend, we'd handle OAuth2 flow differently (via API), 
-        # but for now reusing local token.json logic if available.
-        if os.path.exists("token.json"):
-            creds = Credentials.from_authorized_user_file("token.json", ['https://www.googleapis.com/auth/calendar'])
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            self.service = build('calendar', 'v3', credentials=creds)
+        """Connect to Google Calendar on first use.
+
+        Refreshing credentials and the discovery fetch need the network, so they
+        happen lazily and a failure falls back to the local busy list.
+        """
+        if self._calendar_ready:
+            return
+        with self._calendar_lock:
+            if self._calendar_ready:
+                return
+            service = None
+            google_config = self.secrets.get('google_calendar', {})
+            # Note: In a real backend, we'd handle OAuth2 flow differently (via API), 
+            # but for now reusing local token.json logic if available.
+            if os.path.exists("token.json"):
+                try:
+                    from google.oauth2.credentials import Credentials
+                    from google.auth.transport.requests import Request
+                    from googleapiclient.discovery import build
+                    creds = Credentials.from_authorized_user_file("token.json", ['https://www.googleapis.com/auth/calendar'])
+                    if creds and creds.expired and creds.refresh_token:
+                        creds.refresh(Request())
+                    service = build('calendar', 'v3', credentials=creds)
+                except Exception as e:
+                    print(f"Google Calendar unavailable, using local busy list: {e}")
+
+            if service:
+                provider = GoogleBusyProvider(service)
+            else:
+                provider = LocalBusyProvider(google_config.get('local_busy_file', 'busy_calendar.json'))
+            self._service = service
+            self._busy_provider = CachedBusyProvider(provider, google_config.get('busy_cache_seconds', 300))
+            self._calendar_ready = True
 
     def get_interviewers(self):
         conn = get_db_connection()
@@ -43,40 +120,119 @@ class SchedulingService:
             conn.close()
 
     def get_availability(self, interviewer_id: int, date_str: str):
-        # ... (simplified logic from original file)
-        # For this stage, let's assume we return fixed slots if Google Calendar isn't connected
-        if not self.service:
-            return self._generate_default_slots(date_str)
-        
-        # Real implementation would query Google Calendar here
-        # Avoiding complex porting for now to keep it concise, but structure is here
-        return self._generate_default_slots(date_str)
-
-    def _generate_default_slots(self, date_str: str):
-        date = datetime.strptime(date_str, "%Y-%m-%d")
-        start = date.replace(hour=9, minute=0)
-        end = date.replace(hour=17, minute=0)
-        slots = []
-        while start < end:
-            slots.append(start.isoformat())
-            start += timedelta(minutes=60)
-        return slots
+        slots = self.get_availability_bulk([interviewer_id], date_str)
+        return slots.get(interviewer_id, [])
+
+    def get_availability_bulk(self, interviewer_ids: List[int], start_date: str, end_date: Optional[str] = None,
+                              duration_minutes: int = 30, step_minutes: int = 30) -> Dict[int, List[str]]:
+        """Open slot start times per interviewer, as ISO strings in the interviewer's timezone."""
+        free = self.get_free_intervals(interviewer_ids, start_date, end_date)
+        duration = timedelta(minutes=duration_minutes)
+        step = timedelta(minutes=step_minutes)
+        now = datetime.now(timezone.utc)
+        availability = {}
+        for interviewer_id, info in free.items():
+            zone = get_zone(info['timezone'])
+            availability[interviewer_id] = [
+                slot.astimezone(zone).isoformat()
+                for slot in slots_from_free(info['free'], duration, step, not_before=now, zone=zone)
+            ]
+        return availability
+
+    def get_free_intervals(self, interviewer_ids: List[int], start_date: str,
+                           end_date: Optional[str] = None) -> Dict[int, Dict]:
+        """Free UTC intervals per active interviewer over a date range.
+
+        Working hours come from the interviewer row, busy time from existing bookings
+        plus the (cached) calendar busy list; every busy block is padded by the
+        interviewer's buffer before being swept out of the working windows.
+        """
+        first = datetime.strptime(start_date, "%Y-%m-%d").date()
+        last = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else first
+        if last < first:
+            raise ValueError("end_date must not be before start_date")
+        if (last - first).days > MAX_AVAILABILITY_DAYS:
+            raise ValueError(f"Date range is limited to {MAX_AVAILABILITY_DAYS} days")
+
+        conn = get_db_connection()
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute("""
+                    SELECT id, email, calendar_id, timezone, working_hours_start, working_hours_end,
+                           buffer_between_interviews_minutes
+                    FROM interviewers
+                    WHERE id = ANY(%s) AND is_active = TRUE
+                """, (list(interviewer_ids),))
+                interviewers = cur.fetchall()
+                if not interviewers:
+                    return {}
+
+                windows = {
+                    row['id']: working_windows(first, last, row['timezone'],
+                                               row['working_hours_start'], row['working_hours_end'])
+                    for row in interviewers
+                }
+                all_windows = [w for ws in windows.values() for w in ws]
+                if not all_windows:
+                    return {
+                        row['id']: {'timezone': row['timezone'], 'buffer_minutes': 0, 'free': []}
+                        for row in interviewers
+                    }
+                max_buffer = timedelta(minutes=max(r['buffer_between_interviews_minutes'] or 0 for r in interviewers))
+                range_start = min(w[0] for w in all_windows) - max_buffer
+                range_end = max(w[1] for w in all_windows) + max_buffer
+
+                # One query for every interviewer's bookings in the range
+                cur.execute("""
+                    SELECT interviewer_id, scheduled_time, duration_minutes
+                    FROM interview_schedules
+                    WHERE interviewer_id = ANY(%s)
+                      AND status <> 'cancelled'
+                      AND scheduled_time < %s
+                      AND scheduled_time + COALESCE(duration_minutes, 30) * INTERVAL '1 minute' > %s
+                """, ([r['id'] for r in interviewers],
+                      range_end.replace(tzinfo=None), range_start.replace(tzinfo=None)))
+                bookings = cur.fetchall()
+        finally:
+            conn.close()
+
+        busy: Dict[int, List] = {row['id']: [] for row in interviewers}
+        for b in bookings:
+            start = to_utc(b['scheduled_time'])
+            busy[b['interviewer_id']].append((start, start + timedelta(minutes=b['duration_minutes'] or 30)))
+
+        calendar_keys = {row['id']: row['calendar_id'] or row['email'] for row in interviewers}
+        external = self.busy_provider.get_busy(sorted(set(calendar_keys.values())), range_start, range_end)
+
+        result = {}
+        for row in interviewers:
+            pad = timedelta(minutes=row['buffer_between_interviews_minutes'] or 0)
+            blocks = busy[row['id']] + external.get(calendar_keys[row['id']], [])
+            padded = merge_intervals((s - pad, e + pad) for s, e in blocks)
+            result[row['id']] = {
+                'timezone': row['timezone'],
+                'buffer_minutes': row['buffer_between_interviews_minutes'] or 0,
+                'free': subtract_intervals(windows[row['id']], padded),
+            }
+        return result
 
     def schedule_interview(self, candidate_data: Dict, interviewer_id: int, slot_iso: str):
         conn = get_db_connection()
         try:
             with conn.cursor() as cur:
+                candidate_ids = advance_candidates(cur, [candidate_data], 'interview_scheduled')
                 cur.execute("""
                     INSERT INTO interview_schedules 
-                    (candidate_name, candidate_email, interviewer_id, scheduled_time, status)
-                    VALUES (%s, %s, %s, %s, 'scheduled')
+                    (candidate_name, candidate_email, interviewer_id, scheduled_time, status, candidate_id)
+                    VALUES (%s, %s, %s, %s, 'scheduled', %s)
                     RETURNING id
-                """, (candidate_data['name'], candidate_data['email'], interviewer_id, slot_iso))
+                """, (candidate_data['name'], candidate_data['email'], interviewer_id, parse_slot(slot_iso),
+                      candidate_ids.get(candidate_data['email'].strip().lower())))
                 interview_id = cur.fetchone()[0]
+                # Queue the invite in the same transaction; the sender delivers it after commit
+                self.queue_invite_email(cur, candidate_data, slot_iso, interview_id)
             conn.commit()
-            
-            # Send Email
-            self.send_invite_email(candidate_data, slot_iso)
+            notify_outbox()
             return interview_id
         except Exception as e:
             conn.rollback()
@@ -84,23 +240,115 @@ class SchedulingService:
         finally:
             conn.close()
 
-    def send_invite_email(self, candidate: Dict, slot_iso: str):
-        email_config = self.secrets.get('email', {})
-        if not email_config: return
-        
-        msg = MIMEMultipart()
-        msg['From'] = email_config.get('sender_email')
-        msg['To'] = candidate['email']
-        msg['Subject'] = "Interview Invitation"
-        
-        body = f"Hello {candidate['name']},\n\nYour interview is confirmed for {slot_iso}."
-        msg.attach(MIMEText(body, 'plain'))
-        
+    def schedule_batch(self, candidates: List[Dict], interviewer_ids: List[int], start_date: str,
+                       end_date: Optional[str] = None, duration_minutes: int = 30,
+                       step_minutes: int = 30) -> Dict:
+        """Assign non-overlapping slots to many candidates and book them in one transaction.
+
+        Candidates are served in the given order (e.g. best match first). Each gets the
+        earliest open slot among its allowed interviewers, ties going to the interviewer
+        with the fewest assignments so far. If a concurrent booking wins one of the
+        slots, the overlap constraint rejects the whole insert and the batch is
+        re-solved against fresh availability.
+        """
+        for attempt in range(BATCH_SCHEDULE_ATTEMPTS):
+            plan, unscheduled = self._plan_batch(
+                candidates, interviewer_ids, start_date, end_date, duration_minutes, step_minutes
+            )
+            try:
+                interview_ids = self._book_batch(plan, duration_minutes)
+                break
+            except psycopg2.errors.ExclusionViolation:
+                if attempt == BATCH_SCHEDULE_ATTEMPTS - 1:
+                    raise
+
+        scheduled = [
+            {
+                "interview_id": interview_id,
+                "candidate_email": booking['candidate']['email'],
+                "interviewer_id": booking['interviewer_id'],
+                "slot": booking['slot_iso'],
+            }
+            for booking, interview_id in zip(plan, interview_ids)
+        ]
+        return {"scheduled": scheduled, "unscheduled": unscheduled}
+
+    def _plan_batch(self, candidates: List[Dict], interviewer_ids: List[int], start_date: str,
+                    end_date: Optional[str], duration_minutes: int, step_minutes: int):
+        pool = set(interviewer_ids)
+        for cand in candidates:
+            pool.update(cand.get('interviewer_ids') or [])
+        free = self.get_free_intervals(sorted(pool), start_date, end_date)
+
+        duration = timedelta(minutes=duration_minutes)
+        step = timedelta(minutes=step_minutes)
+        now = datetime.now(timezone.utc)
+        load = {iid: 0 for iid in free}
+        plan, unscheduled, seen = [], [], set()
+        for cand in candidates:
+            if cand['email'] in seen:
+                continue
+            seen.add(cand['email'])
+
+            best = None
+            for iid in cand.get('interviewer_ids') or interviewer_ids:
+                info = free.get(iid)
+                if not info:
+                    continue
+                slot = first_slot(info['free'], duration, step, now, get_zone(info['timezone']))
+                if slot is not None and (best is None or (slot, load[iid], iid) < best):
+                    best = (slot, load[iid], iid)
+            if best is None:
+                unscheduled.append(cand['email'])
+                continue
+
+            slot, _, iid = best
+            info = free[iid]
+            pad = timedelta(minutes=info['buffer_minutes'])
+            info['free'] = subtract_intervals(info['free'], [(slot - pad, slot + duration + pad)])
+            load[iid] += 1
+            plan.append({
+                "candidate": cand,
+                "interviewer_id": iid,
+                "slot": slot,
+                "slot_iso": slot.astimezone(get_zone(info['timezone'])).isoformat(),
+            })
+        return plan, unscheduled
+
+    def _book_batch(self, plan: List[Dict], duration_minutes: int) -> List[int]:
+        if not plan:
+            return []
+        conn = get_db_connection()
         try:
-            with smtplib.SMTP(email_config['smtp_server'], email_config['smtp_port']) as server:
-                server.starttls()
-                server.login(email_config['sender_email'], email_config['sender_password'])
-                server.send_message(msg)
+            with conn.cursor() as cur:
+                candidate_ids = advance_candidates(cur, [b['candidate'] for b in plan], 'interview_scheduled')
+                rows = execute_values(cur, """
+                    INSERT INTO interview_schedules
+                    (candidate_name, candidate_email, interviewer_id, scheduled_time, duration_minutes, status,
+                     candidate_id)
+                    VALUES %s
+                    RETURNING id
+                """, [
+                    (b['candidate']['name'], b['candidate']['email'], b['interviewer_id'],
+                     b['slot'].astimezone(timezone.utc).replace(tzinfo=None), duration_minutes, 'scheduled',
+                     candidate_ids.get(b['candidate']['email'].strip().lower()))
+                    for b in plan
+                ], fetch=True)
+                interview_ids = [r[0] for r in rows]
+                for booking, interview_id in zip(plan, interview_ids):
+                    self.queue_invite_email(cur, booking['candidate'], booking['slot_iso'], interview_id)
+            conn.commit()
+            notify_outbox()
+            return interview_ids
         except Exception as e:
-            print(f"Failed to send email: {e}")
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
 
+    def queue_invite_email(self, cur, candidate: Dict, slot_iso: str, interview_id: Optional[int] = None):
+        email_config = self.secrets.get('email', {})
+        if not email_config: return None
+
+        body = f"Hello {candidate['name']},\n\nYour interview is confirmed for {slot_iso}."
+        return enqueue_email(cur, candidate['email'], "Interview Invitation", body, interview_id)
@@ -0,0 +1,295 @@
+"""Standing JDs: saved job descriptions matched against resumes as they are ingested.
+
+A standing JD is stored once, with one reverse-index row per token
+(standing_jd_terms) that also carries the JD's token count and threshold. After
+each ingest, only the index entries of the new resumes' tokens are read, so the
+cost follows the JDs a resume shares words with, not all saved JDs. They are
+scored with the same Jaccard similarity as
+/resume/match; scores at or above the JD's min_score are recorded in
+standing_jd_matches. That table doubles as the outbox of the webhook: matches
+not yet delivered have notified_at NULL. The ingest transaction itself marks its
+resumes in standing_jd_pending (for tenants with standing JDs); evaluation
+removes the marks in the transaction that records the matches, so an
+evaluation that fails is picked up again by the next one or at startup.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from psycopg2.extras import RealDictCursor
+from backend.database import get_db_connection, note_write
+from backend.services.matching_service import tokenize
+
+# Scores one tenant's new resumes against that tenant's standing JDs in a single statement
+EVALUATE_SQL = """
+    WITH tokens AS (
+        SELECT * FROM unnest(%(resume_ids)s::int[], %(terms)s::text[]) AS t(resume_id, term)
+    ), sizes AS (
+        SELECT resume_id, count(*) AS n FROM tokens GROUP BY resume_id
+    ), postings AS (
+        -- One index probe per distinct term of the batch; a join on tokens lets the planner hash the whole index
+        SELECT term, jd_id, jd_term_count, min_score FROM standing_jd_terms
+        WHERE user_id = %(user_id)s AND term = ANY(%(distinct_terms)s::text[])
+    ), overlap AS (
+        SELECT t.resume_id, p.jd_id, p.jd_term_count, p.min_score, count(*) AS shared
+        FROM tokens t JOIN postings p ON p.term = t.term
+        GROUP BY t.resume_id, p.jd_id, p.jd_term_count, p.min_score
+    ), scored AS (
+        SELECT o.jd_id, o.resume_id, o.min_score,
+               o.shared::float8 / (o.jd_term_count + z.n - o.shared) AS score
+        FROM overlap o
+        JOIN sizes z USING (resume_id)
+    )
+    INSERT INTO standing_jd_matches (jd_id, user_id, resume_id, score)
+    SELECT jd_id, %(user_id)s, resume_id, score FROM scored WHERE score >= min_score
+    ON CONFLICT (jd_id, resume_id) DO NOTHING
+    RETURNING id
+"""
+
+MATCH_COLUMNS = """
+    m.id AS match_id, m.user_id, m.jd_id, j.title AS jd_title, m.resume_id, m.score, m.matched_at, m.notified_at,
+    rd.candidate_name, rd.candidate_email, rd.candidate_phone, rd.education, rd.skills, rf.filename
+"""
+
+MATCH_JOINS = """
+    JOIN standing_jds j ON j.id = m.jd_id
+    JOIN resume_data rd ON rd.user_id = m.user_id AND rd.id = m.resume_id
+    LEFT JOIN resume_files rf ON rf.user_id = rd.user_id AND rf.id = rd.resume_file_id
+"""
+
+
+def as_match(row: Dict) -> Dict:
+    """A match row in the shape /resume/match returns, plus the standing JD it matched."""
+    return {
+        "match_id": row['match_id'],
+        "jd_id": row['jd_id'],
+        "jd_title": row['jd_title'],
+        "matched_at": row['matched_at'],
+        "id": row['resume_id'],
+        "Name": row['candidate_name'] or "Unknown Candidate",
+        "Email": row['candidate_email'],
+        "Phone": row['candidate_phone'] or "",
+        "Education": row['education'] or "",
+        "File": row['filename'] or "Unknown File",
+        "Skills": row['skills'] or "",
+        "MatchScore": row['score'],
+    }
+
+
+class StandingJDService:
+    def __init__(self, config: Optional[Dict] = None, dispatcher=None):
+        config = config or {}
+        self.default_min_score = float(config.get('min_score', 0.1))
+        self.push_batch = int(config.get('push_batch', 100))
+        self.dispatcher = dispatcher
+        # One pusher thread: webhook posts never run on the ingesting request's thread
+        self._pusher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="standing-jd-push") if dispatcher else None
+        # Resumes left pending by failed evaluations picked up per evaluation
+        self.pending_batch = int(config.get('pending_batch', 1000))
+        self.counts = dict.fromkeys(("evaluated", "evaluate_failed", "matched", "pushed", "push_failed"), 0)
+
+    # --- Standing JDs ---
+    def create(self, user_id: int, jd_text: str, title: Optional[str] = None,
+               min_score: Optional[float] = None) -> Dict:
+        terms = sorted(tokenize(jd_text))
+        if not terms:
+            raise ValueError("The JD has no words to match on")
+        min_score = self.default_min_score if min_score is None else min_score
+        conn = get_db_connection()
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute("""
+                    INSERT INTO standing_jds (user_id, title, jd_text, term_count, min_score)
+                    VALUES (%s, %s, %s, %s, %s)
+                    RETURNING id, user_id, title, term_count, min_score, created_at
+                """, (user_id, title, jd_text, len(terms), min_score))
+                jd = cur.fetchone()
+                cur.execute("""
+                    INSERT INTO standing_jd_terms (user_id, term, jd_id, jd_term_count, min_score)
+                    SELECT %s, term, %s, %s, %s FROM unnest(%s::text[]) AS term
+                """, (user_id, jd['id'], len(terms), min_score, terms))
+            conn.commit()
+            note_write(("standing_jds", user_id))
+            return jd
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+
+    def get_standing_jds(self, user_id: int) -> List[Dict]:
+        conn = get_db_connection(readonly=True, scope=("standing_jds", user_id))
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute("""
+                    SELECT j.id, j.title, j.term_count, j.min_score, j.created_at,
+                           (SELECT count(*) FROM standing_jd_matches m WHERE m.jd_id = j.id) AS matches
+                    FROM standing_jds j
+                    WHERE j.user_id = %s
+                    ORDER BY j.id
+                """, (user_id,))
+                return cur.fetchall()
+        finally:
+            conn.close()
+
+    def delete(self, jd_id: int, user_id: int) -> bool:
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                # Terms and matches go with it (ON DELETE CASCADE)
+                cur.execute("DELETE FROM standing_jds WHERE id = %s AND user_id = %s", (jd_id, user_id))
+                deleted = cur.rowcount > 0
+            conn.commit()
+            note_write(("standing_jds", user_id))
+            return deleted
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+
+    def get_matches(self, user_id: int, jd_id: Optional[int] = None, after_id: int = 0,
+                    limit: int = 100) -> List[Dict]:
+        """Matches recorded after match id `after_id`, oldest first; pass the last match_id seen to page."""
+        conn = get_db_connection(readonly=True, scope=("standing_jds", user_id))
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute(f"""
+                    SELECT {MATCH_COLUMNS}
+                    FROM standing_jd_matches m {MATCH_JOINS}
+                    WHERE m.user_id = %s AND m.id > %s AND (%s::int IS NULL OR m.jd_id = %s)
+                    ORDER BY m.id
+                    LIMIT %s
+                """, (user_id, after_id, jd_id, jd_id, limit))
+                return [as_match(row) for row in cur.fetchall()]
+        finally:
+            conn.close()
+
+    # --- Ingest ---
+    def mark_pending(self, cur, user_id: int, resume_ids: List[int]):
+        """Ingest transaction hook: remember the new resumes until evaluate_resumes has scored them."""
+        # Tenants without a standing JD have nothing to evaluate
+        cur.execute("""
+            INSERT INTO standing_jd_pending (user_id, resume_id)
+            SELECT %s, resume_id FROM unnest(%s::int[]) AS resume_id
+            WHERE EXISTS (SELECT 1 FROM standing_jds WHERE user_id = %s)
+            ON CONFLICT DO NOTHING
+        """, (user_id, list(resume_ids), user_id))
+
+    def evaluate_resumes(self, resume_ids: List[int]) -> List[int]:
+        """Ingest hook: record which standing JDs the new resumes match; returns the new match ids.
+
+        Resumes still marked pending by an earlier failed evaluation are evaluated along with them.
+        """
+        conn = get_db_connection()
+        match_ids = []
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    DELETE FROM standing_jd_pending WHERE (user_id, resume_id) IN (
+                        SELECT user_id, resume_id FROM standing_jd_pending
+                        ORDER BY queued_at LIMIT %s FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING resume_id
+                """, (self.pending_batch,))
+                resume_ids = sorted(set(resume_ids) | {r[0] for r in cur.fetchall()})
+                if not resume_ids:
+                    conn.commit()
+                    return []
+                # Tenants without a standing JD cost this one query
+                cur.execute("""
+                    SELECT rd.user_id, rd.id, rd.extracted_text FROM resume_data rd
+                    WHERE rd.id = ANY(%s)
+                      AND EXISTS (SELECT 1 FROM standing_jds j WHERE j.user_id = rd.user_id)
+                """, (list(resume_ids),))
+                by_tenant: Dict[int, Dict[str, list]] = {}
+                for user_id, resume_id, text in cur.fetchall():
+                    tenant = by_tenant.setdefault(user_id, {"resume_ids": [], "terms": []})
+                    for term in tokenize(text):
+                        tenant["resume_ids"].append(resume_id)
+                        tenant["terms"].append(term)
+                for user_id, tenant in by_tenant.items():
+                    cur.execute(EVALUATE_SQL, dict(tenant, user_id=user_id,
+                                                   distinct_terms=sorted(set(tenant["terms"]))))
+                    match_ids.extend(r[0] for r in cur.fetchall())
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            self.counts["evaluate_failed"] += 1
+            raise e
+        finally:
+            conn.close()
+        for user_id in by_tenant:
+            note_write(("standing_jds", user_id))
+        self.counts["evaluated"] += len(resume_ids)
+        self.counts["matched"] += len(match_ids)
+        if match_ids:
+            self.schedule_push()
+        return match_ids
+
+    # --- Webhook ---
+    def _claim(self, limit: int) -> List[Dict]:
+        conn = get_db_connection()
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                # Claimed rows are marked notified up front; a failed post puts them back
+                cur.execute(f"""
+                    WITH claimed AS (
+                        UPDATE standing_jd_matches SET notified_at = CURRENT_TIMESTAMP
+                        WHERE id IN (
+                            SELECT id FROM standing_jd_matches WHERE notified_at IS NULL
+                            ORDER BY id LIMIT %s FOR UPDATE SKIP LOCKED
+                        )
+                        RETURNING *
+                    )
+                    SELECT {MATCH_COLUMNS}
+                    FROM claimed m {MATCH_JOINS}
+                    ORDER BY m.id
+                """, (limit,))
+                rows = cur.fetchall()
+            conn.commit()
+            return rows
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+
+    def _unclaim(self, match_ids: Iterable[int]):
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("UPDATE standing_jd_matches SET notified_at = NULL WHERE id = ANY(%s)", (list(match_ids),))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def schedule_push(self):
+        """Deliver pending matches on the pusher thread, if a webhook is configured."""
+        if self._pusher:
+            self._pusher.submit(self.push_pending)
+
+    def push_pending(self) -> int:
+        """Post undelivered matches to the webhook in batches; returns how many were delivered."""
+        from backend.services.webhook_service import compact_match
+        delivered = 0
+        while True:
+            rows = self._claim(self.push_batch)
+            if not rows:
+                return delivered
+            items = [dict(compact_match(as_match(row), self.dispatcher.api_base_url, row['user_id']),
+                          match_id=row['match_id'], jd_id=row['jd_id'], jd_title=row['jd_title'],
+                          matched_at=row['matched_at'])
+                     for row in rows]
+            try:
+                self.dispatcher.post({"event": "standing_jd_matches", "matches": items})
+            except Exception as e:
+                self.counts["push_failed"] += len(rows)
+                print(f"Standing JD webhook failed, {len(rows)} matches left pending: {e}")
+                self._unclaim(row['match_id'] for row in rows)
+                return delivered
+            delivered += len(rows)
+            self.counts["pushed"] += len(rows)
+
+    def shutdown(self):
+        if self._pusher:
+            self._pusher.shutdown(wait=False, cancel_futures=True)
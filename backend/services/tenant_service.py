@@ -0,0 +1,194 @@
+"""Per-tenant partitions of the resume tables.
+
+resume_files, resume_data and resume_lsh_bands are LIST-partitioned by
+user_id, one partition per tenant (`resume_data_u7` holds user 7's resumes).
+Queries that filter on user_id only touch that tenant's partition, and a
+tenant reset detaches and drops the partitions instead of deleting rows.
+Partitions are created on a tenant's first upload.
+"""
+import threading
+from typing import Callable, Dict, List
+
+from backend.database import get_db_connection
+
+# Parents before children: a partition's foreign keys need the referenced partition to exist
+PARTITIONED_TABLES = ("resume_files", "resume_data", "resume_lsh_bands")
+
+_known_tenants = set()
+_known_lock = threading.Lock()
+
+
+def partition_name(table: str, user_id: int) -> str:
+    return f"{table}_u{int(user_id)}"
+
+
+def is_partitioned(cur, table: str) -> bool:
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+    row = cur.fetchone()
+    return bool(row) and (row['relkind'] if isinstance(row, dict) else row[0]) == 'p'
+
+
+def create_tenant_partitions(cur, user_id: int):
+    # Serialise concurrent first uploads of the same tenant; released at commit
+    cur.execute("SELECT pg_advisory_xact_lock(hashtext('resume_partitions'), %s)", (int(user_id),))
+    for table in PARTITIONED_TABLES:
+        cur.execute(f"CREATE TABLE IF NOT EXISTS {partition_name(table, user_id)} "
+                    f"PARTITION OF {table} FOR VALUES IN ({int(user_id)})")
+
+
+def ensure_tenant_partitions(user_id: int):
+    """Create the tenant's partitions if this process has not seen them yet.
+
+    Runs in its own short transaction so the lock CREATE TABLE ... PARTITION OF
+    takes on the parent tables is never held across an ingest.
+    """
+    if user_id in _known_tenants:
+        return
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT to_regclass(%s) IS NOT NULL", (partition_name(PARTITIONED_TABLES[-1], user_id),))
+            if not cur.fetchone()[0]:
+                # A queued CREATE ... PARTITION OF blocks every tenant's reads of the parent,
+                # so give up quickly behind a long-running query instead of stalling matches
+                cur.execute("SET LOCAL lock_timeout = '5s'")
+                create_tenant_partitions(cur, user_id)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        raise e
+    finally:
+        conn.close()
+    with _known_lock:
+        _known_tenants.add(user_id)
+
+
+def drop_tenant_partitions(cur, user_id: int) -> Dict[str, int]:
+    """Remove every resume of one tenant by dropping its partitions; returns the rows dropped per table."""
+    counts = {}
+    # Analyses and standing JD matches live in shared tables and reference the tenant's resume_data partition
+    cur.execute("DELETE FROM resume_analysis WHERE user_id = %s", (int(user_id),))
+    counts["resume_analysis"] = cur.rowcount
+    cur.execute("DELETE FROM standing_jd_matches WHERE user_id = %s", (int(user_id),))
+    counts["standing_jd_matches"] = cur.rowcount
+    cur.execute("DELETE FROM standing_jd_pending WHERE user_id = %s", (int(user_id),))
+    for table in reversed(PARTITIONED_TABLES):
+        name = partition_name(table, user_id)
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL", (name,))
+        if not cur.fetchone()[0]:
+            counts[table] = 0
+            continue
+        cur.execute(f"SELECT count(*) FROM {name}")
+        counts[table] = cur.fetchone()[0]
+        if table == "resume_data":
+            # duplicate_of references resume_data itself: DETACH checks that foreign key too and
+            # fails on the tenant's own near-duplicate links into the partition being removed
+            cur.execute(f"UPDATE {name} SET duplicate_of = NULL WHERE duplicate_of IS NOT NULL")
+        cur.execute(f"ALTER TABLE {table} DETACH PARTITION {name}")
+        cur.execute(f"DROP TABLE {name}")
+    with _known_lock:
+        _known_tenants.discard(user_id)
+    return counts
+
+
+def is_missing_partition(error: Exception) -> bool:
+    """Whether a write failed because the tenant's partition does not exist (any more)."""
+    return getattr(error, "pgcode", None) == "23514" and "no partition of relation" in str(error)
+
+
+def with_tenant_partitions(user_id: int, write: Callable):
+    """Run `write()` after ensure_tenant_partitions, recreating the partitions once if they are gone.
+
+    The cache of known tenants is per process: when another worker resets the tenant,
+    this process would otherwise keep skipping the CREATE and fail every upload.
+    """
+    ensure_tenant_partitions(user_id)
+    try:
+        return write()
+    except Exception as e:
+        if not is_missing_partition(e):
+            raise
+        with _known_lock:
+            _known_tenants.discard(user_id)
+        ensure_tenant_partitions(user_id)
+        return write()
+
+
+# --- Migration from the unpartitioned tables ---
+STASH_COLUMNS = {
+    "resume_files": ["id", "user_id", "filename", "file_size", "file_type", "processed", "upload_date",
+                     "session_id"],
+    "resume_data": ["id", "resume_file_id", "user_id", "candidate_name", "candidate_email", "candidate_phone",
+                    "skills", "education", "extracted_text", "interview_status", "last_updated", "candidate_id",
+                    "minhash", "duplicate_of"],
+    "resume_lsh_bands": ["bucket", "resume_id"],
+}
+
+
+def _stashed_columns(cur, table: str) -> List[str]:
+    """STASH_COLUMNS of `table` that the old schema actually had; empty if the table did not exist."""
+    cur.execute("""
+        SELECT attname FROM pg_attribute
+        WHERE attrelid = to_regclass(%s) AND attnum > 0 AND NOT attisdropped
+    """, (f"pg_temp.stash_{table}",))
+    present = {r[0] for r in cur.fetchall()}
+    return [c for c in STASH_COLUMNS[table] if c in present]
+
+
+def stash_unpartitioned_tables(cur) -> bool:
+    """Copy rows of the pre-partitioning resume tables into temp tables and drop the originals.
+
+    init_db then recreates the tables partitioned and calls restore_stashed_tables
+    in the same transaction. Returns False when there is nothing to migrate.
+    """
+    cur.execute("SELECT to_regclass('resume_files') IS NOT NULL")
+    if not cur.fetchone()[0] or is_partitioned(cur, "resume_files"):
+        return False
+    for table in PARTITIONED_TABLES:
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL", (table,))
+        if cur.fetchone()[0]:
+            cur.execute(f"CREATE TEMP TABLE stash_{table} ON COMMIT DROP AS SELECT * FROM {table}")
+    # resume_analysis keeps its rows; its foreign key goes with the old resume_data
+    cur.execute("DROP TABLE IF EXISTS resume_lsh_bands, resume_data, resume_files CASCADE")
+    return True
+
+
+def restore_stashed_tables(cur) -> List[int]:
+    """Copy stashed rows into the partitioned tables; returns the tenants that got partitions."""
+    # Rows without an owner go to the first user, and a resume always belongs to its file's tenant
+    cur.execute("SELECT min(id) FROM users")
+    fallback_user = cur.fetchone()[0]
+    cur.execute("UPDATE stash_resume_files SET user_id = %s WHERE user_id IS NULL", (fallback_user,))
+    cur.execute("""
+        UPDATE stash_resume_data d SET user_id = COALESCE(f.user_id, d.user_id, %s)
+        FROM stash_resume_data d2 LEFT JOIN stash_resume_files f ON f.id = d2.resume_file_id
+        WHERE d2.id = d.id
+    """, (fallback_user,))
+    cur.execute("SELECT user_id FROM stash_resume_files UNION SELECT user_id FROM stash_resume_data")
+    tenants = sorted(r[0] for r in cur.fetchall())
+    for user_id in tenants:
+        create_tenant_partitions(cur, user_id)
+
+    columns = ", ".join(_stashed_columns(cur, "resume_files"))
+    cur.execute(f"INSERT INTO resume_files ({columns}) SELECT {columns} FROM stash_resume_files")
+    # duplicate_of is filled in afterwards, once every cluster root row exists
+    data_columns = [c for c in _stashed_columns(cur, "resume_data") if c != "duplicate_of"]
+    columns = ", ".join(data_columns)
+    cur.execute(f"INSERT INTO resume_data ({columns}) SELECT {columns} FROM stash_resume_data")
+    if "duplicate_of" in _stashed_columns(cur, "resume_data"):
+        cur.execute("""
+            UPDATE resume_data rd SET duplicate_of = s.duplicate_of
+            FROM stash_resume_data s
+            JOIN stash_resume_data root ON root.id = s.duplicate_of AND root.user_id = s.user_id
+            WHERE rd.id = s.id AND rd.user_id = s.user_id
+        """)
+    if _stashed_columns(cur, "resume_lsh_bands"):
+        cur.execute("""
+            INSERT INTO resume_lsh_bands (user_id, bucket, resume_id)
+            SELECT DISTINCT d.user_id, b.bucket, b.resume_id
+            FROM stash_resume_lsh_bands b JOIN stash_resume_data d ON d.id = b.resume_id
+        """)
+    for table in ("resume_files", "resume_data"):
+        cur.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                    f"GREATEST((SELECT max(id) FROM {table}), 1))")
+    return tenants
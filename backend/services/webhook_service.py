@@ -0,0 +1,79 @@
+import gzip
+import json
+import uuid
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def compact_match(match: Dict, api_base_url: str, user_id: int = 1) -> Dict:
+    """Match result without the resume text; n8n fetches the text from TextUrl when it needs it."""
+    skills = match.get('Skills') or ""
+    return {
+        "id": match['id'],
+        "Name": match.get('Name'),
+        "Email": match.get('Email'),
+        "Phone": match.get('Phone'),
+        "Education": match.get('Education'),
+        "File": match.get('File'),
+        "MatchScore": match.get('MatchScore'),
+        "Skills": [s.strip() for s in skills.split(",") if s.strip()],
+        "TextUrl": f"{api_base_url.rstrip('/')}/resume/{match['id']}?user_id={user_id}",
+    }
+
+
+class WebhookDispatcher:
+    """Posts match results to n8n over a pooled, retrying HTTP session."""
+
+    def __init__(self, config: Dict):
+        self.url = config['url']
+        self.api_base_url = config.get('api_base_url', 'http://localhost:8000')
+        self.gzip = config.get('gzip', True)
+        self.include_text = config.get('include_text', False)
+        self.timeout = float(config.get('timeout_seconds', 10))
+
+        retry = Retry(
+            total=int(config.get('retries', 3)),
+            backoff_factor=float(config.get('backoff_seconds', 0.5)),
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["POST"]),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=int(config.get('pool_size', 10)), max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def build_payload(self, jd_text: str, matches: List[Dict], top_k: int, run_id: str,
+                      include_text: Optional[bool] = None, user_id: int = 1) -> Dict:
+        include_text = self.include_text if include_text is None else include_text
+        items = []
+        for m in matches:
+            item = compact_match(m, self.api_base_url, user_id)
+            if include_text and m.get('ResumeText') is not None:
+                item['ResumeText'] = m['ResumeText']
+            items.append(item)
+        return {"run_id": run_id, "jd_text": jd_text, "top_k": top_k, "matches": items}
+
+    def post(self, payload: Dict) -> requests.Response:
+        body = json.dumps(payload, default=str).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if self.gzip:
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+        response = self.session.post(self.url, data=body, headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+        return response
+
+    def dispatch_matches(self, jd_text: str, matches: List[Dict], top_k: int, run_id: Optional[str] = None,
+                         include_text: Optional[bool] = None, user_id: int = 1) -> str:
+        """Send one match run; errors are logged since this runs as a background task."""
+        run_id = run_id or uuid.uuid4().hex
+        try:
+            self.post(self.build_payload(jd_text, matches, top_k, run_id, include_text, user_id))
+            print(f"[Run {run_id}] Webhook delivered ({len(matches)} matches)")
+        except Exception as e:
+            print(f"[Run {run_id}] Webhook dispatch failed: {e}")
+        return run_id
@@ -0,0 +1,195 @@
+"""Priority lanes for interactive requests and bulk ingestion.
+
+Each lane has its own bounded thread pool, a bounded queue and a cap on
+the database connections its work may hold (see database.current_lane), so a
+large /resume/upload-batch cannot take the threads or connections a
+recruiter's /resume/match needs. Bulk work also goes through admission
+control: while the interactive lane's recent p95 latency is over its SLO,
+bulk jobs pause between files.
+"""
+import asyncio
+import collections
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from backend.database import configure_lane_connections, current_lane, lane_connections_in_use
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+DEFAULTS = {
+    "interactive_workers": 8,
+    "interactive_queue": 64,
+    "interactive_db_connections": 8,
+    "bulk_workers": 2,
+    "bulk_queue": 20,
+    "bulk_db_connections": 3,
+    "bulk_nice": 10,
+    "interactive_slo_ms": 500,
+    "latency_window": 200,
+    "latency_window_seconds": 60,
+    "min_samples": 5,
+    "throttle_step_seconds": 0.25,
+    "max_throttle_seconds": 30,
+}
+
+
+class LaneFull(RuntimeError):
+    """The lane's queue is at capacity; the caller should retry later."""
+
+
+class Lane:
+    def __init__(self, name: str, workers: int, queue_limit: int, nice: int = 0,
+                 latency_window: int = DEFAULTS["latency_window"]):
+        self.name = name
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.nice = nice
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"lane-{name}",
+                                            initializer=self._init_worker)
+        self._lock = threading.Lock()
+        self._latencies = collections.deque(maxlen=latency_window)
+        self.pending = 0  # queued + running
+        self.active = 0
+        self.counts = dict.fromkeys(("submitted", "completed", "failed", "rejected"), 0)
+
+    def _init_worker(self):
+        if self.nice and hasattr(os, "setpriority"):
+            # On Linux a thread id targets just this thread, so bulk parsing yields the CPU first
+            try:
+                os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), self.nice)
+            except OSError as e:
+                print(f"Could not lower priority of {self.name} lane worker: {e}")
+
+    def _run(self, fn: Callable, args, kwargs, enqueued_at: float):
+        with self._lock:
+            self.active += 1
+        token = current_lane.set(self.name)
+        outcome = "failed"
+        try:
+            result = fn(*args, **kwargs)
+            outcome = "completed"
+            return result
+        finally:
+            current_lane.reset(token)
+            with self._lock:
+                self.counts[outcome] += 1
+                self.active -= 1
+                self.pending -= 1
+                # Queue wait included: that is what the caller experiences
+                self._latencies.append((time.monotonic(), time.monotonic() - enqueued_at))
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        with self._lock:
+            if self.pending >= self.workers + self.queue_limit:
+                self.counts["rejected"] += 1
+                raise LaneFull(f"The {self.name} lane is full ({self.pending} jobs queued or running)")
+            self.pending += 1
+            self.counts["submitted"] += 1
+        try:
+            return self._executor.submit(self._run, fn, args, kwargs, time.monotonic())
+        except Exception:
+            with self._lock:
+                self.pending -= 1
+            raise
+
+    def recent_latencies(self, window_seconds: float):
+        cutoff = time.monotonic() - window_seconds
+        with self._lock:
+            return sorted(latency for finished, latency in self._latencies if finished >= cutoff)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _percentile(ordered, p: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return ordered[max(0, min(len(ordered) - 1, int(round(p / 100.0 * len(ordered))) - 1))]
+
+
+class WorkloadScheduler:
+    def __init__(self, config: Optional[Dict] = None):
+        self.config = dict(DEFAULTS, **(config or {}))
+        c = self.config
+        window = int(c["latency_window"])
+        self.lanes = {
+            INTERACTIVE: Lane(INTERACTIVE, int(c["interactive_workers"]), int(c["interactive_queue"]),
+                              latency_window=window),
+            BULK: Lane(BULK, int(c["bulk_workers"]), int(c["bulk_queue"]), nice=int(c["bulk_nice"]),
+                       latency_window=window),
+        }
+        configure_lane_connections({INTERACTIVE: int(c["interactive_db_connections"]),
+                                    BULK: int(c["bulk_db_connections"])})
+        self.slo_seconds = float(c["interactive_slo_ms"]) / 1000
+        self.throttle = {"pauses": 0, "throttled_seconds": 0.0, "gave_up_waiting": 0}
+        self._throttle_lock = threading.Lock()
+
+    def submit(self, lane: str, fn: Callable, *args, **kwargs) -> Future:
+        return self.lanes[lane].submit(fn, *args, **kwargs)
+
+    async def run(self, lane: str, fn: Callable, *args, **kwargs):
+        """Run blocking `fn` on the lane's pool and await its result."""
+        return await asyncio.wrap_future(self.submit(lane, fn, *args, **kwargs))
+
+    def interactive_p95(self) -> Optional[float]:
+        samples = self.lanes[INTERACTIVE].recent_latencies(float(self.config["latency_window_seconds"]))
+        if len(samples) < int(self.config["min_samples"]):
+            return None
+        return _percentile(samples, 95)
+
+    def slo_breached(self) -> bool:
+        p95 = self.interactive_p95()
+        return p95 is not None and p95 > self.slo_seconds
+
+    def admit_bulk(self):
+        """Block a bulk job while interactive latency is over its SLO, up to max_throttle_seconds."""
+        if not self.slo_breached():
+            return
+        step = float(self.config["throttle_step_seconds"])
+        started = time.monotonic()
+        deadline = started + float(self.config["max_throttle_seconds"])
+        while self.slo_breached():
+            if time.monotonic() >= deadline:
+                # Never starve bulk work entirely; it resumes at its own pace
+                with self._throttle_lock:
+                    self.throttle["gave_up_waiting"] += 1
+                break
+            time.sleep(step)
+        with self._throttle_lock:
+            self.throttle["pauses"] += 1
+            self.throttle["throttled_seconds"] += time.monotonic() - started
+
+    def metrics(self) -> Dict:
+        window = float(self.config["latency_window_seconds"])
+        connections = lane_connections_in_use()
+        lanes = {}
+        for name, lane in self.lanes.items():
+            samples = lane.recent_latencies(window)
+            lanes[name] = dict(
+                lane.counts,
+                workers=lane.workers,
+                active=lane.active,
+                queued=max(0, lane.pending - lane.active),
+                queue_limit=lane.queue_limit,
+                db_connections=connections.get(name),
+                latency_ms={
+                    "samples": len(samples),
+                    "p50": round(_percentile(samples, 50) * 1000, 2) if samples else None,
+                    "p95": round(_percentile(samples, 95) * 1000, 2) if samples else None,
+                    "max": round(samples[-1] * 1000, 2) if samples else None,
+                },
+            )
+        with self._throttle_lock:
+            throttle = dict(self.throttle, throttled_seconds=round(self.throttle["throttled_seconds"], 2))
+        lanes[INTERACTIVE]["slo_ms"] = self.slo_seconds * 1000
+        lanes[INTERACTIVE]["slo_breached"] = self.slo_breached()
+        lanes[BULK]["admission"] = throttle
+        return {"window_seconds": window, "lanes": lanes}
+
+    def shutdown(self):
+        for lane in self.lanes.values():
+            lane.shutdown()
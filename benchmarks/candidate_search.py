@@ -0,0 +1,196 @@
+"""Candidate search latency at scale: /candidates/search queries against one large tenant.
+
+Seeds --rows synthetic candidates (names, emails, phones in mixed formats,
+filenames) into the tenant's resume partitions, then times
+CandidateSearchService.search for a mix of queries drawn from the seeded data:
+autocomplete prefixes of 1-6 characters on each field, phone fragments typed
+with and without formatting, and misspelt surnames for fuzzy search. Each kind
+is also timed once as an unindexed scan (ILIKE '%q%' over the four columns),
+which is what a lookup cost before the search indexes. Needs Postgres (the
+configured database; TRUNCATES the resume tables):
+
+    python -m benchmarks.candidate_search --rows 1000000 --out bench_results/candidate_search.json
+
+Exits non-zero if a query kind's p95 is over --budget-ms, fuzzy and phone
+kinds included. Those only use an index with pg_trgm, so the run stops before
+seeding when the server lacks it; --allow-no-trgm times them anyway as scans,
+reported but not held to the budget.
+"""
+import argparse
+import random
+import sys
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.common import Timer, percentiles, run_metadata, write_results
+from benchmarks.run import setup_database
+from backend.database import get_db_connection
+from backend.services.candidate_search_service import FUZZY, PREFIX, CandidateSearchService
+from backend.services.tenant_service import ensure_tenant_partitions
+
+FIRST = ["Aarav", "Aditi", "Ananya", "Arjun", "Deepa", "Farah", "Gaurav", "Ishaan", "Kavya", "Meera", "Nikhil",
+         "Priya", "Rahul", "Rohan", "Sanjay", "Sneha", "Tanvi", "Vikram", "Alice", "Benjamin", "Carlos", "Diana",
+         "Elena", "Fatima", "George", "Hannah", "Ivan", "Julia", "Kenji", "Laura", "Mohammed", "Nora", "Oliver",
+         "Paula", "Quentin", "Rosa", "Samuel", "Tara", "Umar", "Valeria", "William", "Xin", "Yusuf", "Zoe"]
+SYLLABLES = ["ka", "ra", "sha", "ven", "dor", "mil", "ter", "son", "ber", "lin", "gar", "wal", "pat", "nan", "del",
+             "ros", "kum", "jan", "tho", "mas", "rey", "sin", "gh", "ley", "ton", "ber", "vic", "har", "ell", "mor"]
+DOMAINS = ["gmail.com", "yahoo.com", "outlook.com", "example.org", "mail.co.in"]
+PHONE_FORMATS = ["+91 {a}{b} {c}", "+91-{a}{b}{c}", "0{a}{b}{c}", "({a3}) {b3}-{c4}", "+1 {a3}.{b3}.{c4}",
+                 "{a}{b}{c}"]
+
+
+def candidate(rng: random.Random, n: int) -> Tuple[str, str, str, str]:
+    first = rng.choice(FIRST)
+    last = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+    digits = "".join(str(rng.randrange(10)) for _ in range(10))
+    phone = rng.choice(PHONE_FORMATS).format(a=digits[:3], b=digits[3:5], c=digits[5:], a3=digits[:3],
+                                             b3=digits[3:6], c4=digits[6:])
+    email = f"{first.lower()}.{last.lower()}{n % 1000}@{rng.choice(DOMAINS)}"
+    filename = f"{first}_{last}_Resume_{n}.{rng.choice(['pdf', 'docx'])}"
+    return f"{first} {last}", email, phone, filename
+
+
+def seed(rows: int, seed_value: int, user_id: int = 1, chunk: int = 100_000) -> List[Tuple[str, str, str, str]]:
+    """Insert `rows` candidates for the tenant; returns a sample of them for building queries."""
+    rng = random.Random(seed_value)
+    ensure_tenant_partitions(user_id)
+    sample = []
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            for start in range(0, rows, chunk):
+                batch = [candidate(rng, n) for n in range(start, min(rows, start + chunk))]
+                ids = list(range(start + 1, start + len(batch) + 1))
+                names, emails, phones, filenames = (list(column) for column in zip(*batch))
+                cur.execute("""
+                    INSERT INTO resume_files (id, user_id, filename, file_type)
+                    SELECT id, %s, filename, 'pdf' FROM unnest(%s::int[], %s::text[]) AS t(id, filename)
+                """, (user_id, ids, filenames))
+                cur.execute("""
+                    INSERT INTO resume_data (id, resume_file_id, user_id, candidate_name, candidate_email,
+                                             candidate_phone, extracted_text)
+                    SELECT id, id, %s, name, email, phone, ''
+                    FROM unnest(%s::int[], %s::text[], %s::text[], %s::text[]) AS t(id, name, email, phone)
+                """, (user_id, ids, names, emails, phones))
+                conn.commit()
+                sample.extend(rng.sample(batch, min(len(batch), 200)))
+            for table in ("resume_files", "resume_data"):
+                cur.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), %s)", (max(rows, 1),))
+                cur.execute(f"ANALYZE {table}")
+        conn.commit()
+    finally:
+        conn.close()
+    return sample
+
+
+def misspell(rng: random.Random, word: str) -> str:
+    i = rng.randrange(1, len(word) - 1)
+    return rng.choice([word[:i] + word[i + 1:], word[:i] + word[i + 1] + word[i] + word[i + 2:],
+                       word[:i] + rng.choice("aeiou") + word[i + 1:]])
+
+
+def queries(sample: List[Tuple[str, str, str, str]], per_kind: int, seed_value: int) -> Dict[str, List[Tuple]]:
+    """{kind: [(query, mode, fields)]} drawn from seeded candidates."""
+    rng = random.Random(seed_value)
+    picks = [rng.choice(sample) for _ in range(per_kind)]
+    kinds = {
+        "name_prefix": [(name[:rng.randint(1, 6)], PREFIX, ["name"]) for name, _, _, _ in picks],
+        "email_prefix": [(email[:rng.randint(2, 8)], PREFIX, ["email"]) for _, email, _, _ in picks],
+        "filename_prefix": [(filename[:rng.randint(3, 10)], PREFIX, ["filename"]) for _, _, _, filename in picks],
+        "any_prefix": [(name.split()[0][:rng.randint(2, 5)], PREFIX, None) for name, _, _, _ in picks],
+        "phone_typed": [(phone, PREFIX, None) for _, _, phone, _ in picks],
+        "phone_last_digits": [("".join(c for c in phone if c.isdigit())[-rng.randint(4, 7):], PREFIX, None)
+                              for _, _, phone, _ in picks],
+        "fuzzy_surname": [(misspell(rng, name.split()[1].lower()), FUZZY, ["name"]) for name, _, _, _ in picks],
+        "fuzzy_any": [(misspell(rng, name.split()[1].lower()), FUZZY, None) for name, _, _, _ in picks],
+    }
+    return kinds
+
+
+def scan(user_id: int, query: str) -> int:
+    """The unindexed lookup: substring match over every searchable column."""
+    pattern = f"%{query}%"
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT rd.id FROM resume_data rd
+                LEFT JOIN resume_files rf ON rf.user_id = rd.user_id AND rf.id = rd.resume_file_id
+                WHERE rd.user_id = %s AND (rd.candidate_name ILIKE %s OR rd.candidate_email ILIKE %s
+                                           OR rd.candidate_phone ILIKE %s OR rf.filename ILIKE %s)
+                LIMIT 10
+            """, (user_id, pattern, pattern, pattern, pattern))
+            return len(cur.fetchall())
+    finally:
+        conn.close()
+
+
+def bench_search(kinds: Dict[str, List[Tuple]], service: CandidateSearchService, limit: int) -> Dict:
+    results = {}
+    for kind, items in kinds.items():
+        samples, hits = [], 0
+        for query, mode, fields in items:
+            with Timer() as t:
+                found = service.search(1, query, mode, fields, limit)
+            samples.append(t.elapsed)
+            hits += bool(found)
+        query = items[0][0]
+        with Timer() as unindexed:
+            scan(1, query)
+        results[kind] = {
+            "queries": len(items),
+            "found_share": round(hits / len(items), 3),
+            "latency_ms": percentiles(samples),
+            "unindexed_scan_ms": round(unindexed.elapsed * 1000, 2),
+            "example": query,
+        }
+    return results
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Candidate search latency against one large tenant")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="candidates seeded into the tenant")
+    parser.add_argument("--queries", type=int, default=200, help="queries timed per kind")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=20, help="p95 budget per query kind")
+    parser.add_argument("--allow-no-trgm", action="store_true",
+                        help="run without pg_trgm; fuzzy and phone kinds are then not held to the budget")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="write JSON results to this path")
+    args = parser.parse_args(argv)
+
+    reset = setup_database("postgres")
+    reset()
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+            trigrams = cur.fetchone()[0]
+    finally:
+        conn.close()
+    if not trigrams and not args.allow_no_trgm:
+        parser.error("pg_trgm is not installed, so fuzzy and phone search cannot be held to the budget; "
+                     "install it (init_db creates the extension) or pass --allow-no-trgm")
+    with Timer() as seeding:
+        sample = seed(args.rows, args.seed)
+    service = CandidateSearchService()
+    kinds = queries(sample, args.queries, args.seed)
+    results = {
+        "meta": dict(run_metadata(), seed=args.seed, rows=args.rows, limit=args.limit, pg_trgm=trigrams,
+                     seed_s=round(seeding.elapsed, 1)),
+        "search": bench_search(kinds, service, args.limit),
+    }
+    # Without pg_trgm (--allow-no-trgm) these fall back to scans by design
+    unindexed = set() if trigrams else {"fuzzy_surname", "fuzzy_any", "phone_typed", "phone_last_digits"}
+    for kind, r in results["search"].items():
+        r["held_to_budget"] = kind not in unindexed
+    write_results(results, args.out)
+
+    over = {kind: r["latency_ms"]["p95"] for kind, r in results["search"].items()
+            if r["held_to_budget"] and r["latency_ms"]["p95"] > args.budget_ms}
+    if over:
+        print(f"FAIL: p95 over {args.budget_ms:g} ms: {over}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
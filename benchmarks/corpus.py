@@ -0,0 +1,185 @@
+"""Synthetic resume corpus for benchmarks.
+
+Resumes are generated deterministically from a seed so two runs (or two commits)
+see exactly the same documents. Contact details use the formats PHONE_RE and
+EMAIL_RE target and skills are drawn from SKILLS_DB, so the extractors exercise
+their real code paths.
+"""
+import argparse
+import io
+import os
+import random
+from typing import Dict, Iterator, List, Optional
+
+from backend.services.resume_service import SKILLS_DB
+
+FIRST_NAMES = [
+    "Aarav", "Priya", "Rahul", "Ananya", "Vikram", "Sneha", "Arjun", "Kavya", "Rohan", "Meera",
+    "James", "Olivia", "Liam", "Emma", "Noah", "Sophia", "Lucas", "Mia", "Ethan", "Isabella",
+    "Wei", "Yuki", "Carlos", "Fatima", "Omar", "Elena", "Mateo", "Chloe", "Daniel", "Aisha",
+]
+LAST_NAMES = [
+    "Sharma", "Patel", "Iyer", "Reddy", "Nair", "Gupta", "Menon", "Rao", "Kulkarni", "Singh",
+    "Smith", "Johnson", "Brown", "Garcia", "Miller", "Davis", "Wilson", "Moore", "Taylor", "Clark",
+    "Chen", "Tanaka", "Lopez", "Khan", "Hassan", "Petrova", "Rossi", "Martin", "Kim", "Okafor",
+]
+EMAIL_DOMAINS = ["gmail.com", "outlook.com", "yahoo.co.in", "proton.me", "mail.com"]
+COMPANIES = [
+    "Infosys", "Tata Consultancy Services", "Wipro", "Acme Corp", "Globex", "Initech",
+    "Umbrella Analytics", "Stark Industries", "Hooli", "Pied Piper", "Zoho", "Freshworks",
+]
+TITLES = [
+    "Software Engineer", "Senior Software Engineer", "Data Scientist", "Backend Developer",
+    "Frontend Developer", "DevOps Engineer", "ML Engineer", "QA Engineer", "Product Analyst",
+]
+DEGREES = [
+    "B.Tech in Computer Science", "B.E in Electronics", "M.Tech in Data Science", "B.Sc Physics",
+    "M.Sc Mathematics", "BCA", "MCA", "Bachelor of Engineering", "Master of Science", "B.Com",
+]
+COLLEGES = [
+    "Indian Institute of Technology Bombay", "National Institute of Technology Trichy",
+    "BITS Pilani", "Vellore Institute of Technology", "Manipal Institute of Technology",
+    "Stanford University", "University of Toronto", "Delhi College of Engineering",
+]
+VERBS = ["Developed", "Designed", "Led", "Built", "Optimized", "Migrated", "Automated", "Maintained"]
+OBJECTS = [
+    "a microservice platform", "the data ingestion pipeline", "customer-facing dashboards",
+    "a recommendation engine", "CI/CD workflows", "REST APIs for billing", "an internal search tool",
+]
+
+
+def _phone(rng: random.Random) -> str:
+    """One phone number in a format PHONE_RE is designed to catch."""
+    d = lambda n: "".join(str(rng.randint(0, 9)) for _ in range(n))
+    mobile = str(rng.randint(6, 9)) + d(9)
+    fmt = rng.randrange(8)
+    if fmt == 0:
+        return f"+91 {mobile[:5]} {mobile[5:]}"
+    if fmt == 1:
+        return f"+1 ({d(3)}) {d(3)}-{d(4)}"
+    if fmt == 2:
+        return f"0{d(5)} {d(5)}"
+    if fmt == 3:
+        return f"{d(3)}-{d(3)}-{d(4)}"
+    if fmt == 4:
+        return mobile
+    if fmt == 5:
+        return f"{mobile[:5]}-{mobile[5:]}"
+    if fmt == 6:
+        return f"{d(4)} {d(3)} {d(3)}"
+    return f"+44 {d(2)} {d(4)} {d(4)}"
+
+
+def generate_resume(rng: random.Random, index: int, length: int = 1) -> Dict:
+    """Build one synthetic resume; `length` scales the number of experience entries."""
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    name = f"{first} {last}"
+    email = f"{first.lower()}.{last.lower()}{index}@{rng.choice(EMAIL_DOMAINS)}"
+    phone = _phone(rng)
+    skills = rng.sample(sorted(SKILLS_DB), rng.randint(5, 14))
+    degree, college = rng.choice(DEGREES), rng.choice(COLLEGES)
+    cgpa = f"{rng.uniform(6.5, 9.8):.1f}"
+
+    lines = [
+        name,
+        f"Email: {email} | Phone: {phone}",
+        f"linkedin.com/in/{first.lower()}-{last.lower()}-{index}",
+        "",
+        "SUMMARY",
+        f"{rng.choice(TITLES)} with {rng.randint(1, 15)} years of experience in "
+        f"{', '.join(skills[:3])}.",
+        "",
+        "SKILLS",
+        ", ".join(skills),
+        "",
+        "EXPERIENCE",
+    ]
+    year = 2024
+    for _ in range(max(1, length) * rng.randint(2, 4)):
+        start = year - rng.randint(1, 3)
+        lines.append(f"{rng.choice(TITLES)}, {rng.choice(COMPANIES)} ({start} - {year})")
+        for _ in range(rng.randint(2, 4)):
+            lines.append(f"- {rng.choice(VERBS)} {rng.choice(OBJECTS)} using {rng.choice(skills)}")
+        year = start
+    lines += [
+        "",
+        "EDUCATION",
+        degree,
+        college,
+        f"CGPA: {cgpa}",
+    ]
+    return {
+        "index": index,
+        "text": "\n".join(lines),
+        "truth": {
+            "name": name,
+            "email": email,
+            "mobile": phone,
+            "skills": skills,
+            "education": degree,
+        },
+    }
+
+
+def render_pdf(text: str) -> bytes:
+    import fitz
+    doc = fitz.open()
+    page = doc.new_page()
+    y = 50
+    for line in text.splitlines():
+        if y > page.rect.height - 50:
+            page = doc.new_page()
+            y = 50
+        page.insert_text((50, y), line, fontsize=10)
+        y += 14
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def render_docx(text: str) -> bytes:
+    from docx import Document
+    doc = Document()
+    for line in text.splitlines():
+        doc.add_paragraph(line)
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+
+RENDERERS = {".pdf": render_pdf, ".docx": render_docx}
+
+
+def generate_corpus(size: int, seed: int = 42, formats=(".pdf", ".docx"), length: int = 1,
+                    render: bool = True) -> Iterator[Dict]:
+    """Yield `size` resumes; with `render` each carries file bytes in one of `formats`."""
+    rng = random.Random(seed)
+    for i in range(size):
+        item = generate_resume(rng, i, length)
+        ext = formats[i % len(formats)]
+        item["filename"] = f"synthetic_{i:06d}{ext}"
+        if render:
+            item["content"] = RENDERERS[ext](item["text"])
+        yield item
+
+
+def write_corpus(out_dir: str, size: int, seed: int = 42, formats=(".pdf", ".docx"), length: int = 1):
+    os.makedirs(out_dir, exist_ok=True)
+    for item in generate_corpus(size, seed, formats, length):
+        with open(os.path.join(out_dir, item["filename"]), "wb") as f:
+            f.write(item["content"])
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Write a synthetic resume corpus to disk")
+    parser.add_argument("out_dir")
+    parser.add_argument("--size", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--formats", default=".pdf,.docx")
+    parser.add_argument("--length", type=int, default=1, help="experience section multiplier")
+    args = parser.parse_args(argv)
+    write_corpus(args.out_dir, args.size, args.seed, tuple(args.formats.split(",")), args.length)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""LLM admission control: coalescing, rate limiting and 429 handling against the fake LLM.
+
+Each scenario fires analyze_sentiment_and_summary from --callers threads at a
+FakeLLM that behaves like a loaded provider (latency, a requests-per-minute
+limit of its own, random 429s), once through the LLMLimiter and once straight
+to the model as before. Per run it reports model calls, provider 429s, how
+callers fared (analysis, {"error": ...} or shed with LLMRateLimited) and their
+latency:
+
+- herd: --resumes resumes, each requested --duplicates times at once, as when
+  n8n and several recruiters open the same shortlist. Coalescing should cut
+  model calls to one per resume.
+- overload: --distinct different resumes, more than the provider allows per
+  minute. The limiter should send no more than it admits and shed the rest
+  quickly, instead of letting the provider answer them with 429s.
+- flaky: the provider answers --flaky-rate of calls with a 429; the limiter
+  should retry them after Retry-After so no caller sees the error.
+
+    python -m benchmarks.llm_limiter --out bench_results/llm_limiter.json
+"""
+import argparse
+import random
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from benchmarks.common import Timer, percentiles, run_metadata, write_results
+from benchmarks.corpus import generate_corpus
+from backend.agents.fake_llm import FakeLLM
+from backend.agents.llm_limiter import LLMLimiter, LLMRateLimited
+from backend.agents.prompt_budget import count_tokens
+from backend.agents.resume_analyzer import ResumeAnalyzerAgent
+
+
+class Unlimited:
+    """Stands in for the limiter to call the model directly, as before it existed."""
+
+    max_output_tokens = 0
+
+    def call(self, key, fn, prompt_tokens, timeout=None):
+        return fn()
+
+
+def _analyze(agent: ResumeAnalyzerAgent, text: str):
+    with Timer() as t:
+        try:
+            result = agent.analyze_sentiment_and_summary(text)
+            outcome = "error" if "error" in result else "analysis"
+        except LLMRateLimited:
+            outcome = "shed"
+    return outcome, t.elapsed
+
+
+def run_scenario(texts: List[str], llm_options: Dict, limiter_config: Optional[Dict], callers: int) -> Dict:
+    llm = FakeLLM(**llm_options)
+    agent = ResumeAnalyzerAgent(LLMLimiter(limiter_config) if limiter_config is not None else Unlimited())
+    agent._llm, agent._llm_ready = llm, True
+    with ThreadPoolExecutor(max_workers=callers) as pool:
+        with Timer() as total:
+            results = list(pool.map(lambda text: _analyze(agent, text), texts))
+    outcomes = {}
+    for outcome, _ in results:
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    run = {
+        "requests": len(texts),
+        "model_calls": llm.calls,
+        "provider_429s": llm.rate_limited,
+        "outcomes": outcomes,
+        "total_s": round(total.elapsed, 2),
+        "latency_ms": percentiles([elapsed for _, elapsed in results]),
+        "shed_latency_ms": percentiles([elapsed for outcome, elapsed in results if outcome == "shed"],
+                                       points=(50, 99)),
+    }
+    if isinstance(agent.limiter, LLMLimiter):
+        stats = agent.limiter.stats()
+        run["limiter"] = {k: v for k, v in stats.items() if isinstance(v, int)}
+    return run
+
+
+def compare(texts: List[str], llm_options: Dict, limiter_config: Dict, callers: int) -> Dict:
+    return {
+        "limited": run_scenario(texts, llm_options, limiter_config, callers),
+        "direct": run_scenario(texts, llm_options, None, callers),
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="LLM coalescing and rate limiting against the fake LLM")
+    parser.add_argument("--callers", type=int, default=80, help="concurrent caller threads")
+    parser.add_argument("--resumes", type=int, default=10, help="herd: distinct resumes")
+    parser.add_argument("--duplicates", type=int, default=8, help="herd: concurrent requests per resume")
+    parser.add_argument("--distinct", type=int, default=120, help="overload: distinct resumes")
+    parser.add_argument("--flaky", type=int, default=40, help="flaky: distinct resumes")
+    parser.add_argument("--flaky-rate", type=float, default=0.2, help="flaky: share of calls answered with a 429")
+    parser.add_argument("--latency-ms", type=float, default=300, help="fake LLM latency per call")
+    parser.add_argument("--provider-rpm", type=int, default=60, help="fake LLM requests per minute before 429s")
+    parser.add_argument("--limiter-rpm", type=int, default=50, help="limiter requests_per_minute")
+    parser.add_argument("--queue-timeout", type=float, default=3, help="limiter queue_timeout_seconds")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="write JSON results to this path")
+    args = parser.parse_args(argv)
+
+    count_tokens("load the tokenizer before the clock starts")
+    corpus = [item["text"] for item in generate_corpus(max(args.resumes, args.distinct, args.flaky), args.seed,
+                                                         render=False)]
+    herd = [text for text in corpus[:args.resumes] for _ in range(args.duplicates)]
+    random.Random(args.seed).shuffle(herd)
+    llm = {"latency_ms": args.latency_ms, "jitter_ms": args.latency_ms / 3, "requests_per_minute": args.provider_rpm,
+           "retry_after_seconds": 1, "seed": args.seed}
+    limiter = {"requests_per_minute": args.limiter_rpm, "queue_timeout_seconds": args.queue_timeout}
+
+    results = {
+        "meta": dict(run_metadata(), seed=args.seed, callers=args.callers, llm=llm, limiter=limiter),
+        "herd": compare(herd, llm, limiter, args.callers),
+        "overload": compare(corpus[:args.distinct], llm, limiter, args.callers),
+        "flaky": compare(corpus[:args.flaky], dict(llm, requests_per_minute=0, error_429_rate=args.flaky_rate,
+                                                   retry_after_seconds=0.2),
+                         dict(limiter, requests_per_minute=10 * args.flaky, max_retries=5), args.callers),
+    }
+    write_results(results, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,443 @@
+"""End-to-end load test: a production-like request mix against a locally started API.
+
+Starts the app under uvicorn in a subprocess, pointed at the configured
+Postgres with three stand-ins: the fake LLM (with --llm-latency-ms per call)
+for ResumeAnalyzerAgent, an in-process SMTP sink that accepts every message the
+email outbox sends, and an empty local busy calendar instead of Google. Then
+--users closed-loop clients replay a weighted mix for --duration seconds
+(after --warmup seconds that are not counted):
+
+    upload_batch   POST /resume/upload-batch with --batch-files resumes
+    analyze        POST /resume/analyze with one PDF or DOCX
+    sentiment      POST /resume/sentiment-text
+    match          POST /resume/match
+    search         GET  /candidates/search
+    availability   POST /interview/availability
+    schedule       POST /interview/schedule (invite email goes to the SMTP sink)
+    feedback       POST /interview/feedback on an interview booked earlier
+    scorecards     GET  /interview/scorecards
+    pipeline       GET  /pipeline/summary
+
+Per endpoint it reports throughput, status codes, errors (5xx or no response)
+and p50/p95/p99 latency, plus the server's lane, LLM limiter and outbox
+figures. Needs Postgres (TRUNCATES the resume, interview, candidate and email
+tables). Save a run per commit and compare against an earlier one:
+
+    python -m benchmarks.load --duration 60 --out bench_results/load_$(git rev-parse --short HEAD).json
+    python -m benchmarks.load --baseline bench_results/load_abc1234.json
+
+With --baseline the run exits non-zero when an endpoint's p95 grew by more than
+--tolerance (and --min-regression-ms), or its error rate rose.
+"""
+import argparse
+import collections
+import json
+import os
+import random
+import socket
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+import toml
+
+from benchmarks.common import percentiles, run_metadata, write_results
+from benchmarks.corpus import generate_corpus
+from benchmarks.run import make_jds, setup_database
+from backend.config import get_settings
+from backend.database import get_db_connection
+
+DEFAULT_MIX = {
+    "upload_batch": 1, "analyze": 3, "sentiment": 2, "match": 6, "search": 4,
+    "availability": 2, "schedule": 2, "feedback": 2, "scorecards": 1, "pipeline": 1,
+}
+# Expected outcomes that are not errors: a slot taken by a concurrent booking, lane back-pressure
+EXPECTED_STATUSES = {409, 429, 503}
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# --- SMTP sink ---
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.wfile.write(b"220 load-test sink ESMTP\r\n")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line[:4].upper()
+            if command == b"EHLO":
+                self.wfile.write(b"250-sink\r\n250 8BITMIME\r\n")
+            elif command == b"DATA":
+                self.wfile.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data in (b".\r\n", b".\n"):
+                        break
+                self.server.received()
+                self.wfile.write(b"250 OK queued\r\n")
+            elif command == b"QUIT":
+                self.wfile.write(b"221 Bye\r\n")
+                return
+            elif command in (b"HELO", b"MAIL", b"RCPT", b"RSET", b"NOOP"):
+                self.wfile.write(b"250 OK\r\n")
+            else:
+                self.wfile.write(b"502 Command not implemented\r\n")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Accepts and counts every message; stands in for the SMTP server the outbox sends to."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _SMTPHandler)
+        self.port = self.server_address[1]
+        self.messages = 0
+        self._lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, name="smtp-sink", daemon=True).start()
+
+    def received(self):
+        with self._lock:
+            self.messages += 1
+
+
+# --- App under test ---
+def prepare_database(interviewers: int) -> List[int]:
+    """Empty the tables the mix writes to and create the interviewers; returns their ids."""
+    reset = setup_database("postgres")
+    reset()
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                TRUNCATE interview_feedback, interview_schedules, email_outbox, candidate_scorecards,
+                         candidate_stage_events, onboarding_tasks, candidates CASCADE
+            """)
+            cur.execute("""
+                INSERT INTO interviewers (name, email, timezone)
+                SELECT 'Load Interviewer ' || n, 'load-interviewer-' || n || '@example.com', 'UTC'
+                FROM generate_series(1, %s) AS n
+                ON CONFLICT (email) DO UPDATE SET is_active = TRUE
+                RETURNING id
+            """, (interviewers,))
+            ids = [r[0] for r in cur.fetchall()]
+        conn.commit()
+        return ids
+    finally:
+        conn.close()
+
+
+def write_settings(smtp_port: int, llm_latency_ms: float, workdir: str) -> str:
+    """The current settings with the stand-ins swapped in, as a secrets file for the app."""
+    settings = json.loads(json.dumps(get_settings(), default=str))
+    settings.setdefault("openai", {}).update(provider="fake", fake_latency_ms=llm_latency_ms,
+                                             fake_jitter_ms=llm_latency_ms / 3)
+    settings["email"] = dict(settings.get("email", {}), smtp_server="127.0.0.1", smtp_port=smtp_port,
+                             sender_email="loadtest@localhost", sender_password="", use_tls=False,
+                             poll_seconds=1)
+    settings["google_calendar"] = {"local_busy_file": os.path.join(workdir, "busy_calendar.json")}
+    settings.pop("webhook", None)  # nothing listens for match dispatches
+    settings.setdefault("analysis", {})["precompute"] = False
+    path = os.path.join(workdir, "secrets.toml")
+    with open(path, "w") as f:
+        toml.dump(settings, f)
+    return path
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_app(secrets_path: str, port: int, log_path: str, timeout: float = 90) -> subprocess.Popen:
+    env = dict(os.environ, SECRETS_FILE=secrets_path, LLM_PROVIDER="fake",
+               PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.getenv("PYTHONPATH")])))
+    log = open(log_path, "w")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"App exited with {process.returncode}; see {log_path}")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/metrics/lanes", timeout=2).ok:
+                return process
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    process.kill()
+    raise RuntimeError(f"App did not come up within {timeout:g}s; see {log_path}")
+
+
+# --- Workload ---
+class Workload:
+    """Builds each operation's request from a shared pool of synthetic resumes, JDs and booked interviews."""
+
+    def __init__(self, base_url: str, interviewer_ids: List[int], resumes: int, batch_files: int, seed: int):
+        self.base_url = base_url
+        self.interviewer_ids = interviewer_ids
+        self.batch_files = batch_files
+        self.resumes = list(generate_corpus(resumes, seed))
+        self.jds = make_jds(50, seed)
+        self.interviews: List[int] = []
+        self._lock = threading.Lock()
+        self._uploads = 0
+        self.operations: Dict[str, Callable[[requests.Session, random.Random], requests.Response]] = {
+            "upload_batch": self.upload_batch, "analyze": self.analyze, "sentiment": self.sentiment,
+            "match": self.match, "search": self.search, "availability": self.availability,
+            "schedule": self.schedule, "feedback": self.feedback, "scorecards": self.scorecards,
+            "pipeline": self.pipeline,
+        }
+
+    def _upload_name(self, filename: str) -> str:
+        # Unique names: re-uploading a filename would update a row rather than ingest a resume
+        with self._lock:
+            self._uploads += 1
+            return f"load{self._uploads:07d}_{filename}"
+
+    def upload_batch(self, session, rng):
+        files = [("files", (self._upload_name(r["filename"]), r["content"]))
+                 for r in rng.sample(self.resumes, min(self.batch_files, len(self.resumes)))]
+        return session.post(f"{self.base_url}/resume/upload-batch", files=files, timeout=60)
+
+    def analyze(self, session, rng):
+        resume = rng.choice(self.resumes)
+        return session.post(f"{self.base_url}/resume/analyze", timeout=60,
+                            files={"file": (self._upload_name(resume["filename"]), resume["content"])})
+
+    def sentiment(self, session, rng):
+        # A small set of texts, so concurrent requests for the same candidate occur as in production
+        return session.post(f"{self.base_url}/resume/sentiment-text", timeout=60,
+                            json={"resume_text": rng.choice(self.resumes[:20])["text"]})
+
+    def match(self, session, rng):
+        return session.post(f"{self.base_url}/resume/match", timeout=60,
+                            json={"jd_text": rng.choice(self.jds), "top_k": 10})
+
+    def search(self, session, rng):
+        name = rng.choice(self.resumes)["truth"]["name"]
+        return session.get(f"{self.base_url}/candidates/search", timeout=60,
+                           params={"q": name[:rng.randint(2, 6)], "limit": 10})
+
+    def _day(self, rng) -> date:
+        day = date.today() + timedelta(days=rng.randint(1, 60))
+        return day + timedelta(days=2) if day.weekday() == 5 else day + timedelta(days=1) if day.weekday() == 6 else day
+
+    def availability(self, session, rng):
+        start = self._day(rng)
+        return session.post(f"{self.base_url}/interview/availability", timeout=60, json={
+            "interviewer_ids": rng.sample(self.interviewer_ids, min(5, len(self.interviewer_ids))),
+            "start_date": start.isoformat(), "end_date": (start + timedelta(days=4)).isoformat(),
+        })
+
+    def schedule(self, session, rng):
+        slot = datetime.combine(self._day(rng), dtime(rng.randint(9, 16), rng.choice((0, 30))), timezone.utc)
+        resume = rng.choice(self.resumes)
+        response = session.post(f"{self.base_url}/interview/schedule", timeout=60, json={
+            "candidate_email": resume["truth"]["email"], "candidate_name": resume["truth"]["name"],
+            "interviewer_id": rng.choice(self.interviewer_ids), "slot_iso": slot.isoformat(),
+        })
+        if response.ok:
+            with self._lock:
+                self.interviews.append(response.json()["interview_id"])
+        return response
+
+    def feedback(self, session, rng):
+        with self._lock:
+            interview_id = rng.choice(self.interviews) if self.interviews else None
+        if interview_id is None:
+            return self.schedule(session, rng)
+        return session.post(f"{self.base_url}/interview/feedback", timeout=60, json={
+            "interview_id": interview_id, "technical_skills": rng.randint(1, 5),
+            "communication_skills": rng.randint(1, 5), "overall_rating": rng.randint(1, 5),
+            "recommendation": rng.choice(["strong_hire", "hire", "no_hire"]), "detailed_feedback": "Load test",
+        })
+
+    def scorecards(self, session, rng):
+        return session.get(f"{self.base_url}/interview/scorecards", params={"limit": 20}, timeout=60)
+
+    def pipeline(self, session, rng):
+        return session.get(f"{self.base_url}/pipeline/summary", timeout=60)
+
+
+def run_load(workload: Workload, mix: Dict[str, float], users: int, duration: float, warmup: float,
+             think_ms: float, seed: int) -> Tuple[List[Tuple], float]:
+    """Closed-loop clients; returns (operation, status or None, seconds) samples after warm-up, and the window."""
+    names = [name for name, weight in mix.items() if weight > 0]
+    weights = [mix[name] for name in names]
+    samples: List[Tuple] = []
+    lock = threading.Lock()
+    started = time.monotonic()
+    measure_from, stop_at = started + warmup, started + warmup + duration
+
+    def client(index: int):
+        rng = random.Random(seed * 1000 + index)
+        session = requests.Session()
+        while time.monotonic() < stop_at:
+            name = rng.choices(names, weights)[0]
+            began = time.monotonic()
+            try:
+                status = workload.operations[name](session, rng).status_code
+            except requests.RequestException:
+                status = None
+            finished = time.monotonic()
+            if began >= measure_from:
+                with lock:
+                    samples.append((name, status, finished - began))
+            if think_ms:
+                time.sleep(rng.expovariate(1000.0 / think_ms))
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, duration
+
+
+def summarize(samples: List[Tuple], window: float) -> Dict:
+    by_operation = collections.defaultdict(list)
+    for sample in samples:
+        by_operation[sample[0]].append(sample)
+
+    def stats(rows):
+        statuses = collections.Counter(str(status) if status is not None else "no_response" for _, status, _ in rows)
+        errors = sum(1 for _, status, _ in rows if status is None or (status >= 400 and status not in EXPECTED_STATUSES))
+        return {
+            "requests": len(rows),
+            "throughput_rps": round(len(rows) / window, 2),
+            "errors": errors,
+            "error_rate": round(errors / len(rows), 4) if rows else 0.0,
+            "statuses": dict(statuses),
+            "latency_ms": percentiles([elapsed for _, _, elapsed in rows]),
+        }
+
+    return {"endpoints": {name: stats(rows) for name, rows in sorted(by_operation.items())},
+            "total": stats(samples)}
+
+
+def server_figures(base_url: str, sink: SMTPSink, drain_seconds: float) -> Dict:
+    """Lane, LLM and outbox figures from the app, after giving the outbox time to drain."""
+    figures = {}
+    deadline = time.monotonic() + drain_seconds
+    while True:
+        outbox = requests.get(f"{base_url}/email/outbox", timeout=10).json().get("counts", {})
+        if not outbox.get("pending") and not outbox.get("sending") or time.monotonic() >= deadline:
+            break
+        time.sleep(1)
+    figures["email"] = {"outbox": outbox, "smtp_received": sink.messages}
+    for name, path in (("lanes", "/metrics/lanes"), ("llm", "/utils/llm-stats"), ("parsing", "/resume/parse-stats")):
+        try:
+            figures[name] = requests.get(base_url + path, timeout=10).json()
+        except (requests.RequestException, ValueError) as e:
+            figures[name] = {"error": str(e)}
+    return figures
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float, min_regression_ms: float) -> Dict:
+    """Per-endpoint p95 and throughput against a saved run; lists the regressions."""
+    endpoints, regressions = {}, []
+    for name, now in current["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if not before:
+            continue
+        p95_now, p95_before = now["latency_ms"]["p95"], before["latency_ms"]["p95"]
+        endpoints[name] = {
+            "p95_ms": [p95_before, p95_now],
+            "p95_change": round(p95_now / p95_before - 1, 3) if p95_before else None,
+            "throughput_rps": [before["throughput_rps"], now["throughput_rps"]],
+            "error_rate": [before["error_rate"], now["error_rate"]],
+        }
+        if p95_now > p95_before * (1 + tolerance) and p95_now - p95_before > min_regression_ms:
+            regressions.append(f"{name}: p95 {p95_before:g} -> {p95_now:g} ms")
+        if now["error_rate"] > before["error_rate"] + 0.01:
+            regressions.append(f"{name}: error rate {before['error_rate']:g} -> {now['error_rate']:g}")
+    # Latencies are only comparable under the same load; flag runs that differ in it
+    settings = ("users", "duration", "think_ms", "mix", "llm_latency_ms", "seed_resumes")
+    differs = [k for k in settings if current["meta"].get(k) != baseline.get("meta", {}).get(k)]
+    return {"baseline_commit": baseline.get("meta", {}).get("commit"), "load_settings_differ": differs,
+            "endpoints": endpoints, "regressions": regressions}
+
+
+def parse_mix(text: Optional[str]) -> Dict[str, float]:
+    mix = dict(DEFAULT_MIX)
+    for part in filter(None, (p.strip() for p in (text or "").split(","))):
+        name, _, weight = part.partition("=")
+        if name not in DEFAULT_MIX:
+            raise SystemExit(f"Unknown operation {name!r}; choose from {', '.join(DEFAULT_MIX)}")
+        mix[name] = float(weight)
+    return mix
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Replay a production-like request mix against a local app")
+    parser.add_argument("--users", type=int, default=16, help="concurrent closed-loop clients")
+    parser.add_argument("--duration", type=float, default=60, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=10, help="seconds of load before measuring")
+    parser.add_argument("--think-ms", type=float, default=0, help="mean pause between a client's requests")
+    parser.add_argument("--mix", help="operation weights to override, e.g. match=10,upload_batch=0")
+    parser.add_argument("--resumes", type=int, default=100, help="synthetic resumes the uploads draw from")
+    parser.add_argument("--seed-resumes", type=int, default=500, help="resumes ingested before the run")
+    parser.add_argument("--batch-files", type=int, default=5, help="files per /resume/upload-batch")
+    parser.add_argument("--interviewers", type=int, default=20)
+    parser.add_argument("--llm-latency-ms", type=float, default=300, help="fake LLM latency per call")
+    parser.add_argument("--drain-seconds", type=float, default=30, help="wait for the email outbox to empty")
+    parser.add_argument("--baseline", help="earlier results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative p95 growth")
+    parser.add_argument("--min-regression-ms", type=float, default=5, help="ignore p95 growth below this")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="write JSON results to this path")
+    args = parser.parse_args(argv)
+    mix = parse_mix(args.mix)
+
+    interviewer_ids = prepare_database(args.interviewers)
+    if args.seed_resumes:
+        from backend.services.resume_service import save_resumes_batch
+        from benchmarks.run import to_record
+        save_resumes_batch([to_record(item) for item in generate_corpus(args.seed_resumes, args.seed + 1,
+                                                                         render=False)], 1)
+
+    sink = SMTPSink()
+    workdir = tempfile.mkdtemp(prefix="hr-load-")
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    app = start_app(write_settings(sink.port, args.llm_latency_ms, workdir), port, os.path.join(workdir, "app.log"))
+    try:
+        workload = Workload(base_url, interviewer_ids, args.resumes, args.batch_files, args.seed)
+        samples, window = run_load(workload, mix, args.users, args.duration, args.warmup, args.think_ms, args.seed)
+        results = dict(summarize(samples, window), server=server_figures(base_url, sink, args.drain_seconds))
+    finally:
+        app.terminate()
+        try:
+            app.wait(15)
+        except subprocess.TimeoutExpired:
+            app.kill()
+        sink.shutdown()
+
+    results["meta"] = dict(run_metadata(), seed=args.seed, users=args.users, duration=args.duration,
+                           warmup=args.warmup, think_ms=args.think_ms, mix=mix, llm_latency_ms=args.llm_latency_ms,
+                           seed_resumes=args.seed_resumes, app_log=os.path.join(workdir, "app.log"))
+    if args.baseline:
+        with open(args.baseline) as f:
+            results["comparison"] = compare(results, json.load(f), args.tolerance, args.min_regression_ms)
+    write_results(results, args.out)
+
+    regressions = results.get("comparison", {}).get("regressions")
+    if regressions:
+        print("REGRESSIONS:\n  " + "\n  ".join(regressions), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
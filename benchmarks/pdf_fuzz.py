@@ -0,0 +1,260 @@
+"""Isolated parsing: latency of good and pathological files through ParsePool.
+
+The fuzz corpus mixes synthetic resumes with PDFs built to hurt MuPDF: text
+floods and decompression bombs that keep get_text busy for tens of seconds, an
+embedded font that inflates to a gigabyte, thousands of pages, deep nesting,
+cyclic page trees, and garbage or truncated files. Every file goes through
+ParsePool from --workers caller threads, as the workload lanes call it, and
+p50/p99/max latency and outcomes are reported per kind. --in-process also
+times each pathological kind once through extract_text_and_links with no
+limits (in a throwaway process, given up on after --in-process-cap seconds),
+which is what a request paid before isolation.
+
+    python -m benchmarks.pdf_fuzz --good 200 --bad-copies 3 --out bench_results/pdf_fuzz.json
+
+Exits non-zero if any file took longer than --timeout plus --slack seconds, or
+a good file failed to parse.
+"""
+import argparse
+import collections
+import multiprocessing
+import random
+import resource
+import sys
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks.common import Timer, percentiles, run_metadata, write_results
+from benchmarks.corpus import generate_corpus
+from backend.services.parse_pool import ParsePool, ParseLimitExceeded, ParseTimeout
+from backend.services.resume_service import extract_text_and_links
+
+FONT = b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+TEXT_OP = b"BT /F1 1 Tf 10 10 Td (word) Tj ET\n"
+
+
+def build_pdf(objects: List[bytes]) -> bytes:
+    """A PDF whose object i+1 is objects[i]; object 1 must be the catalog."""
+    out = bytearray(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def stream(data: bytes, extra: bytes = b"") -> bytes:
+    return b"<< /Length %d %s >>\nstream\n" % (len(data), extra) + data + b"\nendstream"
+
+
+def deflate_repeated(chunk: bytes, total_bytes: int) -> bytes:
+    """zlib stream of `chunk` repeated up to total_bytes, without holding the inflated data."""
+    compressor = zlib.compressobj(9)
+    block = chunk * max(1, (1 << 20) // len(chunk))
+    parts = [compressor.compress(block) for _ in range(total_bytes // len(block))]
+    return b"".join(parts) + compressor.flush()
+
+
+def one_page_pdf(content: bytes, resources: bytes = b"<< /Font << /F1 5 0 R >> >>",
+                 extra_objects: List[bytes] = ()) -> bytes:
+    return build_pdf([
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R /Resources %s >>" % resources,
+        content,
+        FONT,
+        *extra_objects,
+    ])
+
+
+def text_flood(ops: int = 8_000_000) -> bytes:
+    return one_page_pdf(stream(deflate_repeated(TEXT_OP, ops * len(TEXT_OP)), b"/Filter /FlateDecode"))
+
+
+def content_bomb(mb: int = 1500) -> bytes:
+    return one_page_pdf(stream(deflate_repeated(b" ", mb << 20), b"/Filter /FlateDecode"))
+
+
+def font_bomb(mb: int = 1000) -> bytes:
+    return one_page_pdf(
+        stream(b"BT /F2 12 Tf 10 10 Td (hello) Tj ET"),
+        resources=b"<< /Font << /F1 5 0 R /F2 6 0 R >> >>",
+        extra_objects=[
+            b"<< /Type /Font /Subtype /TrueType /BaseFont /Bomb /FirstChar 32 /LastChar 126 /FontDescriptor 7 0 R >>",
+            b"<< /Type /FontDescriptor /FontName /Bomb /Flags 32 /FontBBox [0 0 1000 1000] /ItalicAngle 0 "
+            b"/Ascent 800 /Descent -200 /CapHeight 700 /StemV 80 /FontFile2 8 0 R >>",
+            stream(deflate_repeated(b"\0", mb << 20), b"/Filter /FlateDecode"),
+        ],
+    )
+
+
+def page_flood(pages: int = 5000) -> bytes:
+    first_page = 5
+    kids = b" ".join(b"%d 0 R" % (first_page + i) for i in range(pages))
+    page = b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 3 0 R /Resources << /Font << /F1 4 0 R >> >> >>"
+    return build_pdf([
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, pages),
+        stream(TEXT_OP * 20),
+        FONT,
+    ] + [page] * pages)
+
+
+def deep_nesting(depth: int = 100_000) -> bytes:
+    return build_pdf([
+        b"<< /Type /Catalog /Pages 2 0 R /Junk " + b"[" * depth + b"]" * depth + b" >>",
+        b"<< /Type /Pages /Kids [] /Count 0 >>",
+    ])
+
+
+def cyclic_page_tree() -> bytes:
+    return build_pdf([b"<< /Type /Catalog /Pages 2 0 R >>", b"<< /Type /Pages /Kids [2 0 R] /Count 1 >>"])
+
+
+def garbage(size: int = 256_000) -> bytes:
+    rng = random.Random(7)
+    return b"%PDF-1.4\n" + bytes(rng.randrange(256) for _ in range(size))
+
+
+def truncated() -> bytes:
+    return one_page_pdf(stream(TEXT_OP * 50))[:400]
+
+
+PATHOLOGICAL: Dict[str, Callable[[], bytes]] = {
+    "text_flood": text_flood,
+    "content_bomb": content_bomb,
+    "font_bomb": font_bomb,
+    "page_flood": page_flood,
+    "deep_nesting": deep_nesting,
+    "cyclic_page_tree": cyclic_page_tree,
+    "garbage": garbage,
+    "truncated": truncated,
+}
+
+
+def fuzz_corpus(good: int, bad_copies: int, seed: int) -> List[Tuple[str, str, bytes]]:
+    """(kind, filename, content) of good resumes and bad_copies of each pathological kind, shuffled."""
+    files = [("good", item["filename"], item["content"]) for item in generate_corpus(good, seed)]
+    for kind, make in PATHOLOGICAL.items():
+        content = make()
+        files += [(kind, f"{kind}_{i}.pdf", content) for i in range(bad_copies)]
+    random.Random(seed).shuffle(files)
+    return files
+
+
+def _outcome(pool: ParsePool, filename: str, content: bytes) -> Tuple[str, float]:
+    with Timer() as t:
+        try:
+            pool.extract(content, filename)
+            outcome = "parsed"
+        except ParseTimeout:
+            outcome = "timeout"
+        except ParseLimitExceeded:
+            outcome = "limit"
+        except ValueError:
+            outcome = "error"
+    return outcome, t.elapsed
+
+
+def bench_pool(files: List[Tuple[str, str, bytes]], config: Dict) -> Dict:
+    pool = ParsePool(config)
+    pool.warm()
+    try:
+        with ThreadPoolExecutor(max_workers=int(config["workers"])) as callers:
+            with Timer() as total:
+                outcomes = list(callers.map(lambda f: _outcome(pool, f[1], f[2]), files))
+        stats = pool.stats()
+    finally:
+        pool.shutdown()
+
+    by_kind = collections.defaultdict(list)
+    for (kind, _, _), result in zip(files, outcomes):
+        by_kind[kind].append(result)
+    kinds = {
+        kind: {"files": len(results),
+               "outcomes": dict(collections.Counter(outcome for outcome, _ in results)),
+               "latency_ms": percentiles([elapsed for _, elapsed in results])}
+        for kind, results in sorted(by_kind.items())
+    }
+    return {
+        "total_s": round(total.elapsed, 2),
+        "all_latency_ms": percentiles([elapsed for _, elapsed in outcomes]),
+        "kinds": kinds,
+        "pool": {k: v for k, v in stats.items() if isinstance(v, int)},
+    }
+
+
+def _extract_unlimited(content: bytes, filename: str, results):
+    started = time.perf_counter()
+    try:
+        extract_text_and_links(content, filename)
+        outcome = "parsed"
+    except Exception:
+        outcome = "error"
+    results.put((outcome, time.perf_counter() - started, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss >> 10))
+
+
+def bench_in_process(cap_seconds: float) -> Dict:
+    """One unlimited extraction per pathological kind, as the API ran it before isolation."""
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for kind, make in PATHOLOGICAL.items():
+        queue = context.Queue()
+        process = context.Process(target=_extract_unlimited, args=(make(), f"{kind}.pdf", queue), daemon=True)
+        process.start()
+        try:
+            outcome, elapsed, max_rss_mb = queue.get(timeout=cap_seconds)
+            results[kind] = {"outcome": outcome, "ms": round(elapsed * 1000, 2), "max_rss_mb": max_rss_mb}
+        except Exception:
+            results[kind] = {"outcome": f"still running after {cap_seconds:g}s"}
+        finally:
+            process.kill()
+            process.join()
+    return results
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Latency of good and pathological files through the parse pool")
+    parser.add_argument("--good", type=int, default=100, help="synthetic resumes (PDF and DOCX)")
+    parser.add_argument("--bad-copies", type=int, default=2, help="copies of each pathological PDF")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=5, help="per-file timeout (seconds)")
+    parser.add_argument("--memory-limit-mb", type=int, default=512)
+    parser.add_argument("--max-pages", type=int, default=50)
+    parser.add_argument("--max-tasks-per-child", type=int, default=50)
+    parser.add_argument("--slack", type=float, default=2, help="allowed seconds over the timeout per file")
+    parser.add_argument("--in-process", action="store_true", help="also time each pathological kind without limits")
+    parser.add_argument("--in-process-cap", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="write JSON results to this path")
+    args = parser.parse_args(argv)
+
+    config = {"workers": args.workers, "timeout_seconds": args.timeout, "memory_limit_mb": args.memory_limit_mb,
+              "max_pages": args.max_pages, "max_tasks_per_child": args.max_tasks_per_child}
+    results = {
+        "meta": dict(run_metadata(), seed=args.seed, good=args.good, bad_copies=args.bad_copies, **config),
+        "pool": bench_pool(fuzz_corpus(args.good, args.bad_copies, args.seed), config),
+    }
+    if args.in_process:
+        results["in_process"] = bench_in_process(args.in_process_cap)
+    write_results(results, args.out)
+
+    worst = results["pool"]["all_latency_ms"]["max"] / 1000
+    good = results["pool"]["kinds"].get("good", {}).get("outcomes", {})
+    if worst > args.timeout + args.slack:
+        print(f"FAIL: a file took {worst:.1f}s, over the {args.timeout:g}s timeout", file=sys.stderr)
+        sys.exit(1)
+    if set(good) - {"parsed"}:
+        print(f"FAIL: good files did not all parse: {good}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Phone extraction: equivalence with the PHONE_RE scan and worst-case timing.
+
+The golden corpus is the synthetic resume corpus plus fuzzed snippets that mix
+every PHONE_RE format with separators, brackets, letters and digit noise. For
+each text, `find_phone_numbers` must return exactly `PHONE_RE.findall`. The
+pathological inputs (number tables, long digit strings, separator soup and
+plain prose) are timed at growing sizes; time per character should stay flat.
+The old extract_contact_number is only timed up to 200k characters because its
+duplicate check is quadratic in the number of matches.
+
+    python -m benchmarks.phone --golden 5000 --out bench_results/phone.json
+
+Exits non-zero if any golden text disagrees.
+"""
+import argparse
+import random
+import re
+import sys
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.common import Timer, run_metadata, write_results
+from benchmarks.corpus import _phone, generate_corpus
+from backend.services.resume_service import PHONE_RE, extract_contact_number, find_phone_numbers, phone_score
+
+
+def legacy_extract_contact_number(text: str) -> Optional[str]:
+    """extract_contact_number as it was before the scanner, for comparison."""
+    all_matches = []
+    for match in re.findall(PHONE_RE, text):
+        cleaned = re.sub(r"[^\d\+]", "", match)
+        if 8 <= len(cleaned.replace("+", "")) <= 15 and match not in all_matches:
+            all_matches.append(match)
+    if not all_matches:
+        return None
+    all_matches.sort(key=phone_score, reverse=True)
+    return all_matches[0]
+
+
+FUZZ_PIECES = ["+", "(", ")", "-", ".", " ", "  ", "\n", "\t", "a", "Tel:", "x", "_", "91", "0", "+91", "/"]
+
+
+def fuzz_snippet(rng: random.Random) -> str:
+    parts = []
+    for _ in range(rng.randint(1, 12)):
+        roll = rng.random()
+        if roll < 0.3:
+            parts.append(_phone(rng))
+        elif roll < 0.7:
+            parts.append("".join(str(rng.randint(0, 9)) for _ in range(rng.randint(1, 12))))
+        else:
+            parts.append(rng.choice(FUZZ_PIECES))
+    return "".join(parts)
+
+
+def golden_texts(size: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    texts = [item["text"] for item in generate_corpus(min(size, 500), seed, render=False)]
+    texts += [fuzz_snippet(rng) for _ in range(size)]
+    return texts
+
+
+def check_golden(texts: List[str]) -> Dict:
+    mismatches = []
+    for text in texts:
+        if find_phone_numbers(text) != PHONE_RE.findall(text) \
+                or extract_contact_number(text) != legacy_extract_contact_number(text):
+            mismatches.append(text)
+    return {"texts": len(texts), "mismatches": len(mismatches), "examples": [repr(t) for t in mismatches[:5]]}
+
+
+PATHOLOGICAL: Dict[str, Callable[[random.Random, int], str]] = {
+    "number_table": lambda rng, n: " ".join(str(rng.randint(0, 99999)) for _ in range(n // 4)),
+    "digit_string": lambda rng, n: "".join(str(rng.randint(0, 9)) for _ in range(n)),
+    "separator_soup": lambda rng, n: "".join(rng.choice("1 -.()+") for _ in range(n)),
+    "prose": lambda rng, n: ("Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * (n // 56 + 1))[:n],
+}
+
+
+# The legacy extractor dedupes with a list scan, quadratic in the number of matches
+LEGACY_EXTRACT_MAX_CHARS = 200_000
+
+
+def bench_pathological(sizes: List[int], seed: int) -> Dict:
+    results = {}
+    for name, make in PATHOLOGICAL.items():
+        rows = {}
+        for size in sizes:
+            text = make(random.Random(seed), size)
+            row = {}
+            timed = [("regex_findall", PHONE_RE.findall), ("scanner", find_phone_numbers),
+                     ("extract_contact_number", extract_contact_number)]
+            if size <= LEGACY_EXTRACT_MAX_CHARS:
+                timed.append(("legacy_extract_contact_number", legacy_extract_contact_number))
+            for label, fn in timed:
+                with Timer() as t:
+                    fn(text)
+                row[f"{label}_ms"] = round(t.elapsed * 1000, 2)
+                row[f"{label}_ns_per_char"] = round(t.elapsed / len(text) * 1e9, 1)
+            rows[str(size)] = row
+        results[name] = rows
+    return results
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Phone scanner equivalence and worst-case timing")
+    parser.add_argument("--golden", type=int, default=2000, help="fuzzed snippets in the golden corpus")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="pathological input sizes (chars)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="write JSON results to this path")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    results = {
+        "meta": dict(run_metadata(), seed=args.seed),
+        "golden": check_golden(golden_texts(args.golden, args.seed)),
+        "pathological": bench_pathological(sizes, args.seed),
+    }
+    write_results(results, args.out)
+    if results["golden"]["mismatches"]:
+        print(f"FAIL: {results['golden']['mismatches']} golden texts differ from PHONE_RE", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""Check read-replica routing against a real primary and streaming replica.
+
+Points backend.database at --primary and one --replica (libpq DSNs) through a
+temporary SECRETS_FILE, then asserts, in order:
+
+    replica_reads      get_db_connection(readonly=True) lands on the replica;
+                       plain connections land on the primary
+    read_your_writes   after note_write(scope), reads of that scope go to the
+                       primary for read_your_writes_seconds, other scopes and
+                       later reads to the replica
+    paused_replay      with WAL replay paused on the replica and the primary
+                       still committing, reads fall back to the primary once the
+                       lag passes --max-lag; after resuming they return
+    stopped_replica    after --replica-stop-cmd, reads fall back to the primary
+                       without raising; after --replica-start-cmd they return
+
+Where a connection landed is told by pg_is_in_recovery(). Pausing replay needs
+a superuser (or EXECUTE on pg_wal_replay_pause) on the replica; the primary gets
+a scratch table, replica_routing_ticks, dropped at the end. Example with a
+replica started by pg_ctl:
+
+    python -m benchmarks.replicas --primary "host=db-primary dbname=resume_analyzer user=postgres" \\
+        --replica "host=db-replica dbname=resume_analyzer user=postgres" \\
+        --replica-stop-cmd "pg_ctl -D /srv/replica stop -m fast" \\
+        --replica-start-cmd "pg_ctl -D /srv/replica -l /srv/replica.log start"
+
+Exits non-zero when any check fails.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+import psycopg2
+import psycopg2.extensions
+import toml
+
+from benchmarks.common import Timer, run_metadata, write_results
+
+SCOPE = ("replica_routing_check",)
+
+
+def server_settings(dsn: str) -> Dict:
+    """[database] keys for a libpq DSN."""
+    parts = psycopg2.extensions.parse_dsn(dsn)
+    settings = {key: parts[dsn_key] for key, dsn_key in
+                (("host", "host"), ("port", "port"), ("name", "dbname"), ("user", "user"), ("password", "password"))
+                if dsn_key in parts}
+    if "port" in settings:
+        settings["port"] = int(settings["port"])
+    return settings
+
+
+def configure(primary: str, replica: str, max_lag: float, check_seconds: float, retry_seconds: float,
+              read_your_writes_seconds: float) -> str:
+    """Write the settings to a temporary secrets file and point backend.config at it; returns its path."""
+    database = dict(server_settings(primary), replicas=[server_settings(replica)],
+                    max_replica_lag_seconds=max_lag, replica_check_seconds=check_seconds,
+                    replica_retry_seconds=retry_seconds, read_your_writes_seconds=read_your_writes_seconds)
+    fd, path = tempfile.mkstemp(prefix="hr-replicas-", suffix=".toml")
+    with os.fdopen(fd, "w") as f:
+        toml.dump({"database": database}, f)
+    os.environ["SECRETS_FILE"] = path
+    from backend.config import get_settings
+    get_settings.cache_clear()
+    return path
+
+
+def landed_on(readonly: bool = True, scope=SCOPE) -> str:
+    """'replica' or 'primary': where get_db_connection sends this request."""
+    from backend.database import get_db_connection
+    conn = get_db_connection(readonly=readonly, scope=scope)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_is_in_recovery()")
+            return "replica" if cur.fetchone()[0] else "primary"
+    finally:
+        conn.close()
+
+
+def execute(dsn: str, sql: str, params=()):
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql, params)
+            return cur.fetchone() if cur.description else None
+    finally:
+        conn.close()
+
+
+def wait_until(condition: Callable[[], bool], timeout: float, interval: float = 0.2) -> bool:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if condition():
+                return True
+        except psycopg2.Error:
+            pass
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+
+
+def caught_up(primary: str, replica: str) -> bool:
+    """The replica has replayed everything the primary has written so far."""
+    target = execute(primary, "SELECT pg_current_wal_lsn()")[0]
+    return execute(replica, "SELECT pg_last_wal_replay_lsn() >= %s::pg_lsn", (target,))[0]
+
+
+def expect(checks: Dict, name: str, steps: List[tuple]):
+    """Record a check: steps are (description, expected, actual)."""
+    failed = [f"{what}: expected {expected}, got {actual}" for what, expected, actual in steps if expected != actual]
+    checks[name] = {"ok": not failed, "steps": [f"{what}: {actual}" for what, _, actual in steps], "failed": failed}
+
+
+def check_replica_reads(checks: Dict):
+    expect(checks, "replica_reads", [
+        ("readonly read", "replica", landed_on()),
+        ("read-write connection", "primary", landed_on(readonly=False)),
+    ])
+
+
+def check_read_your_writes(checks: Dict, window: float):
+    from backend.database import note_write
+    note_write(SCOPE)
+    steps = [
+        ("read of the written scope", "primary", landed_on()),
+        ("read of another scope", "replica", landed_on(scope=("replica_routing_other",))),
+    ]
+    time.sleep(window + 0.2)
+    steps.append((f"read of the written scope after {window}s", "replica", landed_on()))
+    expect(checks, "read_your_writes", steps)
+
+
+def check_paused_replay(checks: Dict, primary: str, replica: str, max_lag: float, check_seconds: float,
+                        retry_seconds: float, timeout: float):
+    execute(primary, "CREATE TABLE IF NOT EXISTS replica_routing_ticks (id SERIAL PRIMARY KEY, at TIMESTAMPTZ)")
+    wait_until(lambda: caught_up(primary, replica), timeout)
+    execute(replica, "SELECT pg_wal_replay_pause()")
+    try:
+        # Commits the replica receives but does not replay, for longer than max_lag
+        deadline = time.monotonic() + max_lag + check_seconds + 1
+        while time.monotonic() < deadline:
+            execute(primary, "INSERT INTO replica_routing_ticks (at) VALUES (now())")
+            time.sleep(0.2)
+        steps = [("read with replay paused", "primary", landed_on())]
+    finally:
+        execute(replica, "SELECT pg_wal_replay_resume()")
+    steps.append(("replica caught up after resuming", True, wait_until(lambda: caught_up(primary, replica), timeout)))
+    time.sleep(max(check_seconds, retry_seconds) + 0.2)
+    steps.append(("read after resuming", "replica", landed_on()))
+    expect(checks, "paused_replay", steps)
+
+
+def check_stopped_replica(checks: Dict, replica: str, stop_cmd: str, start_cmd: str, retry_seconds: float,
+                          timeout: float):
+    subprocess.run(stop_cmd, shell=True, check=True)
+    try:
+        try:
+            during = landed_on()
+        except Exception as e:
+            during = f"error: {e}"
+        steps = [("read with the replica stopped", "primary", during)]
+    finally:
+        subprocess.run(start_cmd, shell=True, check=True)
+    steps.append(("replica accepting connections again", True,
+                  wait_until(lambda: execute(replica, "SELECT pg_is_in_recovery()")[0], timeout)))
+    time.sleep(retry_seconds + 0.2)
+    steps.append(("read after restarting", "replica", landed_on()))
+    expect(checks, "stopped_replica", steps)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Check read-replica routing against a real primary and replica")
+    parser.add_argument("--primary", required=True, help="libpq DSN of the primary")
+    parser.add_argument("--replica", required=True, help="libpq DSN of a streaming replica of it")
+    parser.add_argument("--replica-stop-cmd", required=True, help="shell command that stops the replica")
+    parser.add_argument("--replica-start-cmd", required=True, help="shell command that starts it again")
+    parser.add_argument("--max-lag", type=float, default=1.0, help="max_replica_lag_seconds for the run")
+    parser.add_argument("--check-seconds", type=float, default=0.2, help="replica_check_seconds for the run")
+    parser.add_argument("--retry-seconds", type=float, default=1.0, help="replica_retry_seconds for the run")
+    parser.add_argument("--read-your-writes-seconds", type=float, default=2.0)
+    parser.add_argument("--timeout", type=float, default=60, help="seconds to wait for the replica to catch up")
+    parser.add_argument("--out", help="write JSON results to this path")
+    args = parser.parse_args(argv)
+
+    if execute(args.primary, "SELECT pg_is_in_recovery()")[0]:
+        parser.error("--primary is in recovery; pass the primary, not a standby")
+    if not execute(args.replica, "SELECT pg_is_in_recovery()")[0]:
+        parser.error("--replica is not in recovery; pass a streaming replica")
+    secrets = configure(args.primary, args.replica, args.max_lag, args.check_seconds, args.retry_seconds,
+                        args.read_your_writes_seconds)
+    checks = {}
+    try:
+        with Timer() as run:
+            if not wait_until(lambda: caught_up(args.primary, args.replica), args.timeout):
+                print(f"Replica did not catch up within {args.timeout}s", file=sys.stderr)
+                sys.exit(1)
+            check_replica_reads(checks)
+            check_read_your_writes(checks, args.read_your_writes_seconds)
+            check_paused_replay(checks, args.primary, args.replica, args.max_lag, args.check_seconds,
+                                args.retry_seconds, args.timeout)
+            check_stopped_replica(checks, args.replica, args.replica_stop_cmd, args.replica_start_cmd,
+                                  args.retry_seconds, args.timeout)
+    finally:
+        execute(args.primary, "DROP TABLE IF EXISTS replica_routing_ticks")
+        os.unlink(secrets)
+
+    from backend.database import replica_status
+    results = {
+        "checks": checks,
+        "routing": replica_status()["routing"],
+        "elapsed_s": round(run.elapsed, 1),
+        "meta": dict(run_metadata(), max_lag=args.max_lag, check_seconds=args.check_seconds,
+                     retry_seconds=args.retry_seconds, read_your_writes_seconds=args.read_your_writes_seconds),
+    }
+    write_results(results, args.out)
+
+    failed = [f"{name}: {reason}" for name, check in checks.items() for reason in check["failed"]]
+    if failed:
+        print("FAILED:\n  " + "\n  ".join(failed), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
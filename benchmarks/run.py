@@ -0,0 +1,304 @@
+"""Benchmark parse throughput, batch ingest rate and match latency.
+
+Usage:
+    python -m benchmarks.run --sizes 100,1000,5000 --out bench_results/HEAD.json
+    python -m benchmarks.run --db postgres   # uses the configured database; TRUNCATES resume tables
+
+Results are written as JSON keyed by section so runs from different commits can
+be diffed directly.
+"""
+import argparse
+import random
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.common import Timer, percentiles, run_metadata, write_results
+from benchmarks.corpus import generate_corpus
+from backend.services import resume_service, matching_service
+from backend.services.resume_service import (
+    parse_resume, save_resumes_batch, extract_text_and_links_from_docx_stream, extract_name,
+    extract_email, extract_contact_number, extract_skills, extract_education, SKILLS_DB,
+)
+from backend.services.matching_service import MatchingService
+from backend.agents.prompt_budget import build_resume_context, count_tokens, segment_resume
+
+# Modules that bind get_db_connection at import time and must see the benchmark database
+DB_BOUND_MODULES = [resume_service, matching_service]
+
+FIELD_EXTRACTORS = {
+    "extract_name": extract_name,
+    "extract_email": extract_email,
+    "extract_contact_number": extract_contact_number,
+    "extract_skills": extract_skills,
+    "extract_education": extract_education,
+}
+
+
+def use_database(connect: Callable):
+    for module in DB_BOUND_MODULES:
+        module.get_db_connection = connect
+
+
+def setup_database(kind: str):
+    """Return a reset() callable after pointing the services at the chosen database."""
+    if kind == "sqlite":
+        from benchmarks.sqlite_db import SQLiteDatabase
+        db = SQLiteDatabase()
+        use_database(db.connect)
+        # Pipeline bookkeeping and tenant partitions are Postgres-specific; the stand-in times the resume writes only
+        resume_service.advance_candidates = lambda cur, people, stage, user_id=None: {}
+        resume_service.with_tenant_partitions = lambda user_id, write: write()
+        return db.reset
+
+    from backend.database import get_db_connection
+    from backend.init_db import init_db
+    init_db()
+
+    def reset():
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("TRUNCATE TABLE resume_data, resume_files CASCADE;")
+                cur.execute("""
+                    INSERT INTO users (id, username, password_hash, email)
+                    VALUES (1, 'bench', '-', 'bench@local') ON CONFLICT DO NOTHING
+                """)
+            conn.commit()
+        finally:
+            conn.close()
+
+    return reset
+
+
+def bench_parse(sample: List[Dict]) -> Dict:
+    results = {}
+    by_ext: Dict[str, List[Dict]] = {}
+    for item in sample:
+        ext = item["filename"].rsplit(".", 1)[-1]
+        by_ext.setdefault(ext, []).append(item)
+
+    for ext, items in sorted(by_ext.items()):
+        total_bytes = sum(len(i["content"]) for i in items)
+        with Timer() as t:
+            for item in items:
+                parse_resume(item["content"], item["filename"])
+        results[f"parse_resume[{ext}]"] = {
+            "docs": len(items),
+            "docs_per_sec": round(len(items) / t.elapsed, 2),
+            "mb_per_sec": round(total_bytes / t.elapsed / 1e6, 3),
+        }
+
+    results.update(bench_docx_extractors(by_ext.get("docx", [])))
+
+    texts = [i["text"] for i in sample]
+    total_chars = sum(len(t) for t in texts)
+    for name, fn in FIELD_EXTRACTORS.items():
+        with Timer() as t:
+            for text in texts:
+                fn(text)
+        results[name] = {
+            "docs": len(texts),
+            "docs_per_sec": round(len(texts) / t.elapsed, 2),
+            "mchars_per_sec": round(total_chars / t.elapsed / 1e6, 3),
+        }
+    return results
+
+
+def _python_docx_text(content: bytes) -> str:
+    import io
+    from docx import Document
+    return "\n".join(p.text for p in Document(io.BytesIO(content)).paragraphs)
+
+
+def bench_docx_extractors(items: List[Dict]) -> Dict:
+    """Streaming DOCX extraction versus the python-docx object model on the same files."""
+    if not items:
+        return {}
+    total_bytes = sum(len(i["content"]) for i in items)
+    results = {}
+    for name, fn in (("docx_text[python-docx]", _python_docx_text),
+                     ("docx_text[stream]", extract_text_and_links_from_docx_stream)):
+        with Timer() as t:
+            for item in items:
+                fn(item["content"])
+        results[name] = {
+            "docs": len(items),
+            "docs_per_sec": round(len(items) / t.elapsed, 2),
+            "mb_per_sec": round(total_bytes / t.elapsed / 1e6, 3),
+        }
+    return results
+
+
+def bench_accuracy(sample: List[Dict]) -> Dict:
+    """Share of synthetic resumes where the extractor recovers the generated value."""
+    hits = {"name": 0, "email": 0, "mobile": 0}
+    for item in sample:
+        truth = item["truth"]
+        hits["name"] += extract_name(item["text"]) == truth["name"]
+        hits["email"] += extract_email(item["text"]) == truth["email"]
+        hits["mobile"] += extract_contact_number(item["text"]) == truth["mobile"]
+    return {k: round(v / max(1, len(sample)), 4) for k, v in hits.items()}
+
+
+def bench_prompt(sample: List[Dict], budget: int) -> Dict:
+    """Resume tokens sent and sections covered: fixed 4000-char cut versus the section packer."""
+    if not sample:
+        return {}
+    legacy_tokens, packed_tokens, legacy_cover, packed_cover = [], [], [], []
+    for item in sample:
+        titles = [title for title, _ in segment_resume(item["text"])]
+        legacy = item["text"][:4000]
+        legacy_tokens.append(count_tokens(legacy))
+        legacy_cover.append(sum(1 for title, _ in segment_resume(legacy) if title in titles) / len(titles))
+        _, stats = build_resume_context(item["text"], budget)
+        packed_tokens.append(stats["resume_tokens"])
+        packed_cover.append(sum(1 for s in stats["sections"] if s["lines_kept"]) / len(titles))
+    n = len(sample)
+    return {
+        "budget": budget,
+        "legacy_avg_tokens": round(sum(legacy_tokens) / n, 1),
+        "packed_avg_tokens": round(sum(packed_tokens) / n, 1),
+        "legacy_section_coverage": round(sum(legacy_cover) / n, 4),
+        "packed_section_coverage": round(sum(packed_cover) / n, 4),
+    }
+
+
+def bench_fallback(sample: List[Dict]) -> Dict:
+    """Share of resumes the confidence gate sends to the (fake) LLM, and LLM calls per resume."""
+    from backend.agents.fake_llm import FakeLLM
+    from backend.agents.resume_analyzer import ResumeAnalyzerAgent
+    from backend.services.extraction_fallback import FallbackStats, apply_llm_fallback
+    from backend.services import extraction_fallback
+
+    agent = ResumeAnalyzerAgent()
+    agent._llm, agent._llm_ready = FakeLLM(), True
+    extraction_fallback.stats = FallbackStats()
+    parsed = [parse_resume(i["content"], i["filename"]) for i in sample]
+    apply_llm_fallback(parsed, agent)
+    result = extraction_fallback.stats.snapshot()
+    result["llm_calls_per_resume"] = round(result["llm_calls"] / max(1, len(sample)), 4)
+    return result
+
+
+def to_record(item: Dict) -> Dict:
+    truth = item["truth"]
+    return {
+        "filename": item["filename"],
+        "name": truth["name"],
+        "email": truth["email"],
+        "mobile": truth["mobile"],
+        "raw_text": item["text"],
+        "skills": ", ".join(truth["skills"]),
+        "education": truth["education"],
+    }
+
+
+def make_jds(count: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    skills = sorted(SKILLS_DB)
+    return [
+        f"We are hiring an engineer with {rng.randint(2, 8)} years of experience. "
+        f"Required skills: {', '.join(rng.sample(skills, 8))}."
+        for _ in range(count)
+    ]
+
+
+def bench_batch_match(matcher: MatchingService, jds: List[str], top_k: int) -> Dict:
+    """One match_batch call against N sequential match_resumes calls over the same JDs."""
+    matcher.invalidate(1)
+    with Timer() as cold_batch:
+        batch = matcher.match_batch(jds, top_k)
+    with Timer() as warm_batch:
+        matcher.match_batch(jds, top_k)
+    with Timer() as warm_sequential:
+        sequential = [matcher.match_resumes(jd, top_k, include_text=False) for jd in jds]
+    # Every call rebuilding the tenant's index is what each request paid before shards were cached
+    with Timer() as uncached_sequential:
+        for jd in jds:
+            matcher.invalidate(1)
+            matcher.match_resumes(jd, top_k, include_text=False)
+
+    def ranking(results):
+        return [[(r['id'], round(r['MatchScore'], 12)) for r in matches] for matches in results]
+
+    return {
+        "jds": len(jds),
+        "batch_ms": round(warm_batch.elapsed * 1000, 2),
+        "batch_cold_ms": round(cold_batch.elapsed * 1000, 2),
+        "sequential_ms": round(warm_sequential.elapsed * 1000, 2),
+        "sequential_uncached_ms": round(uncached_sequential.elapsed * 1000, 2),
+        "identical_results": ranking(batch) == ranking(sequential),
+    }
+
+
+def bench_ingest_and_match(records: List[Dict], sizes: List[int], batch_size: int,
+                           jds: List[str], repeats: int, top_k: int, batch_jds: List[str]) -> Dict:
+    matcher = MatchingService()
+    ingest, match, cold, batch = {}, {}, {}, {}
+    loaded = 0
+    for size in sizes:
+        pending = records[loaded:size]
+        with Timer() as t:
+            for start in range(0, len(pending), batch_size):
+                save_resumes_batch(pending[start:start + batch_size], user_id=1)
+        if pending:
+            ingest[str(size)] = {
+                "rows": len(pending),
+                "rows_per_sec": round(len(pending) / t.elapsed, 2),
+            }
+        loaded = size
+
+        # The first match after an ingest rebuilds the tenant's in-memory shard
+        matcher.invalidate(1)
+        with Timer() as t:
+            matcher.match_resumes(jds[0], top_k)
+        cold[str(size)] = round(t.elapsed * 1000, 2)
+        samples = []
+        for _ in range(repeats):
+            for jd in jds:
+                with Timer() as t:
+                    matcher.match_resumes(jd, top_k)
+                samples.append(t.elapsed)
+        match[str(size)] = percentiles(samples)
+        batch[str(size)] = bench_batch_match(matcher, batch_jds, top_k)
+    return {"ingest": ingest, "match_latency_ms": match, "match_cold_ms": cold, "match_batch": batch}
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Resume pipeline benchmarks")
+    parser.add_argument("--sizes", default="100,500,1000", help="corpus sizes for ingest/match")
+    parser.add_argument("--parse-sample", type=int, default=100, help="rendered files to parse")
+    parser.add_argument("--length", type=int, default=1, help="resume length multiplier")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", choices=["sqlite", "postgres"], default="sqlite")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--jds", type=int, default=5)
+    parser.add_argument("--batch-jds", type=int, default=25, help="JDs per match_batch call")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--token-budget", type=int, default=1000, help="resume tokens per LLM analysis")
+    parser.add_argument("--out", help="write JSON results to this path")
+    args = parser.parse_args(argv)
+
+    sizes = sorted({int(s) for s in args.sizes.split(",") if s.strip()})
+    sample = list(generate_corpus(args.parse_sample, args.seed, length=args.length))
+    records = [to_record(i) for i in generate_corpus(sizes[-1], args.seed, length=args.length, render=False)]
+
+    reset = setup_database(args.db)
+    reset()
+
+    results = {
+        "meta": dict(run_metadata(), db=args.db, seed=args.seed, length=args.length),
+        "parse": bench_parse(sample),
+        "accuracy": bench_accuracy(sample),
+        "prompt": bench_prompt(sample, args.token_budget),
+        "llm_fallback": bench_fallback(sample),
+    }
+    results.update(bench_ingest_and_match(
+        records, sizes, args.batch_size, make_jds(args.jds, args.seed), args.repeats, args.top_k,
+        make_jds(args.batch_jds, args.seed + 1),
+    ))
+    write_results(results, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""SQLite stand-in for the Postgres connection used by the services.
+
+Only the subset of behaviour the resume ingestion and matching paths rely on is
+covered: `%s` placeholders, `with conn.cursor() as cur`, RealDictCursor-style
+rows and commit/rollback/close. Tables are not partitioned; a user_id index
+stands in for per-tenant partition pruning. It lets the benchmarks run without a database
+server; numbers from it are only comparable with other SQLite runs.
+"""
+import sqlite3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    username TEXT UNIQUE NOT NULL,
+    password_hash TEXT NOT NULL,
+    email TEXT UNIQUE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS resume_files (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER REFERENCES users(id),
+    filename TEXT NOT NULL,
+    file_size INTEGER,
+    file_type TEXT,
+    processed BOOLEAN DEFAULT 0,
+    upload_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    session_id TEXT,
+    UNIQUE(user_id, filename)
+);
+CREATE TABLE IF NOT EXISTS resume_data (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    resume_file_id INTEGER REFERENCES resume_files(id) ON DELETE CASCADE,
+    user_id INTEGER REFERENCES users(id),
+    candidate_name TEXT,
+    candidate_email TEXT,
+    candidate_phone TEXT,
+    skills TEXT,
+    education TEXT,
+    extracted_text TEXT,
+    interview_status TEXT,
+    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    minhash BLOB,
+    duplicate_of INTEGER REFERENCES resume_data(id) ON DELETE SET NULL,
+    UNIQUE(user_id, resume_file_id)
+);
+CREATE INDEX IF NOT EXISTS idx_resume_data_user ON resume_data (user_id);
+CREATE TABLE IF NOT EXISTS resume_lsh_bands (
+    user_id INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    resume_id INTEGER NOT NULL REFERENCES resume_data(id) ON DELETE CASCADE,
+    PRIMARY KEY (user_id, bucket, resume_id)
+);
+CREATE INDEX IF NOT EXISTS idx_resume_lsh_bands_resume ON resume_lsh_bands (user_id, resume_id);
+"""
+
+
+class _Cursor:
+    def __init__(self, cur, as_dict: bool):
+        self._cur = cur
+        self._as_dict = as_dict
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cur.close()
+        return False
+
+    def execute(self, sql, params=()):
+        self._cur.execute(sql.replace("%s", "?"), tuple(params))
+
+    def executemany(self, sql, seq):
+        self._cur.executemany(sql.replace("%s", "?"), [tuple(p) for p in seq])
+
+    def _convert(self, row):
+        if row is None or not self._as_dict:
+            return row
+        return {d[0]: v for d, v in zip(self._cur.description, row)}
+
+    def fetchone(self):
+        return self._convert(self._cur.fetchone())
+
+    def fetchall(self):
+        return [self._convert(r) for r in self._cur.fetchall()]
+
+    @property
+    def rowcount(self):
+        return self._cur.rowcount
+
+
+class SQLiteConnection:
+    def __init__(self, raw: sqlite3.Connection):
+        self._raw = raw
+
+    def cursor(self, cursor_factory=None, **kwargs):
+        return _Cursor(self._raw.cursor(), cursor_factory is not None)
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def close(self):
+        # The shared connection outlives each service call, like a pooled one
+        pass
+
+
+class SQLiteDatabase:
+    """Shared in-process database handing out connection wrappers."""
+
+    def __init__(self, path: str = ":memory:"):
+        self._raw = sqlite3.connect(path, check_same_thread=False)
+        self._raw.executescript(SCHEMA)
+        self._raw.execute(
+            "INSERT OR IGNORE INTO users (id, username, password_hash, email) VALUES (1, 'bench', '-', 'bench@local')"
+        )
+        self._raw.commit()
+
+    def connect(self, readonly: bool = False, scope=None) -> SQLiteConnection:
+        # One database: replica routing arguments are accepted and ignored
+        return SQLiteConnection(self._raw)
+
+    def reset(self):
+        self._raw.execute("DELETE FROM resume_lsh_bands")
+        self._raw.execute("DELETE FROM resume_data")
+        self._raw.execute("DELETE FROM resume_files")
+        self._raw.commit()
@@ -0,0 +1,150 @@
+"""Standing JD evaluation cost at ingest as the number of saved JDs grows.
+
+A fixed set of relevant JDs (the run.py JD generator) is saved next to a growing
+number of JDs that share no word with any resume. Each step times
+StandingJDService.evaluate_resumes on one ingest batch, against scoring every
+saved JD in Python, which is what evaluation costs without the reverse index.
+With the index, time should follow the relevant JDs and stay flat as unrelated
+ones are added. Needs Postgres (the configured database; TRUNCATES the resume
+and standing JD tables):
+
+    python -m benchmarks.standing --unrelated 0,1000,10000 --out bench_results/standing.json
+"""
+import argparse
+import random
+from typing import Dict, List, Optional
+
+from benchmarks.common import Timer, percentiles, run_metadata, write_results
+from benchmarks.corpus import generate_corpus
+from benchmarks.run import make_jds, setup_database, to_record
+from backend.database import get_db_connection
+from backend.services.matching_service import tokenize
+from backend.services.resume_service import save_resumes_batch
+from backend.services.standing_jd_service import StandingJDService
+
+
+def add_unrelated_jds(count: int, seed: int, user_id: int = 1, terms_per_jd: int = 20):
+    """Bulk-insert JDs made of words no resume contains."""
+    if count <= 0:
+        return
+    rng = random.Random(seed)
+    texts = [" ".join(f"zq{rng.randrange(10 ** 6)}" for _ in range(terms_per_jd)) for _ in range(count)]
+    term_sets = [sorted(tokenize(text)) for text in texts]
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO standing_jds (user_id, title, jd_text, term_count, min_score)
+                SELECT %s, 'unrelated', t, n, 0.1 FROM unnest(%s::text[], %s::int[]) AS u(t, n)
+                RETURNING id
+            """, (user_id, texts, [len(terms) for terms in term_sets]))
+            jd_ids = [r[0] for r in cur.fetchall()]
+            pairs = [(jd_id, term, len(terms)) for jd_id, terms in zip(jd_ids, term_sets) for term in terms]
+            cur.execute("""
+                INSERT INTO standing_jd_terms (user_id, term, jd_id, jd_term_count, min_score)
+                SELECT %s, term, jd_id, n, 0.1 FROM unnest(%s::int[], %s::text[], %s::int[]) AS t(jd_id, term, n)
+            """, (user_id, *(list(column) for column in zip(*pairs))))
+            cur.execute("ANALYZE standing_jd_terms")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def clear_matches():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM standing_jd_matches")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def scan_all_jds(resume_ids: List[int], user_id: int = 1) -> int:
+    """Score every saved JD against every resume: the cost without a reverse index."""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT jd_text, min_score FROM standing_jds WHERE user_id = %s", (user_id,))
+            jds = [(tokenize(text), min_score) for text, min_score in cur.fetchall()]
+            cur.execute("SELECT extracted_text FROM resume_data WHERE user_id = %s AND id = ANY(%s)",
+                        (user_id, resume_ids))
+            resumes = [tokenize(r[0]) for r in cur.fetchall()]
+    finally:
+        conn.close()
+    matched = 0
+    for tokens in resumes:
+        for terms, min_score in jds:
+            shared = len(tokens & terms)
+            if shared and shared / (len(tokens) + len(terms) - shared) >= min_score:
+                matched += 1
+    return matched
+
+
+def bench_standing(unrelated: List[int], relevant: int, batch: int, repeats: int, seed: int) -> Dict:
+    reset = setup_database("postgres")
+    reset()
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("TRUNCATE standing_jds CASCADE")
+        conn.commit()
+    finally:
+        conn.close()
+
+    service = StandingJDService({"min_score": 0.05})
+    for i, jd in enumerate(make_jds(relevant, seed)):
+        service.create(1, jd, f"role {i}")
+    save_resumes_batch([to_record(item) for item in generate_corpus(batch, seed, render=False)], 1)
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT id FROM resume_data WHERE user_id = 1 ORDER BY id")
+            resume_ids = [r[0] for r in cur.fetchall()]
+    finally:
+        conn.close()
+
+    results, added = {}, 0
+    for total in unrelated:
+        add_unrelated_jds(total - added, seed + total)
+        added = total
+        samples = []
+        for _ in range(repeats):
+            clear_matches()
+            with Timer() as indexed:
+                matches = len(service.evaluate_resumes(resume_ids))
+            samples.append(indexed.elapsed)
+        with Timer() as scan:
+            scanned = scan_all_jds(resume_ids)
+        evaluate = percentiles(samples, points=(50,))
+        results[str(total)] = {
+            "standing_jds": relevant + total,
+            "matches": matches,
+            "evaluate_ms": evaluate,
+            "evaluate_ms_per_resume": round(evaluate["p50"] / len(resume_ids), 3),
+            "scan_all_ms": round(scan.elapsed * 1000, 2),
+            "same_matches": matches == scanned,
+        }
+    return results
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Standing JD evaluation cost as saved JDs grow")
+    parser.add_argument("--unrelated", default="0,1000,10000", help="unrelated standing JDs at each step")
+    parser.add_argument("--relevant", type=int, default=20, help="standing JDs written for the corpus skills")
+    parser.add_argument("--batch", type=int, default=50, help="resumes in the ingest batch")
+    parser.add_argument("--repeats", type=int, default=5, help="evaluations timed per step")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="write JSON results to this path")
+    args = parser.parse_args(argv)
+
+    unrelated = sorted(int(s) for s in args.unrelated.split(",") if s.strip())
+    results = {
+        "meta": dict(run_metadata(), seed=args.seed, relevant=args.relevant, batch=args.batch),
+        "evaluate": bench_standing(unrelated, args.relevant, args.batch, args.repeats, args.seed),
+    }
+    write_results(results, args.out)
+
+
+if __name__ == "__main__":
+    main()
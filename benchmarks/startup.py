@@ -0,0 +1,90 @@
+"""Startup-time budget for the API module.
+
+Imports `backend.main` in a fresh interpreter under `python -X importtime`,
+reports the cumulative import time and the slowest modules, and exits non-zero
+when the budget is exceeded or a heavy dependency is imported eagerly. Suitable
+as a CI gate:
+
+    python -m benchmarks.startup --budget-ms 1500
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.common import run_metadata, write_results
+
+# Only needed once a request actually parses a file, calls the LLM or the calendar
+DEFERRED_MODULES = ("fitz", "pymupdf", "docx", "googleapiclient", "langchain", "langchain_openai", "langchain_core")
+
+PROBE = (
+    "import sys, json\n"
+    "import backend.main\n"
+    "print(json.dumps(sorted(m for m in sys.modules if m.split('.')[0] in %r)))\n"
+)
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """(module, self_us, cumulative_us) rows from -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            rows.append((parts[2].strip(), int(parts[0]), int(parts[1])))
+        except ValueError:
+            # Header row
+            continue
+    return rows
+
+
+def measure(repo_root: str) -> Dict:
+    probe = PROBE % (DEFERRED_MODULES,)
+    env = dict(os.environ, PYTHONPATH=repo_root + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        capture_output=True, text=True, cwd=repo_root, env=env, timeout=120,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing backend.main failed:\n{proc.stderr[-2000:]}")
+
+    rows = parse_importtime(proc.stderr)
+    main_row = next((r for r in rows if r[0] == "backend.main"), None)
+    total_us = main_row[2] if main_row else sum(r[1] for r in rows)
+    slowest = sorted(rows, key=lambda r: r[1], reverse=True)[:15]
+    return {
+        "import_ms": round(total_us / 1000, 1),
+        "slowest_self_ms": {name: round(self_us / 1000, 1) for name, self_us, _ in slowest},
+        "eager_heavy_modules": json.loads(proc.stdout.strip().splitlines()[-1]),
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Check backend.main import time against a budget")
+    parser.add_argument("--budget-ms", type=float, default=1500)
+    parser.add_argument("--out", help="write JSON results to this path")
+    args = parser.parse_args(argv)
+
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = measure(repo_root)
+    result["budget_ms"] = args.budget_ms
+    result["meta"] = run_metadata()
+    write_results(result, args.out)
+
+    failures = []
+    if result["import_ms"] > args.budget_ms:
+        failures.append(f"import took {result['import_ms']} ms, budget is {args.budget_ms} ms")
+    if result["eager_heavy_modules"]:
+        failures.append(f"heavy modules imported at startup: {', '.join(result['eager_heavy_modules'])}")
+    if failures:
+        print("FAIL: " + "; ".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
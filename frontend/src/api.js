@@ -36,37 +36,16 @@ export const uploadResumesBatch = async (files) => {
     return response.data;
 };
 
-export const matchResumes = async (jdText, topK = 5) => {
-    const response = await api.post('/resume/match', { jd_text: jdText, top_k: topK });
-    return response.data;
-};
-
-export const triggerWebhook = async (jdText, matchResults, topK) => {
-    const payload = {
+// With dispatch, the backend posts a compact payload (ids + features, no resume text)
+// to the n8n webhook itself; n8n fetches full text via GET /resume/{id} when needed.
+export const matchResumes = async (jdText, topK = 5, { dispatch = false, includeText = true } = {}) => {
+    const response = await api.post('/resume/match', {
         jd_text: jdText,
         top_k: topK,
-        matches: matchResults.map(m => ({
-            ...m,
-            // Ensure skills is a proper array or clean string to avoid N8N regex issues
-            // Sending as array makes it easier for N8N to handle without string replacement hacks
-            Skills: m.Skills ? m.Skills.split(',').map(s => s.trim()) : []
-        }))
-    };
-
-    const res = await fetch("http://localhost:5678/webhook-test/match-resumes", {
-        method: "POST",
-        headers: {
-            "Content-Type": "application/json"
-        },
-        body: JSON.stringify(payload),
+        dispatch,
+        include_text: includeText,
     });
-
-    if (!res.ok) {
-        const text = await res.text();
-        throw new Error(text);
-    }
-
-    return await res.json();
+    return response.data;
 };
 
 export const resetDatabase = async () => {
@@ -1,6 +1,6 @@
 import React, { useState } from 'react';
 import { Upload, FileText, X, Check, Search, FileUp, Loader2, Sparkles, Sliders } from 'lucide-react';
-import { extractTextFromJD, analyzeResume, matchResumes, triggerWebhook, generateJD, uploadResumesBatch } from '../api';
+import { extractTextFromJD, analyzeResume, matchResumes, generateJD, uploadResumesBatch } from '../api';
 
 const HRScreening = () => {
     const [resumes, setResumes] = useState([]);
@@ -63,7 +63,6 @@ const HRScreening = () => {
 
         setProcessing(true);
         setMatchResults(null);
-        let currentMatches = [];
 
         // 1. Bulk Upload Resumes
         const BATCH_SIZE = 50;
@@ -95,12 +94,15 @@ const HRScreening = () => {
         // 2. Match Resumes
         try {
             console.log("Matching resumes with topK:", topK);
-            const results = await matchResumes(jdText, topK);
+            // The backend forwards results to n8n, so the browser never re-uploads them
+            const results = await matchResumes(jdText, topK, { dispatch: true, includeText: false });
             console.log("Match Results Recieved:", results.matches);
+            if (results.dispatch) {
+                console.log(`[Run ${results.dispatch.run_id || '-'}] Webhook dispatch: ${results.dispatch.status}`);
+            }
 
             if (results.matches && results.matches.length > 0) {
                 setMatchResults(results.matches);
-                currentMatches = results.matches;
 
                 // Scroll to results
                 setTimeout(() => {
@@ -118,19 +120,6 @@ const HRScreening = () => {
         } finally {
             setProcessing(false);
         }
-
-        // 3. Trigger Webhook (Fire and Forget - Don't block UI)
-        if (currentMatches.length > 0) {
-            const runId = new Date().toISOString().split('T')[1].replace('Z', ''); // e.g., 14:30:05.123
-            console.log(`[Run ${runId}] Triggering Webhook...`);
-
-            // Add Run ID to payload for debugging
-            const payloadMatches = currentMatches.map(m => ({ ...m, RunID: runId }));
-
-            triggerWebhook(jdText, payloadMatches, topK)
-                .then(() => console.log(`[Run ${runId}] Webhook triggered successfully`))
-                .catch(err => console.error(`[Run ${runId}] Webhook trigger failed:`, err));
-        }
     };
 
     return (